@@ -0,0 +1,37 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+with warnings.catch_warnings():
+    warnings.filterwarnings("ignore")
+
+import argparse
+import os
+
+from darwinex_ml.metrics import MetricEmitter
+from darwinex_ml.orchestrator import SPECS, load_specs, run_all
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    # Sagemaker specific arguments. Defaults are set in the environment variables.
+    parser.add_argument('--train', type=str, default=os.environ['SM_CHANNEL_TRAIN'])
+    parser.add_argument('--specs', type=str, default=SPECS)
+    # CPUs shared by the models trained at the same time, every core by default
+    parser.add_argument('--cpu-budget', type=int, default=None)
+    # directory where setup() results are kept between runs
+    parser.add_argument('--setup-cache', type=str, default=None)
+    parser.add_argument('--only', type=str, nargs='+', default=None)
+
+    args = parser.parse_args()
+
+    durations = run_all(load_specs(args.specs, args.only), args.train, args.cpu_budget, args.setup_cache)
+
+    metrics = MetricEmitter()
+    for name, seconds in sorted(durations.items()):
+        print('Time: {}={:.1f}//'.format(name, seconds))
+        metrics.put('AllModels', 'TrainingSeconds-{}'.format(name), seconds, unit='Seconds')
+    # the sum is what the models take one after the other
+    print('Time: sequential={:.1f}//'.format(sum(v for k, v in durations.items() if k != 'total')))
+    metrics.flush()
+    print("saved models!")
@@ -0,0 +1,62 @@
+import json
+import logging
+
+from boto3 import client
+from sagemaker import Session
+from sagemaker.sklearn import SKLearn
+
+sagemaker_session = Session()
+
+LOGGER = logging.getLogger("sagemaker")
+LOGGER.setLevel(logging.INFO)
+
+SM_CLIENT = client('sagemaker')
+
+image = '492253803439.dkr.ecr.eu-west-1.amazonaws.com/pycaret-sagemaker-container'
+role = 'arn:aws:iam::492253803439:role/service-role/AmazonSageMaker-ExecutionRole-20210517T174226'
+script_path = 'pycaret_sagemaker_AllModels.py'
+instance_type = 'ml.c5.2xlarge'
+data_folder = 's3://tfm-2021-darwinex/data/'
+job_name = 'AllModels'
+# jobs trained by each train_and_deploy_<model>.py script
+single_jobs = ['ModClasClientes', 'ModConversion-investor', 'ModConversion-trader', 'ModEstIngresos',
+               'ModRecInvDarwin']
+
+
+def last_job_seconds(name):
+    jobs = SM_CLIENT.list_training_jobs(NameContains=name, StatusEquals='Completed', SortBy='CreationTime',
+                                        SortOrder='Descending', MaxResults=1)['TrainingJobSummaries']
+    if not jobs:
+        return None
+    return SM_CLIENT.describe_training_job(TrainingJobName=jobs[0]['TrainingJobName'])['BillableTimeInSeconds']
+
+
+with open('../darwinex_ml/models.json') as f:
+    specs = json.load(f)
+
+metric_definitions = [{'Name': '{}:{}'.format(spec['name'], metric),
+                       'Regex': '{}:{}=(\d\.\d+)'.format(spec['name'], metric.replace('.', '\.'))}
+                      for spec in specs for metric in spec.get('metrics', [])]
+
+sklearn_preprocessor = SKLearn(
+    entry_point=script_path,
+    source_dir='.',
+    dependencies=['../darwinex_ml'],
+    role=role,
+    image_uri=image,
+    sagemaker_session=sagemaker_session,
+    base_job_name=job_name,
+    hyperparameters={'setup-cache': '/opt/ml/checkpoints/setup'},
+    # SageMaker syncs /opt/ml/checkpoints with this prefix, the setup() cache survives between jobs
+    checkpoint_s3_uri='s3://tfm-2021-darwinex/checkpoints/AllModels/',
+    metric_definitions=metric_definitions,
+    instance_type=instance_type)
+
+sklearn_preprocessor.fit({'train': data_folder})
+
+all_models = last_job_seconds(job_name)
+sequential = {name: last_job_seconds(name) for name in single_jobs}
+for name, seconds in sequential.items():
+    print('{}: {} s'.format(name, seconds))
+if None not in sequential.values():
+    print('Five jobs: {} s, one job: {} s'.format(sum(sequential.values()), all_models))
@@ -6,99 +6,32 @@ with warnings.catch_warnings():
     warnings.filterwarnings("ignore")
 
 import argparse
-import datetime
-import json
 import os
 
-from boto3 import client, resource
-
-# initializing setup
-from pycaret.classification import *
-from sagemaker_containers.beta.framework import (
-    encoders, worker)
-
-CLOUDWATCH = client('cloudwatch', region_name='eu-west-1')
-S3 = client('s3', region_name='eu-west-1')
-
-
-def send_metric(job, metric, value):
-    CLOUDWATCH.put_metric_data(
-        MetricData=[
-            {
-                'MetricName': metric,
-                'Dimensions': [
-                    {
-                        'Name': 'Model',
-                        'Value': job
-                    }
-                ],
-                'Unit': 'None',
-                'Value': value
-            },
-        ],
-        Namespace='DarwinexMachineLearningJobs'
-    )
-    print('Metric: {}={}//'.format(metric, value))
-
+from darwinex_ml.orchestrator import load_specs, train_single
+from darwinex_ml.streaming import ESTIMATORS
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
 
     # Sagemaker specific arguments. Defaults are set in the environment variables.
     parser.add_argument('--train', type=str, default=os.environ['SM_CHANNEL_TRAIN'])
+    # 'parallel' cross-validates every model and fold at once over all the cores, the spec decides by default
+    parser.add_argument('--compare', type=str, default=None, choices=['pycaret', 'parallel'])
+    # directory where setup() results are kept between runs
+    parser.add_argument('--setup-cache', type=str, default=None)
+    # rows per chunk, reads the CSV in chunks with constant memory instead of loading it for setup()
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--streaming-estimator', type=str, default='sgd', choices=list(ESTIMATORS))
 
     args = parser.parse_args()
 
-    _df = pd.read_csv(os.path.join(args.train, 'dataset_ModClasClientes.csv'))
-
-    clf1 = setup(_df, normalize=True, target='label', ignore_features=['userid'], silent=True, html=False,
-                 verbose=False)
-
-    top = compare_models(n_select=1, verbose=False)
-    top_tuned = tune_model(top, verbose=False)
-    calibrated_dt = calibrate_model(top_tuned, verbose=False)
-    final_model = finalize_model(calibrated_dt)
-    last_metrics = pull()
-
-    save_model(final_model, model_name='ModClasClientes', verbose=False)
-    S3.upload_file('ModClasClientes.pkl', 'tfm-2021-darwinex', 'models/ModClasClientes/final_model.pkl')
-    S3.upload_file('ModClasClientes.pkl', 'tfm-2021-darwinex', 'models/ModClasClientes/history/{}_model'.format(datetime.datetime.now()))
-
-    send_metric('ModClasClientes', 'Accuracy', last_metrics['Accuracy'].iloc[0])
-    send_metric('ModClasClientes', 'AUC', last_metrics['AUC'].iloc[0])
-    send_metric('ModClasClientes', 'Recall', last_metrics['Recall'].iloc[0])
-    send_metric('ModClasClientes', 'Prec.', last_metrics['Prec.'].iloc[0])
-    send_metric('ModClasClientes', 'F1', last_metrics['F1'].iloc[0])
-    send_metric('ModClasClientes', 'Kappa', last_metrics['Kappa'].iloc[0])
-    send_metric('ModClasClientes', 'MCC', last_metrics['MCC'].iloc[0])
+    # the setup, search and metrics of the model are in darwinex_ml/models.json, shared with AllModels
+    spec = load_specs(only=['ModClasClientes'])[0]
+    if args.compare:
+        spec['parallel_compare'] = args.compare == 'parallel'
+    if args.chunksize:
+        spec.update(chunksize=args.chunksize, streaming_estimator=args.streaming_estimator)
 
+    train_single(spec, args.train, args.setup_cache)
     print("saved model!")
-
-
-def input_fn(input_data, content_type):
-    if content_type == "application/json":
-        df = pd.DataFrame([pd.read_json(input_data, typ='series')])
-        return df
-    else:
-        raise ValueError("{} not supported by script!".format(content_type))
-
-
-def output_fn(prediction, accept):
-    if accept == "application/json":
-        return worker.Response(prediction.to_json(), mimetype=accept)
-    elif accept == 'text/csv':
-        return worker.Response(encoders.encode(prediction, accept), mimetype=accept)
-    else:
-        raise RuntimeException("{} accept type is not supported by this script.".format(accept))
-
-
-def predict_fn(input_data, model):
-    result = predict_model(model, input_data)
-    return result
-
-
-def model_fn(model_dir):
-    resource('s3', region_name='eu-west-1').Bucket('tfm-2021-darwinex').download_file('models/ModClasClientes/final_model.pkl',
-                                                                                      'final_model.pkl')
-    model = load_model('final_model')
-    return model
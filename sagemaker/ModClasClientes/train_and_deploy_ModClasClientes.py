@@ -20,6 +20,8 @@ SM_CLIENT = client('sagemaker')
 image = '492253803439.dkr.ecr.eu-west-1.amazonaws.com/pycaret-sagemaker-container'
 role = 'arn:aws:iam::492253803439:role/service-role/AmazonSageMaker-ExecutionRole-20210517T174226'
 script_path = 'pycaret_sagemaker_ModClasClientes.py'
+# the endpoint only imports the inference handlers, not pycaret and the training code
+serve_path = 'serve_ModClasClientes.py'
 instance_type = 'ml.c5.2xlarge'
 data_folder = 's3://tfm-2021-darwinex/data/ModClasClientes/'
 job_name = 'ModClasClientes'
@@ -27,11 +29,15 @@ endpoint_name = 'ModClasClientes-endpoint'
 
 sklearn_preprocessor = SKLearn(
     entry_point=script_path,
+    dependencies=['../darwinex_ml'],
     role=role,
     image_uri=image,
     sagemaker_session=sagemaker_session,
     base_job_name=job_name,
     job_name=job_name,
+    hyperparameters={'compare': 'parallel', 'setup-cache': '/opt/ml/checkpoints/setup'},
+    # SageMaker syncs /opt/ml/checkpoints with this prefix, the setup() cache survives between jobs
+    checkpoint_s3_uri='s3://tfm-2021-darwinex/checkpoints/ModClasClientes/',
     metric_definitions=[
         {'Name': 'Accuracy', 'Regex': 'Accuracy=(\d\.\d+)'},
         {'Name': 'AUC', 'Regex': 'AUC=(\d\.\d+)'},
@@ -46,7 +52,7 @@ sklearn_preprocessor = SKLearn(
 sklearn_preprocessor.fit({'train': data_folder})
 
 model = SKLearnModel(image_uri=image, model_data='s3://tfm-2021-darwinex/models/model_dummy.tar.gz',
-                     role=role, entry_point=script_path)
+                     role=role, entry_point=serve_path, dependencies=['../darwinex_ml'])
 
 try:
     SM_CLIENT.describe_endpoint(EndpointName=endpoint_name)
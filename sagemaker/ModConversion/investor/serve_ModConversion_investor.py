@@ -0,0 +1,75 @@
+import os
+
+from sagemaker_containers.beta.framework import (
+    encoders, worker)
+
+from darwinex_ml.compiled import CompiledModel, load_compiled
+from darwinex_ml.handlers import BINARY, JSON_LINES, decode_records, encode_frame, media_type
+from darwinex_ml.hot_swap import HotSwapModel, current
+from darwinex_ml.latency import LatencyRecorder
+from darwinex_ml.mapped import load_published
+from darwinex_ml.metrics import MetricEmitter
+from darwinex_ml.model_cache import fetch_model
+
+# Inference handlers of ModConversion-investor, trained by pycaret_sagemaker_ModConversion_investor.py.
+# Only what serving needs is imported: pycaret just for a model training could not compile,
+# and the AWS clients are created on their first call.
+METRICS = MetricEmitter()
+# time of each handler stage, logged every minute
+LATENCY = LatencyRecorder('ModConversion-investor', METRICS)
+
+
+@LATENCY.timed('input_fn', payload='request')
+def input_fn(input_data, content_type):
+    df = decode_records(input_data, content_type)
+    return df
+
+
+@LATENCY.timed('output_fn', payload='response')
+def output_fn(prediction, accept):
+    if accept == "application/json":
+        return worker.Response(prediction.to_json(), mimetype=accept)
+    elif accept == 'text/csv':
+        return worker.Response(encoders.encode(prediction, accept), mimetype=accept)
+    elif accept == JSON_LINES:
+        return worker.Response(prediction.to_json(orient='records', lines=True), mimetype=accept)
+    elif media_type(accept) in BINARY:
+        return worker.Response(encode_frame(prediction, accept), mimetype=accept)
+    else:
+        raise ValueError("{} accept type is not supported by this script.".format(accept))
+
+
+@LATENCY.timed('predict_fn')
+def predict_fn(input_data, model):
+    model = current(model)
+    if isinstance(model, CompiledModel):
+        return model.predict_frame(input_data)
+    from pycaret.classification import predict_model
+
+    result = predict_model(model, input_data)
+    return result
+
+
+@LATENCY.timed('model_load')
+def load_serving_model():
+    compiled = load_compiled('tfm-2021-darwinex', 'models/ModConversion/investor/compiled_model.mmap')
+    if compiled is not None:
+        return compiled
+    model = load_published('tfm-2021-darwinex', 'models/ModConversion/investor/final_model.mmap')
+    if model is not None:
+        return model
+    # pycaret is only imported to serve a model training could not compile or map
+    from pycaret.classification import load_model
+
+    path = fetch_model('tfm-2021-darwinex', 'models/ModConversion/investor/final_model.pkl')
+    model = load_model(os.path.splitext(path)[0])
+    return model
+
+
+@LATENCY.timed('model_fn')
+def model_fn(model_dir):
+    # a new training run is swapped in by the endpoint itself, without redeploying it
+    return HotSwapModel(load_serving_model, 'tfm-2021-darwinex',
+                        ['models/ModConversion/investor/final_model.pkl',
+                         'models/ModConversion/investor/final_model.mmap',
+                         'models/ModConversion/investor/compiled_model.mmap'])
@@ -0,0 +1,119 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sagemaker_containers.beta.framework import (
+    encoders, worker)
+
+from darwinex_ml.compiled import CompiledModel, load_compiled
+from darwinex_ml.forecast_cache import ForecastCache
+from darwinex_ml.forecasting import DirectForecaster, DirectModel, RecursiveForecaster
+from darwinex_ml.handlers import BINARY, decode_records, encode_frame, media_type
+from darwinex_ml.hot_swap import HotSwapModel, current
+from darwinex_ml.lags import lag_columns
+from darwinex_ml.latency import LatencyRecorder
+from darwinex_ml.mapped import load_published
+from darwinex_ml.metrics import MetricEmitter
+from darwinex_ml.model_cache import fetch_model
+
+# Inference handlers of ModEstIngresos, trained by pycaret_sagemaker_ModEstIngresos.py.
+# Only what serving needs is imported: pycaret just for a model training could not compile,
+# and the AWS clients are created on their first call.
+METRICS = MetricEmitter()
+# time of each handler stage, logged every minute
+LATENCY = LatencyRecorder('ModEstIngresos', METRICS)
+# lags the model was trained with, the lags window of ModEstIngresos in darwinex_ml/models.json
+WINDOW = 27
+LAG_COLUMNS = lag_columns(WINDOW)
+# dashboards refreshing send the same history and dates again
+FORECAST_CACHE = ForecastCache()
+
+
+@LATENCY.timed('input_fn', payload='request')
+def input_fn(input_data, content_type):
+    if content_type == "application/json":
+        df = pd.read_json(json.loads(input_data))
+        return df
+    elif media_type(content_type) in BINARY:
+        df = decode_records(input_data, content_type)
+        return df
+    else:
+        raise ValueError("{} not supported by script!".format(content_type))
+
+
+@LATENCY.timed('output_fn', payload='response')
+def output_fn(prediction, accept):
+    if accept == "application/json":
+        return worker.Response(prediction.to_json(), mimetype=accept)
+    elif accept == 'text/csv':
+        return worker.Response(encoders.encode(prediction, accept), mimetype=accept)
+    elif media_type(accept) in BINARY:
+        return worker.Response(encode_frame(prediction, accept), mimetype=accept)
+    else:
+        raise ValueError("{} accept type is not supported by this script.".format(accept))
+
+
+def forecaster(model):
+    # RecursiveForecaster that predicts with `model`, timing each of its calls
+    if isinstance(model, DirectModel):
+        def predict(lags):
+            # the whole horizon in one call
+            with LATENCY.time('predict_step'):
+                return model.predict(lags)
+
+        return DirectForecaster(predict, model.window)
+    if isinstance(model, CompiledModel):
+        order = [LAG_COLUMNS.index(column) for column in model.columns]
+
+        def predict(lags):
+            with LATENCY.time('predict_step'):
+                return model.predict(lags[order][np.newaxis])[0]
+    else:
+        from pycaret.regression import predict_model
+
+        def predict(lags):
+            # predict_fn minus the steps is the time of the recursive loop itself
+            with LATENCY.time('predict_step'):
+                return predict_model(model, pd.DataFrame([lags], columns=LAG_COLUMNS)).iloc[0]['Label']
+
+    return RecursiveForecaster(predict, WINDOW)
+
+
+@LATENCY.timed('predict_fn')
+def predict_fn(input_data, model):
+    model = current(model)
+    start = time.perf_counter()
+    result, hit = FORECAST_CACHE.forecast(model, forecaster(model), input_data)
+    # the count of each stage is the hit rate over the period
+    LATENCY.record('forecast_cache_hit' if hit else 'forecast_cache_miss', time.perf_counter() - start)
+    return result
+
+
+@LATENCY.timed('model_load')
+def load_serving_model():
+    # published when training ran with --horizon
+    direct = load_published('tfm-2021-darwinex', 'models/ModEstIngresos/direct_model.mmap')
+    if direct is not None:
+        return direct
+    compiled = load_compiled('tfm-2021-darwinex', 'models/ModEstIngresos/compiled_model.mmap')
+    if compiled is not None:
+        return compiled
+    model = load_published('tfm-2021-darwinex', 'models/ModEstIngresos/final_model.mmap')
+    if model is not None:
+        return model
+    # pycaret is only imported to serve a model training could not compile or map
+    from pycaret.regression import load_model
+
+    path = fetch_model('tfm-2021-darwinex', 'models/ModEstIngresos/final_model.pkl')
+    model = load_model(os.path.splitext(path)[0])
+    return model
+
+
+@LATENCY.timed('model_fn')
+def model_fn(model_dir):
+    # a new training run is swapped in by the endpoint itself, without redeploying it
+    return HotSwapModel(load_serving_model, 'tfm-2021-darwinex',
+                        ['models/ModEstIngresos/final_model.pkl', 'models/ModEstIngresos/final_model.mmap',
+                         'models/ModEstIngresos/compiled_model.mmap', 'models/ModEstIngresos/direct_model.mmap'])
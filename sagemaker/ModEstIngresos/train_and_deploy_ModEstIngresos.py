@@ -21,6 +21,8 @@ SM_CLIENT = client('sagemaker')
 image = '492253803439.dkr.ecr.eu-west-1.amazonaws.com/pycaret-sagemaker-container'
 role = 'arn:aws:iam::492253803439:role/service-role/AmazonSageMaker-ExecutionRole-20210517T174226'
 script_path = 'pycaret_sagemaker_ModEstIngresos.py'
+# the endpoint only imports the inference handlers, not pycaret and the training code
+serve_path = 'serve_ModEstIngresos.py'
 instance_type = 'ml.c5.2xlarge'
 data_folder = 's3://tfm-2021-darwinex/data/ModEstIngresos/'
 job_name = 'ModEstIngresos'
@@ -28,25 +30,31 @@ endpoint_name = 'ModEstIngresos-endpoint'
 
 sklearn_preprocessor = SKLearn(
     entry_point=script_path,
+    dependencies=['../darwinex_ml'],
     role=role,
     image_uri=image,
     sagemaker_session=sagemaker_session,
     base_job_name=job_name,
     job_name=job_name,
+    hyperparameters={'retrain': 'incremental', 'setup-cache': '/opt/ml/checkpoints/setup'},
+    # SageMaker syncs /opt/ml/checkpoints with this prefix, the setup() cache survives between jobs
+    checkpoint_s3_uri='s3://tfm-2021-darwinex/checkpoints/ModEstIngresos/',
     metric_definitions=[
         {'Name': 'MAE', 'Regex': 'MAE=(\d\.\d+)'},
         {'Name': 'MSE', 'Regex': 'MSE=(\d\.\d+)'},
         {'Name': 'RMSE', 'Regex': 'RMSE=(\d\.\d+)'},
         {'Name': 'R2', 'Regex': 'R2=(\d\.\d+)'},
         {'Name': 'RMSLE', 'Regex': 'RMSLE=(\d\.\d+)'},
-        {'Name': 'MAPE', 'Regex': 'MAPE=(\d\.\d+)'}
+        {'Name': 'MAPE', 'Regex': 'MAPE=(\d\.\d+)'},
+        {'Name': 'RetrainSeconds-full', 'Regex': 'RetrainSeconds-full=(\d+\.\d+)'},
+        {'Name': 'RetrainSeconds-incremental', 'Regex': 'RetrainSeconds-incremental=(\d+\.\d+)'}
     ],
     instance_type=instance_type)
 
 sklearn_preprocessor.fit({'train': data_folder})
 
 model = SKLearnModel(image_uri=image, model_data='s3://tfm-2021-darwinex/models/model_dummy.tar.gz',
-                     role=role, entry_point=script_path)
+                     role=role, entry_point=serve_path, dependencies=['../darwinex_ml'])
 
 try:
     try:
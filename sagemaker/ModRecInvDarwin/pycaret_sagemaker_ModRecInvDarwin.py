@@ -6,86 +6,31 @@ with warnings.catch_warnings():
     warnings.filterwarnings("ignore")
 
 import argparse
-import datetime
-import json
 import os
 
-from boto3 import client, resource
-
-# initializing setup
-import pandas as pd
-from pycaret.arules import *
-from sagemaker_containers.beta.framework import (
-    encoders, worker)
-
-CLOUDWATCH = client('cloudwatch', region_name='eu-west-1')
-S3 = client('s3', region_name='eu-west-1')
-
-
-def send_metric(job, metric, value):
-    CLOUDWATCH.put_metric_data(
-        MetricData=[
-            {
-                'MetricName': metric,
-                'Dimensions': [
-                    {
-                        'Name': 'Model',
-                        'Value': job
-                    }
-                ],
-                'Unit': 'None',
-                'Value': value
-            },
-        ],
-        Namespace='DarwinexMachineLearningJobs'
-    )
-    print('Metric: {}={}//'.format(metric, value))
-
+from darwinex_ml.orchestrator import load_specs, train_single
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
 
     # Sagemaker specific arguments. Defaults are set in the environment variables.
     parser.add_argument('--train', type=str, default=os.environ['SM_CHANNEL_TRAIN'])
+    # 'pycaret' one-hot encodes every order, 'fpgrowth' mines the sparse orders and allows lower supports
+    parser.add_argument('--miner', type=str, default=None, choices=['pycaret', 'fpgrowth'])
+    parser.add_argument('--min-support', type=float, default=None)
+    # longest antecedent plus consequent, fpgrowth only
+    parser.add_argument('--max-len', type=int, default=None)
 
     args = parser.parse_args()
 
-    _df = pd.read_csv(os.path.join(args.train, 'dataset_ModRecInvDarwin.csv'))
-
-    exp_arul101 = setup(data=_df,
-                        transaction_id='orderid',
-                        item_id='darwin')
+    # the columns and support of the rules are in darwinex_ml/models.json, shared with AllModels
+    spec = load_specs(only=['ModRecInvDarwin'])[0]
+    if args.miner:
+        spec['miner'] = args.miner
+    if args.min_support is not None:
+        spec['create']['min_support'] = args.min_support
+    if args.max_len is not None and spec.get('miner') == 'fpgrowth':
+        spec['create']['max_len'] = args.max_len
 
-    model = create_model(min_support=0.1)
-    model.to_pickle('ModRecInvDarwin.pkl')
-    S3.upload_file('ModRecInvDarwin.pkl', 'tfm-2021-darwinex', 'models/ModRecInvDarwin/final_model.pkl')
-    S3.upload_file('ModRecInvDarwin.pkl', 'tfm-2021-darwinex', 'models/ModRecInvDarwin/history/{}_model'.format(datetime.datetime.now()))
+    train_single(spec, args.train)
     print("saved model!")
-
-
-def input_fn(input_data, content_type):
-    if content_type == "application/json":
-        data = json.loads(input_data)
-        return data
-    else:
-        raise ValueError("{} not supported by script!".format(content_type))
-
-
-def output_fn(prediction, accept):
-    if accept == "application/json":
-        return worker.Response(prediction.to_json(), mimetype=accept)
-    elif accept == 'text/csv':
-        return worker.Response(encoders.encode(prediction, accept), mimetype=accept)
-    else:
-        raise RuntimeException("{} accept type is not supported by this script.".format(accept))
-
-
-def predict_fn(input_data, model):
-    result = model[model.antecedents.map(set(input_data.get('darwins')).issubset)]
-    return result
-
-
-def model_fn(model_dir):
-    resource('s3', region_name='eu-west-1').Bucket('tfm-2021-darwinex').download_file('models/ModRecInvDarwin/final_model.pkl', 'final_model.pkl')
-    model = pd.read_pickle('final_model.pkl')
-    return model
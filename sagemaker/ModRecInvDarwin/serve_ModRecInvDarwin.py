@@ -0,0 +1,84 @@
+import json
+import time
+
+import pandas as pd
+from sagemaker_containers.beta.framework import (
+    encoders, worker)
+
+from darwinex_ml.handlers import BINARY, decode_records, encode_frame, media_type
+from darwinex_ml.hot_swap import HotSwapModel, current
+from darwinex_ml.latency import LatencyRecorder
+from darwinex_ml.mapped import load_published
+from darwinex_ml.metrics import MetricEmitter
+from darwinex_ml.model_cache import fetch_model
+from darwinex_ml.rules import RuleIndex, RuleRows
+
+# Inference handlers of ModRecInvDarwin, trained by pycaret_sagemaker_ModRecInvDarwin.py.
+# Filtering the rule table needs neither pycaret nor mlxtend, and the AWS clients are created on their first call.
+METRICS = MetricEmitter()
+# time of each handler stage, logged every minute
+LATENCY = LatencyRecorder('ModRecInvDarwin', METRICS)
+
+
+@LATENCY.timed('input_fn', payload='request')
+def input_fn(input_data, content_type):
+    if content_type == "application/json":
+        data = json.loads(input_data)
+        return data
+    elif media_type(content_type) in BINARY:
+        # one row per darwin of the basket
+        data = {'darwins': decode_records(input_data, content_type)['darwins'].tolist()}
+        return data
+    else:
+        raise ValueError("{} not supported by script!".format(content_type))
+
+
+@LATENCY.timed('output_fn', payload='response')
+def output_fn(prediction, accept):
+    if accept == "application/json":
+        # RuleRows write the JSON of their DataFrame without building it
+        return worker.Response(prediction.to_json(), mimetype=accept)
+    if isinstance(prediction, RuleRows):
+        prediction = prediction.to_frame()
+    if accept == 'text/csv':
+        return worker.Response(encoders.encode(prediction, accept), mimetype=accept)
+    elif media_type(accept) in BINARY:
+        return worker.Response(encode_frame(prediction, accept), mimetype=accept)
+    else:
+        raise ValueError("{} accept type is not supported by this script.".format(accept))
+
+
+@LATENCY.timed('predict_fn')
+def predict_fn(input_data, model):
+    model = current(model)
+    if input_data.get('recommend'):
+        # the consequent darwins ranked, instead of the rules
+        start = time.perf_counter()
+        result, hit = model.recommend(input_data.get('darwins', []), top_k=input_data.get('top_k'),
+                                      sort_by=input_data.get('sort_by', 'lift'))
+        # the count of each stage is the hit rate of the table over the period
+        LATENCY.record('recommend_table_hit' if hit else 'recommend_table_miss', time.perf_counter() - start)
+        return result
+    result = model.select(input_data.get('darwins'), top_k=input_data.get('top_k'),
+                          sort_by=input_data.get('sort_by', 'lift'))
+    return result
+
+
+@LATENCY.timed('model_load')
+def load_serving_model():
+    # a RuleTable, or the DataFrame of models trained before it that RuleIndex encodes
+    rules = load_published('tfm-2021-darwinex', 'models/ModRecInvDarwin/final_model.mmap')
+    if rules is None:
+        rules = pd.read_pickle(fetch_model('tfm-2021-darwinex', 'models/ModRecInvDarwin/final_model.pkl'))
+    # None for rules trained before the table, recommend() then filters every basket
+    table = load_published('tfm-2021-darwinex', 'models/ModRecInvDarwin/recommendations.mmap')
+    model = RuleIndex(rules, table)
+    return model
+
+
+@LATENCY.timed('model_fn')
+def model_fn(model_dir):
+    # a new training run is swapped in by the endpoint itself, without redeploying it
+    return HotSwapModel(load_serving_model, 'tfm-2021-darwinex',
+                        ['models/ModRecInvDarwin/final_model.pkl', 'models/ModRecInvDarwin/final_model.mmap',
+                         'models/ModRecInvDarwin/recommendations.mmap'])
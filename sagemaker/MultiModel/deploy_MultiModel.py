@@ -0,0 +1,67 @@
+import logging
+
+import pandas as pd
+from boto3 import client
+from botocore.exceptions import ClientError
+from sagemaker import Session
+from sagemaker.deserializers import JSONDeserializer
+from sagemaker.serializers import JSONSerializer
+from sagemaker.session import _wait_until, _deploy_done
+from sagemaker.sklearn import SKLearnModel
+
+sagemaker_session = Session()
+
+LOGGER = logging.getLogger("sagemaker")
+LOGGER.setLevel(logging.INFO)
+
+SM_CLIENT = client('sagemaker')
+
+image = '492253803439.dkr.ecr.eu-west-1.amazonaws.com/pycaret-sagemaker-container'
+role = 'arn:aws:iam::492253803439:role/service-role/AmazonSageMaker-ExecutionRole-20210517T174226'
+# relative to source_dir, which holds the folders of every model and darwinex_ml
+script_path = 'MultiModel/pycaret_sagemaker_MultiModel.py'
+instance_type = 'ml.c5.2xlarge'
+endpoint_name = 'MultiModel-endpoint'
+
+# one endpoint for the five models, each one loaded on its first request
+model = SKLearnModel(image_uri=image, model_data='s3://tfm-2021-darwinex/models/model_dummy.tar.gz',
+                     role=role, entry_point=script_path, source_dir='..',
+                     env={'MULTI_MODEL_MAX_BYTES': str(4 << 30)}, sagemaker_session=sagemaker_session)
+
+try:
+    SM_CLIENT.describe_endpoint(EndpointName=endpoint_name)
+    SM_CLIENT.delete_endpoint(EndpointName=endpoint_name)
+    SM_CLIENT.delete_endpoint_config(EndpointConfigName=endpoint_name)
+    desc = _wait_until(lambda: _deploy_done(SM_CLIENT, endpoint_name), 30)
+except ClientError as ex:
+    pass
+
+predictor = model.deploy(endpoint_name=endpoint_name, initial_instance_count=1,
+                         serializer=JSONSerializer(), deserializer=JSONDeserializer(),
+                         instance_type=instance_type)
+
+
+def predict(model_name, data):
+    return predictor.predict(data, initial_args={'ContentType': 'application/json; model={}'.format(model_name)})
+
+
+print(predict('ModClasClientes', {'userid': '1ad1801b-d20c-4397-8378-07ac4e248441',
+                                  'has_darwin': True,
+                                  'pfees': 0.0,
+                                  'darwinia': 0.0,
+                                  'dscore': 0.0,
+                                  'commissions': 3.066004793590487,
+                                  'investment': 0.0,
+                                  'old_darwin': False}))
+print(predict('ModEstIngresos', pd.read_csv('../ModEstIngresos/dataset_ModEstIngresos_test.csv').to_json()))
+print(predict('ModRecInvDarwin', {'darwins': ['UCHT', 'KOGV']}))
+print(predict('stats', {}))
+
+# Comment these lines in production
+predictor.delete_model()
+try:
+    SM_CLIENT.delete_endpoint(EndpointName=endpoint_name)
+    _wait_until(lambda: _deploy_done(SM_CLIENT, endpoint_name), 5)
+except Exception as ex:
+    print(ex)
+SM_CLIENT.delete_endpoint_config(EndpointConfigName=endpoint_name)
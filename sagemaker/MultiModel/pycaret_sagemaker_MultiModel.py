@@ -0,0 +1,44 @@
+import json
+
+from sagemaker_containers.beta.framework import worker
+
+from darwinex_ml.multi_model import ModelRouter, handler_loaders, imported_handlers, load_handler, split_content_type
+
+# model name of the requests that return the load, hit and eviction counters, the stage latencies and the
+# forecast cache counters
+STATS = 'stats'
+
+
+def input_fn(input_data, content_type):
+    # the model goes in the content type: 'application/json; model=ModClasClientes'
+    name, content_type = split_content_type(content_type)
+    if name is None:
+        raise ValueError("{} has no model parameter, e.g. 'application/json; model=ModClasClientes'".format(
+            content_type))
+    if name == STATS:
+        return name, None
+    return name, load_handler(name).input_fn(input_data, content_type)
+
+
+def output_fn(prediction, accept):
+    name, result = prediction
+    if name == STATS:
+        return worker.Response(json.dumps(result), mimetype='application/json')
+    return load_handler(name).output_fn(result, accept)
+
+
+def predict_fn(input_data, model):
+    name, data = input_data
+    if name == STATS:
+        stats = model.stats()
+        for handler_name, module in imported_handlers().items():
+            stats[handler_name]['latency'] = module.LATENCY.snapshot()
+            if hasattr(module, 'FORECAST_CACHE'):
+                stats[handler_name]['forecast_cache'] = module.FORECAST_CACHE.stats()
+        return name, stats
+    return name, load_handler(name).predict_fn(data, model.get(name))
+
+
+def model_fn(model_dir):
+    # nothing is loaded until the first request of each model
+    return ModelRouter(handler_loaders())
@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+from pycaret.classification import load_model, predict_model
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from darwinex_ml.handlers import CSV, JSON, JSON_LINES, decode_records
+
+DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'datasets')
+
+
+def encode(records, content_type):
+    if content_type == JSON:
+        return records.to_json(orient='records')
+    elif content_type == JSON_LINES:
+        return records.to_json(orient='records', lines=True)
+    return records.to_csv(index=False)
+
+
+def records_per_second(model, records, batch_size, content_type):
+    batches = [encode(records.iloc[i:i + batch_size], content_type) for i in range(0, len(records), batch_size)]
+    start = time.perf_counter()
+    for payload in batches:
+        predict_model(model, decode_records(payload, content_type))
+    return len(records) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    # model saved with save_model(), without the .pkl extension
+    parser.add_argument('--model', type=str, required=True)
+    parser.add_argument('--dataset', type=str, default='dataset_ModClasClientes.csv')
+    parser.add_argument('--target', type=str, default='label')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--records', type=int, default=10000)
+    args = parser.parse_args()
+
+    model = load_model(args.model, verbose=False)
+    data = pd.read_csv(os.path.join(DATASETS, args.dataset)).drop(columns=[args.target])
+    records = data.sample(n=args.records, replace=len(data) < args.records, random_state=0).reset_index(drop=True)
+
+    print('{:>10} {:>22} {:>14}'.format('batch', 'content type', 'records/s'))
+    for batch_size in args.batch_sizes:
+        for content_type in (JSON, JSON_LINES, CSV):
+            # a batch of 1 is timed on a slice, one request per record is too slow to cover every record
+            subset = records if batch_size > 1 else records.iloc[:min(len(records), 500)]
+            print('{:>10} {:>22} {:>14.1f}'.format(batch_size, content_type,
+                                                   records_per_second(model, subset, batch_size, content_type)))
@@ -0,0 +1,64 @@
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from darwinex_ml.compiled import compile_pipeline, parity_errors
+from darwinex_ml.lags import add_lag_features
+
+DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'datasets')
+
+
+def best_time(predict, batch, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(batch)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    # model saved with save_model(), without the .pkl extension
+    parser.add_argument('--model', type=str, required=True)
+    parser.add_argument('--module', type=str, default='classification', choices=['classification', 'regression'])
+    parser.add_argument('--dataset', type=str, default='dataset_ModClasClientes.csv')
+    parser.add_argument('--target', type=str, default='label')
+    # lag features of the target the model was trained with (27 for ModEstIngresos)
+    parser.add_argument('--lags', type=int, default=None)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pycaret = importlib.import_module('pycaret.' + args.module)
+    pipeline = pycaret.load_model(args.model, verbose=False)
+    data = pd.read_csv(os.path.join(DATASETS, args.dataset))
+    if args.lags:
+        data = add_lag_features(data, args.target, args.lags)
+    records = data.drop(columns=[args.target]).reset_index(drop=True)
+
+    started = time.perf_counter()
+    model = compile_pipeline(pipeline)
+    print('compiled in {:.1f} ms'.format((time.perf_counter() - started) * 1000))
+
+    # every row of the bundled dataset, not just the sample checked at training time
+    errors = parity_errors(model, pycaret.predict_model(pipeline, records), records)
+    print('parity: {} of {} rows differ from predict_model()'.format(errors, len(records)))
+
+    print('{:>10} {:>20} {:>16} {:>16} {:>10}'.format('batch', 'predict_model ms', 'predict_frame ms', 'predict ms',
+                                                      'speedup'))
+    for batch_size in args.batch_sizes:
+        batch = records.sample(n=batch_size, replace=len(records) < batch_size, random_state=0)
+        values = model.values(batch)
+        pycaret_time = best_time(lambda frame: pycaret.predict_model(pipeline, frame), batch, args.repeat)
+        frame_time = best_time(model.predict_frame, batch, args.repeat)
+        # the array path of the recursive forecast, without building a frame
+        array_time = best_time(model.predict, values, args.repeat)
+        print('{:>10} {:>20.2f} {:>16.2f} {:>16.2f} {:>9.1f}x'.format(
+            batch_size, pycaret_time * 1000, frame_time * 1000, array_time * 1000, pycaret_time / frame_time))
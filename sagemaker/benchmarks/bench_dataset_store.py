@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from darwinex_ml.dataset_store import SCHEMAS, convert, csv_name
+
+DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'datasets')
+
+# runs in a fresh interpreter with the same imports for every mode, so the peak RSS only differs by the load
+CHILD = '''
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+import pyarrow.csv, pyarrow.feather
+from darwinex_ml.dataset_store import load_dataset
+start = time.perf_counter()
+if {mode!r} == 'csv':
+    frame = pd.read_csv(os.path.join({datasets!r}, {csv!r}))
+else:
+    frame = load_dataset({store!r}, {name!r}, widen={mode!r} == 'store-widen')
+elapsed = time.perf_counter() - start
+peak = int([line for line in open('/proc/self/status') if line.startswith('VmHWM')][0].split()[1])
+print(json.dumps({{'seconds': elapsed, 'peak_kb': peak, 'frame_kb': int(frame.memory_usage(deep=True).sum()) // 1024}}))
+'''
+
+
+def measure(mode, name, datasets, store):
+    code = CHILD.format(root=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), mode=mode,
+                        datasets=datasets, csv=csv_name(name), store=store, name=name)
+    return json.loads(subprocess.check_output([sys.executable, '-c', code]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--datasets', type=str, nargs='+', default=list(SCHEMAS), choices=list(SCHEMAS))
+    parser.add_argument('--compression', type=str, default='zstd', choices=['zstd', 'lz4', 'uncompressed'])
+    parser.add_argument('--repeat', type=int, default=3)
+    # copies of every row, to see how each format grows with the table
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    store = tempfile.mkdtemp(prefix='dataset-store-')
+    datasets = DATASETS
+    if args.scale > 1:
+        datasets = tempfile.mkdtemp(prefix='datasets-')
+        for name in args.datasets:
+            frame = pd.read_csv(os.path.join(DATASETS, csv_name(name)), dtype=str, keep_default_na=False)
+            pd.concat([frame] * args.scale).to_csv(os.path.join(datasets, csv_name(name)), index=False)
+
+    print('{:>24} {:>12} {:>10} {:>10} {:>14} {:>10}'.format('dataset', 'mode', 'file KB', 'load ms',
+                                                          'peak RSS KB', 'frame KB'))
+    for name in args.datasets:
+        path = convert(datasets, name, store, args.compression)
+        sizes = {'csv': os.path.getsize(os.path.join(datasets, csv_name(name))), 'store': os.path.getsize(path)}
+        for mode in ('csv', 'store', 'store-widen'):
+            runs = [measure(mode, name, datasets, store) for _ in range(args.repeat)]
+            best = min(runs, key=lambda run: run['seconds'])
+            print('{:>24} {:>12} {:>10} {:>10.1f} {:>14} {:>10}'.format(
+                name, mode, sizes[mode.split('-')[0]] // 1024, best['seconds'] * 1e3,
+                max(run['peak_kb'] for run in runs), best['frame_kb']))
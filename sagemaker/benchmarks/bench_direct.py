@@ -0,0 +1,112 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import ExtraTreesRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from darwinex_ml.forecasting import DirectForecaster, RecursiveForecaster, fit_direct, horizon_targets
+
+WINDOW = 27
+DATASET = os.path.join(ROOT, '..', 'datasets', 'dataset_ModEstIngresos.csv')
+TEST = os.path.join(ROOT, 'ModEstIngresos', 'dataset_ModEstIngresos_test.csv')
+# stand-ins for the estimators compare_models() picks, both paths fit the same one
+ESTIMATORS = {
+    'lr': LinearRegression(),
+    'ridge': Ridge(),
+    'knn': KNeighborsRegressor(),
+    'et': ExtraTreesRegressor(n_estimators=50, random_state=0),
+}
+
+
+def fit_recursive(estimator, values):
+    lags, targets = horizon_targets(values, WINDOW, 1)
+    model = make_pipeline(StandardScaler(), clone(estimator)).fit(lags, targets[:, 0])
+    return lambda lags: float(model.predict(lags[np.newaxis])[0])
+
+
+def counted(predict, calls):
+    def wrapper(lags):
+        calls.append(1)
+        return predict(lags)
+    return wrapper
+
+
+def backtest(estimator, history, horizon, origins, step):
+    """Absolute percentage errors of each path at each step of the horizon, over rolling origins."""
+    values = history['incomes'].to_numpy()
+    last = len(history) - horizon
+    errors = {'recursive': [], 'direct': []}
+    for origin in range(last - step * (origins - 1), last + 1, step):
+        request = history.iloc[origin - WINDOW:origin + horizon].copy()
+        if (request['date'].iloc[WINDOW:].dt.weekday == 5).any():
+            # the two Saturdays of the dataset would leave a day of the horizon without a forecast
+            continue
+        actual = request['incomes'].iloc[WINDOW:].to_numpy(copy=True)
+        request.loc[request.index[WINDOW:], 'incomes'] = np.nan
+        forecasters = {'recursive': RecursiveForecaster(fit_recursive(estimator, values[:origin]), WINDOW),
+                       'direct': DirectForecaster(fit_direct(estimator, values[:origin], WINDOW, horizon).predict,
+                                                  WINDOW)}
+        for name, forecaster in forecasters.items():
+            result = forecaster.forecast(request)
+            predicted = result[result.calculated == 1]['prediction']
+            truth = pd.Series(actual, index=pd.DatetimeIndex(request['date'].iloc[WINDOW:])).loc[predicted.index]
+            errors[name].append(np.abs(predicted.to_numpy() / truth.to_numpy() - 1))
+    return {name: np.array(runs) for name, runs in errors.items()}
+
+
+def latency(estimator, history, test, repeat):
+    values = history['incomes'].to_numpy()
+    horizon = int((test['incomes'].isna() & (test['date'].dt.weekday != 5)).sum())
+    predicts = {'recursive': (RecursiveForecaster, fit_recursive(estimator, values)),
+                'direct': (DirectForecaster, fit_direct(estimator, values, WINDOW, horizon).predict)}
+    results = {}
+    for name, (forecaster, predict) in predicts.items():
+        calls = []
+        times = []
+        for _ in range(repeat):
+            del calls[:]
+            start = time.perf_counter()
+            forecaster(counted(predict, calls), WINDOW).forecast(test)
+            times.append(time.perf_counter() - start)
+        results[name] = (float(np.median(times)), len(calls))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--estimators', type=str, nargs='+', default=['lr', 'ridge', 'et'], choices=list(ESTIMATORS))
+    parser.add_argument('--origins', type=int, default=20)
+    # rows between two backtest origins
+    parser.add_argument('--step', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    history = pd.read_csv(DATASET, parse_dates=['date'])
+    test = pd.read_csv(TEST, parse_dates=['date'])
+    # the test file asks for this many days, the backtest forecasts as many from each origin
+    horizon = int((test['incomes'].isna() & (test['date'].dt.weekday != 5)).sum())
+
+    print('horizon {} days, {} origins every {} rows; latency of the test file request'.format(
+        horizon, args.origins, args.step))
+    print('{:>8} {:>10} {:>9} {:>9} {:>9} {:>9} {:>11} {:>7}'.format(
+        'model', 'path', 'MAPE', 'day 1', 'day {}'.format(horizon // 2), 'day {}'.format(horizon), 'latency ms',
+        'calls'))
+    for name in args.estimators:
+        errors = backtest(ESTIMATORS[name], history, horizon, args.origins, args.step)
+        timings = latency(ESTIMATORS[name], history, test, args.repeat)
+        for path, error in errors.items():
+            seconds, calls = timings[path]
+            print('{:>8} {:>10} {:>8.2%} {:>8.2%} {:>8.2%} {:>8.2%} {:>11.2f} {:>7}'.format(
+                name, path, error.mean(), error[:, 0].mean(), error[:, horizon // 2 - 1].mean(),
+                error[:, -1].mean(), seconds * 1000, calls))
@@ -0,0 +1,109 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from darwinex_ml.forecast_cache import ForecastCache
+from darwinex_ml.forecasting import RecursiveForecaster, horizon_targets
+
+WINDOW = 27
+DATASET = os.path.join(ROOT, '..', 'datasets', 'dataset_ModEstIngresos.csv')
+TEST = os.path.join(ROOT, 'ModEstIngresos', 'dataset_ModEstIngresos_test.csv')
+ESTIMATORS = {
+    'lr': LinearRegression(),
+    'et': ExtraTreesRegressor(n_estimators=50, random_state=0),
+}
+
+
+def fit(estimator, values):
+    lags, targets = horizon_targets(values, WINDOW, 1)
+    model = make_pipeline(StandardScaler(), estimator).fit(lags, targets[:, 0])
+    return lambda lags: float(model.predict(lags[np.newaxis])[0])
+
+
+def requests(history, test, origins, horizon, extensions):
+    """The test file request and one per origin of the dataset, each also with `extensions` more days of history.
+
+    Each list holds the variants of one request: the same forecast asked
+    with the history a dashboard had loaded at the time.
+    """
+    variants = [[test] + [pd.concat([history.iloc[-WINDOW - extra:-WINDOW], test]) for extra in extensions]]
+    for origin in np.linspace(WINDOW + max(extensions), len(history) - horizon, origins).astype(int):
+        request = history.iloc[origin - WINDOW:origin + horizon].copy()
+        request.loc[request.index[WINDOW:], 'incomes'] = np.nan
+        variants.append([request] + [pd.concat([history.iloc[origin - WINDOW - extra:origin - WINDOW], request])
+                                     for extra in extensions])
+    return variants
+
+
+def traffic(variants, count, skew, seed):
+    # a few requests are refreshed most of the time, Zipf-like
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, len(variants) + 1) ** skew
+    picks = rng.choice(len(variants), size=count, p=weights / weights.sum())
+    return [variants[pick][rng.integers(len(variants[pick]))] for pick in picks]
+
+
+def replay(model, stream, size):
+    cache = ForecastCache(size)
+    forecaster = RecursiveForecaster(model, WINDOW)
+    hits, misses = [], []
+    results = []
+    for request in stream:
+        start = time.perf_counter()
+        result, hit = cache.forecast(model, forecaster, request)
+        (hits if hit else misses).append(time.perf_counter() - start)
+        results.append(result)
+    return cache.stats(), hits, misses, results
+
+
+def ms(seconds, q):
+    return np.quantile(seconds, q) * 1000 if seconds else float('nan')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--estimator', type=str, default='lr', choices=list(ESTIMATORS))
+    parser.add_argument('--origins', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=2000)
+    # exponent of the Zipf weights of the requests, 0 is uniform
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 16, 64, 1024])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    history = pd.read_csv(DATASET, parse_dates=['date'])
+    test = pd.read_csv(TEST, parse_dates=['date'])
+    horizon = int((test['incomes'].isna() & (test['date'].dt.weekday != 5)).sum())
+    model = fit(ESTIMATORS[args.estimator], history['incomes'].to_numpy())
+    stream = traffic(requests(history, test, args.origins, horizon, [30, 90]), args.requests, args.skew, args.seed)
+
+    print('{} requests over {} forecasts (3 histories each), Zipf skew {}, {} model'.format(
+        args.requests, args.origins + 1, args.skew, args.estimator))
+    print('{:>6} {:>9} {:>9} {:>10} {:>10} {:>10} {:>10} {:>9}'.format(
+        'size', 'hit rate', 'evicted', 'hit p50', 'miss p50', 'mean ms', 'total s', 'speedup'))
+    baseline = None
+    for size in args.sizes:
+        stats, hits, misses, results = replay(model, stream, size)
+        if baseline is None:
+            baseline = results
+        else:
+            # a cached forecast is the one the model would have computed
+            for expected, result in zip(baseline, results):
+                pd.testing.assert_frame_equal(expected, result)
+        total = sum(hits) + sum(misses)
+        if size == args.sizes[0]:
+            reference = total
+        print('{:>6} {:>8.1%} {:>9} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.2f} {:>8.1f}x'.format(
+            size, stats['hit_rate'], stats['evictions'], ms(hits, 0.5), ms(misses, 0.5),
+            total / len(stream) * 1000, total, reference / total))
@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from darwinex_ml.forecasting import RecursiveForecaster
+
+WINDOW = 27
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'datasets',
+                       'dataset_ModEstIngresos.csv')
+
+
+def stub_predict(lags):
+    # Stands in for predict_model, so only the forecasting overhead is timed
+    return float(lags.mean())
+
+
+def legacy_forecast(input_data):
+    # predict_fn before the ring buffer (df.append replaced by pd.concat)
+    df = input_data.dropna()
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.set_index(df.date)
+
+    df['prediction'] = df['incomes']
+    df['calculated'] = 0
+
+    columns = ['lag_' + str(i) for i in range(1, WINDOW + 1)]
+    columns.reverse()
+
+    dates_to_predict = input_data[input_data.incomes.isnull()].date
+
+    for row in dates_to_predict:
+        if row.weekday() != 5:
+            df_temp = df[df.index < row].tail(n=WINDOW).transpose().iloc[[2]]
+            df_temp.columns = columns
+            prediction = stub_predict(df_temp[columns[::-1]].to_numpy(dtype=float)[0])
+            new_row = pd.DataFrame({'prediction': prediction, 'calculated': 1}, index=[row])
+            if not df[df.index.isin([row])].empty:
+                df.update(new_row)
+            else:
+                df = pd.concat([df, new_row])
+            df.sort_index(inplace=True)
+
+    return df
+
+
+def build_request(history, horizon):
+    dates = pd.date_range(history.date.iloc[-1] + pd.Timedelta(days=1), periods=horizon)
+    return pd.concat([history, pd.DataFrame({'date': dates, 'incomes': np.nan})], ignore_index=True)
+
+
+def time_call(fn, input_data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(input_data)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--horizons', type=int, nargs='+', default=[30, 90, 180, 365, 730])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    history = pd.read_csv(DATASET, parse_dates=['date'])
+    forecaster = RecursiveForecaster(stub_predict, WINDOW)
+
+    print('{:>8} {:>8} {:>14} {:>14} {:>10}'.format('horizon', 'steps', 'legacy us/step', 'ring us/step', 'speedup'))
+    for horizon in args.horizons:
+        input_data = build_request(history, horizon)
+        legacy_time, legacy = time_call(legacy_forecast, input_data, args.repeat)
+        ring_time, ring = time_call(forecaster.forecast, input_data, args.repeat)
+
+        steps = int(ring.calculated.sum())
+        np.testing.assert_allclose(ring.prediction.to_numpy(), legacy.prediction.to_numpy())
+        print('{:>8} {:>8} {:>14.1f} {:>14.1f} {:>9.1f}x'.format(
+            horizon, steps, legacy_time / steps * 1e6, ring_time / steps * 1e6, legacy_time / ring_time))
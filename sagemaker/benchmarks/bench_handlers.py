@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DATASETS = os.path.join(ROOT, '..', 'datasets')
+FORECAST_TEST = os.path.join(ROOT, 'ModEstIngresos', 'dataset_ModEstIngresos_test.csv')
+sys.path.insert(0, ROOT)
+
+# the model cache reads its directory when imported, model_fn must start from an empty one
+CACHE_DIR = os.environ['MODEL_CACHE_DIR'] = tempfile.mkdtemp(suffix='-model-cache')
+# every model_fn call would start a thread polling the artifacts
+os.environ['MODEL_POLL_SECONDS'] = '0'
+# the repeated payloads of a stage would time the forecast cache instead of the handlers
+os.environ['FORECAST_CACHE_SIZE'] = '0'
+
+from darwinex_ml.handlers import JSON
+from darwinex_ml.local_s3 import LocalS3
+from darwinex_ml.model_cache import set_default_s3
+from darwinex_ml.multi_model import HANDLERS, load_handler
+
+# rows of the tabular models, darwins in the basket of ModRecInvDarwin
+SIZES = [1, 100, 10000]
+# days forecast by ModEstIngresos, one predict call each; 25 is the test file as it is
+FORECAST_SIZES = [1, 25, 100]
+TABULAR = {
+    'ModClasClientes': ('dataset_ModClasClientes.csv', 'label'),
+    'ModConversion-investor': ('dataset_ModConversion_investors.csv', 'is_converted'),
+    'ModConversion-trader': ('dataset_ModConversion_traders.csv', 'is_converted'),
+}
+
+
+def tabular_payload(dataset, target, size):
+    data = pd.read_csv(os.path.join(DATASETS, dataset)).drop(columns=[target])
+    records = data.sample(n=size, replace=len(data) < size, random_state=0)
+    return records.to_json(orient='records')
+
+
+def forecast_payload(size):
+    # the known days of the test file followed by `size` days to forecast
+    data = pd.read_csv(FORECAST_TEST)
+    known = data.dropna()
+    dates = pd.date_range(pd.Timestamp(known['date'].max()) + pd.Timedelta(days=1), periods=size)
+    future = pd.DataFrame({'date': dates.strftime('%Y-%m-%d'), 'incomes': np.nan})
+    # the deploy script sends df.to_json() through the JSON serializer, a JSON string
+    return json.dumps(pd.concat([known, future], ignore_index=True).to_json())
+
+
+def basket_payload(size):
+    darwins = pd.read_csv(os.path.join(DATASETS, 'dataset_ModRecInvDarwin.csv'))['darwin'].unique()
+    basket = np.random.default_rng(0).choice(darwins, size=min(size, len(darwins)), replace=False)
+    return json.dumps({'darwins': basket.tolist()})
+
+
+def payload(name, size):
+    if name in TABULAR:
+        return tabular_payload(*TABULAR[name], size)
+    elif name == 'ModEstIngresos':
+        return forecast_payload(size)
+    return basket_payload(size)
+
+
+def timings(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, times
+
+
+def record(name, stage, size, times, payload_bytes=None):
+    return {'model': name, 'stage': stage, 'size': size, 'median_s': float(np.median(times)),
+            'min_s': float(np.min(times)), 'repeat': len(times), 'payload_bytes': payload_bytes}
+
+
+def bench_model(name, sizes, repeat):
+    sizes = sizes if name != 'ModEstIngresos' else FORECAST_SIZES
+    module = load_handler(name)
+    results = []
+
+    def cold_model_fn():
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        return module.model_fn(ROOT)
+
+    # cold downloads the artifact, warm finds it in the cache and only deserializes it
+    _, times = timings(cold_model_fn, repeat)
+    results.append(record(name, 'model_fn_cold', None, times))
+    model, times = timings(lambda: module.model_fn(ROOT), repeat)
+    results.append(record(name, 'model_fn_warm', None, times))
+
+    for size in sizes:
+        body = payload(name, size)
+        data, times = timings(lambda: module.input_fn(body, JSON), repeat)
+        results.append(record(name, 'input_fn', size, times, len(body)))
+        prediction, times = timings(lambda: module.predict_fn(data, model), repeat)
+        results.append(record(name, 'predict_fn', size, times))
+        response, times = timings(lambda: module.output_fn(prediction, JSON), repeat)
+        results.append(record(name, 'output_fn', size, times, len(response.get_data())))
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'machine': platform.machine(),
+            'cpus': os.cpu_count(), 'pandas': pd.__version__, 'numpy': np.__version__}
+
+
+def regressions(results, baseline, tolerance, min_seconds):
+    """Stages slower than in `baseline` by more than `tolerance` (relative) and `min_seconds` (absolute)."""
+    before = {(r['model'], r['stage'], r['size']): r['median_s'] for r in baseline['results']}
+    slower = []
+    for r in results:
+        old = before.get((r['model'], r['stage'], r['size']))
+        if old is not None and r['median_s'] > old * (1 + tolerance) and r['median_s'] - old > min_seconds:
+            slower.append((r, old))
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    # LocalS3 directory with the trained artifacts: <s3-root>/tfm-2021-darwinex/models/<model>/final_model.pkl
+    parser.add_argument('--s3-root', type=str, required=True)
+    parser.add_argument('--models', type=str, nargs='+', default=list(HANDLERS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', type=str, default='bench_handlers.json')
+    # results of an earlier run, e.g. of the deployed commit
+    parser.add_argument('--baseline', type=str, default=None)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    # differences under this are noise, whatever the relative change
+    parser.add_argument('--min-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    set_default_s3(LocalS3(args.s3_root))
+    results = []
+    for name in args.models:
+        results.extend(bench_model(name, args.sizes, args.repeat))
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+    print('{:>24} {:>14} {:>8} {:>12} {:>12}'.format('model', 'stage', 'size', 'median ms', 'min ms'))
+    for r in results:
+        print('{:>24} {:>14} {:>8} {:>12.3f} {:>12.3f}'.format(r['model'], r['stage'], str(r['size'] or '-'),
+                                                               r['median_s'] * 1000, r['min_s'] * 1000))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(results, json.load(f), args.tolerance, args.min_ms / 1000)
+        for r, old in slower:
+            print('REGRESSION {} {} size {}: {:.3f} ms -> {:.3f} ms'.format(
+                r['model'], r['stage'], r['size'], old * 1000, r['median_s'] * 1000))
+        if slower:
+            sys.exit(1)
+        print('No stage slower than the baseline by more than {:.0%}'.format(args.tolerance))
@@ -0,0 +1,107 @@
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# the model cache reads its directory when imported
+CACHE_DIR = os.environ['MODEL_CACHE_DIR'] = tempfile.mkdtemp(suffix='-model-cache')
+
+from darwinex_ml.hot_swap import HotSwapModel
+from darwinex_ml.latency import Histogram
+from darwinex_ml.local_s3 import LocalS3
+from darwinex_ml.model_cache import fetch_model
+
+BUCKET = 'tfm-2021-darwinex'
+KEY = 'models/bench/final_model.pkl'
+
+
+def publish(s3, version, size_mb):
+    # a synthetic model of the given size whose first value is its version
+    model = np.full(int(size_mb * (1 << 20)) // 8, float(version))
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=pickle.dumps(model, protocol=5))
+
+
+def generate_load(holder, stop, log, think):
+    while not stop.wait(think):
+        start = time.perf_counter()
+        try:
+            model = holder.current
+            version = int(model[0])
+            # some work on the model while a swap may happen
+            model[:20000].sum()
+        except Exception:
+            version = None
+        log.append((start, time.perf_counter() - start, version))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=float, default=200)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=9)
+    parser.add_argument('--interval', type=float, default=0.2)
+    # pause of each client between two requests
+    parser.add_argument('--think-ms', type=float, default=1)
+    args = parser.parse_args()
+
+    s3 = LocalS3(os.path.join(tempfile.mkdtemp(), 's3'))
+    publish(s3, 1, args.size_mb)
+
+    def load():
+        with open(fetch_model(BUCKET, KEY, s3=s3), 'rb') as f:
+            return pickle.load(f)
+
+    holder = HotSwapModel(load, BUCKET, [KEY], interval=args.interval, s3=s3)
+    stop = threading.Event()
+    logs = [[] for _ in range(args.threads)]
+    threads = [threading.Thread(target=generate_load, args=(holder, stop, log, args.think_ms / 1000))
+               for log in logs]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    # a new version a third of the way in, a truncated one at two thirds, which must not be swapped in
+    time.sleep(args.seconds / 3)
+    published = time.perf_counter()
+    publish(s3, 2, args.size_mb)
+    time.sleep(args.seconds / 3)
+    corrupted = time.perf_counter()
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=pickle.dumps(np.ones(1000))[:-10])
+    time.sleep(args.seconds / 3)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    holder.close()
+
+    requests = sorted(entry for log in logs for entry in log)
+    swapped = next((t for t, _, version in requests if version == 2), None)
+    phases = [('before', start, published), ('loading v2', published, swapped or corrupted),
+              ('after v2', swapped or corrupted, corrupted), ('corrupt v3', corrupted, float('inf'))]
+    print('{:>12} {:>9} {:>8} {:>9} {:>9} {:>9} {:>9} {:>9}'.format('phase', 'requests', 'failed', 'versions',
+                                                                   'p50 ms', 'p99 ms', 'max ms', 'req/s'))
+    for phase, begin, end in phases:
+        histogram = Histogram()
+        versions = set()
+        for t, seconds, version in requests:
+            if begin <= t < end:
+                histogram.record(seconds)
+                versions.add(version)
+                histogram.errors += version is None
+        stats = histogram.summary()
+        duration = min(end, requests[-1][0]) - begin
+        print('{:>12} {:>9} {:>8} {:>9} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.0f}'.format(
+            phase, stats['count'], stats['errors'], ','.join(str(v) for v in sorted(versions, key=str)),
+            stats['p50_ms'], stats['p99_ms'], stats['max_ms'], stats['count'] / duration if duration > 0 else 0))
+    failed = sum(version is None for _, _, version in requests)
+    print('swaps {}, failed loads {}, v2 served {} after being published, failed requests {}'.format(
+        holder.swaps, holder.failures, '{:.2f} s'.format(swapped - published) if swapped else 'never', failed))
+    # the truncated version is loaded once, not again at every poll
+    if failed or holder.swaps != 1 or holder.failures != 1:
+        sys.exit(1)
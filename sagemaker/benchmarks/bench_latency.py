@@ -0,0 +1,57 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from darwinex_ml.latency import LatencyRecorder
+
+# timed stages per request: input_fn, predict_fn and output_fn
+STAGES = 3
+
+
+def handler(input_data, content_type):
+    return input_data
+
+
+def per_call(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(b'{}', 'application/json')
+    return (time.perf_counter() - start) / calls
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=200000)
+    # results of bench_handlers.py, the overhead is compared with the measured request times
+    parser.add_argument('--handlers-json', type=str, default=None)
+    args = parser.parse_args()
+
+    recorder = LatencyRecorder('bench', interval=0)
+    timed = recorder.timed('input_fn', payload='request')(handler)
+
+    def with_block(input_data, content_type):
+        with recorder.time('predict_step'):
+            return handler(input_data, content_type)
+
+    base = min(per_call(handler, args.calls) for _ in range(3))
+    overhead = min(per_call(timed, args.calls) for _ in range(3)) - base
+    block = min(per_call(with_block, args.calls) for _ in range(3)) - base
+    print('decorator {:.2f} us per call, time() block {:.2f} us'.format(overhead * 1e6, block * 1e6))
+    print(json.dumps(recorder.snapshot()['input_fn']))
+
+    if args.handlers_json:
+        with open(args.handlers_json) as f:
+            results = json.load(f)['results']
+        requests = {}
+        for r in results:
+            if r['size'] is not None:
+                requests.setdefault((r['model'], r['size']), 0.0)
+                requests[(r['model'], r['size'])] += r['median_s']
+        print('{:>24} {:>8} {:>12} {:>10}'.format('model', 'size', 'request ms', 'overhead'))
+        for (model, size), seconds in sorted(requests.items()):
+            print('{:>24} {:>8} {:>12.3f} {:>9.3%}'.format(model, size, seconds * 1000,
+                                                           STAGES * overhead / seconds))
@@ -0,0 +1,135 @@
+import argparse
+import importlib
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DATASETS = os.path.join(ROOT, '..', 'datasets')
+sys.path.insert(0, ROOT)
+
+from darwinex_ml.mapped import convert, load_artifact, mapped_bytes
+
+FORMATS = ('pkl', 'mmap')
+# imported by each worker before timing the load, as the handler scripts do
+PRELOAD = ['pandas', 'sklearn.ensemble', 'sklearn.pipeline']
+
+
+def build_artifacts(directory, trees, min_support, arrays_mb):
+    # .pkl artifacts like the ones training publishes, from the repository datasets
+    from sklearn.ensemble import RandomForestClassifier
+
+    from darwinex_ml.itemsets import mine_rules
+
+    paths = {}
+    data = pd.read_csv(os.path.join(DATASETS, 'dataset_ModClasClientes.csv')).drop(columns=['userid'])
+    forest = RandomForestClassifier(n_estimators=trees, random_state=0).fit(data.drop(columns=['label']),
+                                                                             data['label'])
+    paths['forest'] = os.path.join(directory, 'forest.pkl')
+    joblib.dump(forest, paths['forest'])
+
+    rules = mine_rules(os.path.join(DATASETS, 'dataset_ModRecInvDarwin.csv'), 'orderid', 'darwin',
+                       min_support=min_support)
+    paths['rules'] = os.path.join(directory, 'rules.pkl')
+    rules.to_pickle(paths['rules'])
+
+    # coefficient matrices, the best case: nothing but arrays
+    coefficients = {'coef': np.random.default_rng(0).random((int(arrays_mb * (1 << 20)) // 8 // 1000, 1000))}
+    paths['coefficients'] = os.path.join(directory, 'coefficients.pkl')
+    joblib.dump(coefficients, paths['coefficients'])
+    return paths
+
+
+def memory():
+    # kB of the process: resident anonymous memory, resident file pages (the mappings) and proportional set size
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('RssAnon', 'RssFile')):
+                name, value = line.split(':')
+                values[name] = int(value.split()[0])
+    return values
+
+
+def pss(pid):
+    with open('/proc/{}/smaps_rollup'.format(pid)) as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1])
+    return 0
+
+
+def touch(model):
+    # reads every array once, like the first requests do
+    pickle.dumps(model, protocol=5, buffer_callback=lambda buffer: zlib.crc32(buffer.raw()) and False)
+
+
+def child(path):
+    for module in PRELOAD:
+        importlib.import_module(module)
+    before = memory()
+    start = time.perf_counter()
+    model = load_artifact(path)
+    seconds = time.perf_counter() - start
+    touch(model)
+    after = memory()
+    print('{} {} {}'.format(seconds, after['RssAnon'] - before['RssAnon'], after['RssFile'] - before['RssFile']),
+          flush=True)
+    # the parent reads the PSS of every worker before they exit
+    sys.stdin.read()
+
+
+def measure(path, workers):
+    processes = [subprocess.Popen([sys.executable, __file__, '--child', path], stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE, text=True) for _ in range(workers)]
+    results = [[float(value) for value in process.stdout.readline().split()] for process in processes]
+    total_pss = sum(pss(process.pid) for process in processes)
+    for process in processes:
+        process.communicate('')
+    seconds, anon, file = np.median(results, axis=0)
+    return seconds, anon, file, total_pss
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    # real .pkl artifacts (final_model.pkl, compiled_model.pkl...), instead of the ones built from the datasets
+    parser.add_argument('--artifacts', type=str, nargs='*', default=None)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--trees', type=int, default=300)
+    parser.add_argument('--min-support', type=float, default=0.02)
+    parser.add_argument('--arrays-mb', type=float, default=200)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        sys.exit(0)
+
+    directory = tempfile.mkdtemp()
+    if args.artifacts:
+        paths = {os.path.basename(path): path for path in args.artifacts}
+    else:
+        paths = build_artifacts(directory, args.trees, args.min_support, args.arrays_mb)
+
+    print('{} workers per artifact, each loading it; load time with the file in the page cache'.format(args.workers))
+    # 'mapped' is the share of the array bytes still mapped once loaded, publish_converted() skips the others
+    print('{:>14} {:>5} {:>9} {:>10} {:>11} {:>11} {:>13} {:>7}'.format('artifact', 'fmt', 'MB', 'load ms',
+                                                                        'anon MB', 'file MB', 'total PSS MB', 'mapped'))
+    for name, path in paths.items():
+        mapped = convert(path, os.path.join(directory, os.path.splitext(os.path.basename(path))[0] + '.mmap'))
+        kept, total = mapped_bytes(mapped)
+        for fmt, artifact in zip(FORMATS, (path, mapped)):
+            # a first load brings the file into the page cache
+            measure(artifact, 1)
+            seconds, anon, file, total_pss = measure(artifact, args.workers)
+            print('{:>14} {:>5} {:>9.1f} {:>10.1f} {:>11.1f} {:>11.1f} {:>13.1f} {:>7}'.format(
+                name, fmt, os.path.getsize(artifact) / (1 << 20), seconds * 1000, anon / 1024, file / 1024,
+                total_pss / 1024, '{:.0%}'.format(kept / total if total else 1) if artifact == mapped else '-'))
@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+from pycaret.classification import compare_models, pull, setup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from darwinex_ml.model_zoo import compare_models_parallel
+
+DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'datasets')
+
+SETUPS = {
+    'ModClasClientes': dict(dataset='dataset_ModClasClientes.csv', sort='Accuracy',
+                            setup=dict(normalize=True, target='label', ignore_features=['userid'])),
+    'ModConversion-trader': dict(dataset='dataset_ModConversion_traders.csv', sort='Recall',
+                                 setup=dict(normalize=True, target='is_converted', categorical_features=['user_country'],
+                                            fix_imbalance=True)),
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', type=str, default='ModClasClientes', choices=list(SETUPS))
+    parser.add_argument('--cores', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--skip-sequential', action='store_true')
+    args = parser.parse_args()
+
+    spec = SETUPS[args.model]
+    data = pd.read_csv(os.path.join(DATASETS, spec['dataset']))
+    setup(data, silent=True, html=False, verbose=False, session_id=123, **spec['setup'])
+
+    baseline = None
+    if not args.skip_sequential:
+        start = time.perf_counter()
+        compare_models(sort=spec['sort'], verbose=False)
+        baseline = time.perf_counter() - start
+        print('compare_models: {:.1f} s, best {}'.format(baseline, pull().index[0]))
+        print(pull())
+
+    print('{:>6} {:>10} {:>10} {:>12}'.format('cores', 'seconds', 'speedup', 'best'))
+    one_core = None
+    for cores in args.cores:
+        start = time.perf_counter()
+        best_id, leaderboard = compare_models_parallel(sort=spec['sort'], n_jobs=cores)
+        elapsed = time.perf_counter() - start
+        one_core = one_core or elapsed
+        print('{:>6} {:>10.1f} {:>9.2f}x {:>12}'.format(cores, elapsed, (baseline or one_core) / elapsed, best_id))
+    print(leaderboard)
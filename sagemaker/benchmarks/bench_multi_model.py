@@ -0,0 +1,79 @@
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# the model cache reads its directory when imported
+CACHE_DIR = os.environ['MODEL_CACHE_DIR'] = tempfile.mkdtemp(suffix='-model-cache')
+
+from darwinex_ml.local_s3 import LocalS3
+from darwinex_ml.model_cache import fetch_model, set_default_s3
+from darwinex_ml.multi_model import HANDLERS, ModelRouter, handler_loaders
+
+BUCKET = 'tfm-2021-darwinex'
+
+
+def synthetic_loaders(s3, sizes_mb, cache_dir):
+    # a model per handler, just an array of the given size behind the same S3 fetch as the real ones
+    loaders = {}
+    for name, size_mb in zip(HANDLERS, sizes_mb):
+        key = 'models/{}/final_model.pkl'.format(name)
+        s3.put_object(Bucket=BUCKET, Key=key, Body=pickle.dumps(np.ones(int(size_mb * (1 << 20)) // 8)))
+
+        def load(key=key):
+            with open(fetch_model(BUCKET, key, cache_dir=cache_dir, s3=s3), 'rb') as f:
+                return pickle.load(f)
+
+        loaders[name] = load
+    return loaders
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-mb', type=float, default=300)
+    # sizes of the synthetic models, in HANDLERS order
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[150, 120, 120, 60, 20])
+    # LocalS3 directory (<root>/<bucket>/models/...) with the real artifacts, loads them with the handler scripts
+    parser.add_argument('--s3-root', type=str, default=None)
+    parser.add_argument('--requests', type=int, default=2000)
+    # request share of each model falls as 1 / rank ** skew
+    parser.add_argument('--skew', type=float, default=1.2)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    s3 = LocalS3(args.s3_root or os.path.join(work_dir, 's3'))
+    set_default_s3(s3)
+    if args.s3_root:
+        loaders = handler_loaders()
+    else:
+        loaders = synthetic_loaders(s3, args.sizes_mb, CACHE_DIR)
+    router = ModelRouter(loaders, max_bytes=int(args.max_mb * (1 << 20)))
+
+    names = list(loaders)
+    weights = 1 / np.arange(1, len(names) + 1) ** args.skew
+    requests = np.random.default_rng(0).choice(len(names), size=args.requests, p=weights / weights.sum())
+
+    latencies = {True: [], False: []}
+    for i in requests:
+        hits = router.counters[names[i]]['hits']
+        start = time.perf_counter()
+        router.get(names[i])
+        latencies[router.counters[names[i]]['hits'] > hits].append(time.perf_counter() - start)
+
+    print('{:>24} {:>8} {:>8} {:>10} {:>8} {:>10} {:>8}'.format('model', 'requests', 'loads', 'evictions', 'MB',
+                                                                'load s', 'loaded'))
+    for name, stats in router.stats().items():
+        print('{:>24} {:>8} {:>8} {:>10} {:>8.1f} {:>10.2f} {:>8}'.format(
+            name, stats['loads'] + stats['hits'], stats['loads'], stats['evictions'], stats['bytes'] / (1 << 20),
+            stats['load_seconds'], str(stats['loaded'])))
+    print('hit rate {:.1%}, resident {:.0f} MB of {:.0f} MB'.format(
+        len(latencies[True]) / len(requests), router.loaded_bytes() / (1 << 20), args.max_mb))
+    for hit, values in latencies.items():
+        if values:
+            print('{:>6} median {:.3f} ms'.format('hit' if hit else 'load', np.median(values) * 1000))
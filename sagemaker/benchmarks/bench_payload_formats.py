@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from darwinex_ml.handlers import ARROW, JSON, NPY, decode_records, encode_frame
+
+DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'datasets')
+
+
+def encode_request(records, content_type):
+    if content_type == JSON:
+        return records.to_json(orient='records').encode()
+    return encode_frame(records, content_type)
+
+
+def encode_response(prediction, content_type):
+    # output_fn uses prediction.to_json() for application/json
+    if content_type == JSON:
+        return prediction.to_json().encode()
+    return encode_frame(prediction, content_type)
+
+
+def round_trip(payload, content_type, repeat):
+    best_decode = best_encode = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = decode_records(payload, content_type)
+        decoded = time.perf_counter()
+        # what predict_model attaches to the input
+        prediction = frame.assign(Label=0, Score=0.5)
+        encoded_at = time.perf_counter()
+        response = encode_response(prediction, content_type)
+        end = time.perf_counter()
+        best_decode = min(best_decode, decoded - start)
+        best_encode = min(best_encode, end - encoded_at)
+    return best_decode, best_encode, len(response)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--datasets', type=str, nargs='+',
+                        default=['dataset_ModClasClientes.csv', 'dataset_ModConversion_traders.csv'])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{:<36} {:>6} {:<38} {:>10} {:>10} {:>11} {:>11}'.format(
+        'dataset', 'rows', 'content type', 'req bytes', 'resp bytes', 'decode ms', 'encode ms'))
+    for dataset in args.datasets:
+        data = pd.read_csv(os.path.join(DATASETS, dataset))
+        for size in args.sizes:
+            records = data.sample(n=size, replace=len(data) < size, random_state=0).reset_index(drop=True)
+            for content_type in (JSON, ARROW, NPY):
+                payload = encode_request(records, content_type)
+                decode_time, encode_time, response_size = round_trip(payload, content_type, args.repeat)
+                print('{:<36} {:>6} {:<38} {:>10} {:>10} {:>11.3f} {:>11.3f}'.format(
+                    dataset, size, content_type, len(payload), response_size, decode_time * 1e3, encode_time * 1e3))
@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from darwinex_ml.itemsets import mine_rules
+from darwinex_ml.mapped import dump, load
+from darwinex_ml.rules import RecommendationTable, RuleIndex
+
+DATASET = os.path.join(ROOT, '..', 'datasets', 'dataset_ModRecInvDarwin.csv')
+
+
+def baskets(seed):
+    """The basket of each order, and one to three darwins drawn from each order like most requests carry."""
+    orders = pd.read_csv(DATASET, dtype=str).groupby('orderid')['darwin'].unique()
+    rng = np.random.default_rng(seed)
+    sampled = [list(rng.choice(darwins, size=min(len(darwins), rng.integers(1, 4)), replace=False))
+               for darwins in orders]
+    return {'orders': [list(darwins) for darwins in orders], 'sampled 1-3': sampled}
+
+
+def ranking(index, darwins, sort_by):
+    # the step of recommend() the table replaces, without building the response frame
+    ranked = index.table.get(darwins, sort_by) if index.table is not None else None
+    return ranked if ranked is not None else index.rank(darwins, sort_by)
+
+
+def replay(index, requests, sort_by):
+    hits = 0
+    found = 0
+    seconds = np.empty((len(requests), 2))
+    for i, darwins in enumerate(requests):
+        start = time.perf_counter()
+        ranking(index, darwins, sort_by)
+        seconds[i, 0] = time.perf_counter() - start
+        start = time.perf_counter()
+        result, hit = index.recommend(darwins, top_k=10, sort_by=sort_by)
+        seconds[i, 1] = time.perf_counter() - start
+        hits += hit
+        found += len(result) > 0
+    return hits / len(requests), found / len(requests), np.median(seconds, axis=0) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--min-support', type=float, nargs='+', default=[0.1, 0.05, 0.02])
+    parser.add_argument('--sort-by', type=str, default='lift')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    replays = baskets(args.seed)
+    directory = tempfile.mkdtemp()
+    print('top 10 by {}; {} orders replayed'.format(args.sort_by, len(replays['orders'])))
+    # p50 of the ranking alone and of the whole recommend() call, with the table and filtering the rules
+    print('{:>8} {:>7} {:>8} {:>6} {:>8} {:>12} {:>9} {:>7} {:>13} {:>13}'.format(
+        'support', 'rules', 'baskets', 'MB', 'build s', 'replay', 'hit rate', 'found', 'table us',
+        'filter us'))
+    for min_support in args.min_support:
+        rules = mine_rules(DATASET, 'orderid', 'darwin', min_support=min_support)
+        start = time.perf_counter()
+        table = RecommendationTable(RuleIndex(rules))
+        build = time.perf_counter() - start
+        path = dump(table, os.path.join(directory, 'recommendations.mmap'))
+        # the handlers load the table published by training
+        index = RuleIndex(rules, load(path))
+        plain = RuleIndex(rules)
+        for name, requests in replays.items():
+            hit_rate, found, with_table = replay(index, requests, args.sort_by)
+            _, _, without_table = replay(plain, requests, args.sort_by)
+            for darwins in requests[:200]:
+                # a hit returns what filtering the rules does
+                pd.testing.assert_frame_equal(index.recommend(darwins, sort_by=args.sort_by)[0],
+                                              plain.recommend(darwins, sort_by=args.sort_by)[0])
+            print(('{:>8} {:>7} {:>8} {:>6.2f} {:>8.2f} {:>12} {:>8.1%} {:>6.1%}' + ' {:>6.1f}' * 4).format(
+                min_support, len(rules), len(table), os.path.getsize(path) / (1 << 20), build, name, hit_rate,
+                found, *with_table, *without_table))
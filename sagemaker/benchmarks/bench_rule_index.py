@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from darwinex_ml.rules import RuleIndex
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'datasets',
+                       'dataset_ModRecInvDarwin.csv')
+
+
+def synthetic_rules(darwins, n_rules, rng):
+    # Rule tables with the shape of create_model() output, `n_rules` long
+    sizes = rng.integers(1, 4, size=n_rules)
+    antecedents = [frozenset(rng.choice(darwins, size=size, replace=False)) for size in sizes]
+    consequents = [frozenset(rng.choice(darwins, size=1)) for _ in range(n_rules)]
+    return pd.DataFrame({
+        'antecedents': antecedents,
+        'consequents': consequents,
+        'support': rng.random(n_rules),
+        'confidence': rng.random(n_rules),
+        'lift': rng.random(n_rules) * 5,
+    })
+
+
+def latencies(fn, queries):
+    result = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        fn(query)
+        result[i] = time.perf_counter() - start
+    return result * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rules', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    darwins = pd.read_csv(DATASET, usecols=['darwin']).darwin.unique()
+    queries = [list(rng.choice(darwins, size=size, replace=False)) for size in rng.integers(1, 3, size=args.queries)]
+
+    print('{:>8} {:>12} {:>12} {:>12} {:>12}'.format('rules', 'scan p50', 'scan p99', 'index p50', 'index p99'))
+    for n_rules in args.rules:
+        rules = synthetic_rules(darwins, n_rules, rng)
+        index = RuleIndex(rules)
+
+        def scan(darwins):
+            return rules[rules.antecedents.map(set(darwins).issubset)]
+
+        for query in queries[:20]:
+            pd.testing.assert_frame_equal(scan(query), index.query(query))
+
+        scan_us = latencies(scan, queries)
+        index_us = latencies(index.query, queries)
+        print('{:>8} {:>12.1f} {:>12.1f} {:>12.1f} {:>12.1f}'.format(
+            n_rules, *np.percentile(scan_us, [50, 99]), *np.percentile(index_us, [50, 99])))
@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from darwinex_ml.itemsets import mine_rules
+from darwinex_ml.mapped import dump, load_artifact
+from darwinex_ml.rules import RuleIndex, RuleTable
+
+DATASET = os.path.join(ROOT, '..', 'datasets', 'dataset_ModRecInvDarwin.csv')
+# the .pkl of to_pickle(), the same DataFrame mapped (final_model.mmap until now) and the RuleTable mapped
+FORMATS = ('pkl', 'frame mmap', 'table mmap')
+
+
+def memory():
+    # kB of resident anonymous memory and resident file pages (the mappings) of the process
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('RssAnon', 'RssFile')):
+                name, value = line.split(':')
+                values[name] = int(value.split()[0])
+    return values
+
+
+def child(path, baskets):
+    # what load_serving_model() does with each artifact, then the JSON responses of some baskets (RuleRows)
+    import gc
+
+    gc.collect()
+    before = memory()
+    start = time.perf_counter()
+    rules = pd.read_pickle(path) if path.endswith('.pkl') else load_artifact(path)
+    loaded = time.perf_counter() - start
+    after_load = memory()
+    index = RuleIndex(rules)
+    ready = time.perf_counter() - start
+    after_index = memory()
+
+    seconds = []
+    for darwins in json.loads(baskets):
+        start = time.perf_counter()
+        index.select(darwins).to_json()
+        seconds.append(time.perf_counter() - start)
+    print(json.dumps({'load': loaded, 'ready': ready, 'json_us': float(np.median(seconds)) * 1e6,
+                      'load_anon': after_load['RssAnon'] - before['RssAnon'],
+                      'ready_anon': after_index['RssAnon'] - before['RssAnon'],
+                      'file': after_index['RssFile'] - before['RssFile']}))
+
+
+def measure(path, baskets, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, __file__, '--child', path, '--baskets', baskets],
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+
+
+def frame_json(rules, index, baskets):
+    # the response before the RuleTable: the DataFrame rows of the rules serialized by pandas
+    seconds = []
+    for darwins in baskets:
+        start = time.perf_counter()
+        rules.iloc[index.match(darwins)].to_json()
+        seconds.append(time.perf_counter() - start)
+    return float(np.median(seconds)) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--baskets', type=str, default='[]', help=argparse.SUPPRESS)
+    parser.add_argument('--min-support', type=float, nargs='+', default=[0.1, 0.05, 0.02])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.baskets)
+        sys.exit(0)
+
+    directory = tempfile.mkdtemp()
+    rng = np.random.default_rng(args.seed)
+    print('fresh process per load; JSON p50 of {} baskets of one or two darwins, the DataFrame row is the '
+          'response built with pandas as before'.format(args.queries))
+    print('{:>8} {:>7} {:>11} {:>7} {:>8} {:>8} {:>9} {:>9} {:>8} {:>8}'.format(
+        'support', 'rules', 'format', 'MB', 'load ms', 'anon MB', 'ready ms', 'ready MB', 'file MB', 'JSON us'))
+    # 'ready' is the RuleIndex built as well, the DataFrame formats are encoded into a RuleTable by it
+    for min_support in args.min_support:
+        rules = mine_rules(DATASET, 'orderid', 'darwin', min_support=min_support)
+        table = RuleTable.from_rules(rules)
+        # a RuleTable gives back the DataFrame it encodes
+        pd.testing.assert_frame_equal(table.to_frame(), rules, check_exact=True)
+
+        darwins = sorted(set().union(*rules['antecedents']))
+        baskets = [list(rng.choice(darwins, size=size, replace=False)) for size in rng.integers(1, 3, args.queries)]
+        paths = dict(zip(FORMATS, (os.path.join(directory, 'rules.pkl'), os.path.join(directory, 'frame.mmap'),
+                                   os.path.join(directory, 'table.mmap'))))
+        rules.to_pickle(paths['pkl'])
+        dump(rules, paths['frame mmap'])
+        dump(table, paths['table mmap'])
+        before = frame_json(rules, RuleIndex(table), baskets)
+        for fmt, path in paths.items():
+            result = measure(path, json.dumps(baskets), args.repeat)
+            print('{:>8} {:>7} {:>11} {:>7.2f} {:>8.1f} {:>8.1f} {:>9.1f} {:>9.1f} {:>8.1f} {:>8.1f}'.format(
+                min_support, len(rules), fmt, os.path.getsize(path) / (1 << 20), result['load'] * 1000,
+                result['load_anon'] / 1024, result['ready'] * 1000, result['ready_anon'] / 1024,
+                result['file'] / 1024, result['json_us']))
+        print('{:>8} {:>7} {:>11} {:>63.1f}'.format(min_support, len(rules), 'DataFrame', before))
@@ -0,0 +1,54 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from darwinex_ml.dataset_store import dataset_name, load_dataset
+from darwinex_ml.setup_cache import cached_setup
+
+DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'datasets')
+
+SETUPS = {
+    'ModClasClientes': dict(dataset='dataset_ModClasClientes.csv',
+                            setup=dict(normalize=True, target='label', ignore_features=['userid'])),
+    'ModConversion-investor': dict(dataset='dataset_ModConversion_investors.csv',
+                                   setup=dict(normalize=True, target='is_converted',
+                                              categorical_features=['user_country'], fix_imbalance=True)),
+    'ModConversion-trader': dict(dataset='dataset_ModConversion_traders.csv',
+                                 setup=dict(normalize=True, target='is_converted',
+                                            categorical_features=['user_country'], fix_imbalance=True)),
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models', type=str, nargs='+', default=list(SETUPS), choices=list(SETUPS))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix='setup-cache-')
+    print('{:>24} {:>12} {:>12} {:>10}'.format('model', 'setup (s)', 'cached (s)', 'speedup'))
+    try:
+        for name in args.models:
+            spec = SETUPS[name]
+            data = load_dataset(DATASETS, dataset_name(spec['dataset']), widen=True)
+            kwargs = dict(spec['setup'], silent=True, html=False, verbose=False, session_id=123)
+
+            start = time.perf_counter()
+            hit = cached_setup('classification', data, cache_dir=cache_dir, **kwargs)
+            miss_time = time.perf_counter() - start
+            assert not hit
+
+            hit_times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                hit = cached_setup('classification', data, cache_dir=cache_dir, **kwargs)
+                hit_times.append(time.perf_counter() - start)
+                assert hit
+            hit_time = min(hit_times)
+            print('{:>24} {:>12.2f} {:>12.3f} {:>9.1f}x'.format(name, miss_time, hit_time, miss_time / hit_time))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
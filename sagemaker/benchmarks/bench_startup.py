@@ -0,0 +1,85 @@
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from darwinex_ml.multi_model import HANDLERS
+from darwinex_ml.orchestrator import load_specs
+
+# what each endpoint imported before the handlers were split from the training scripts: the training scripts
+# now import pycaret only when they train
+TRAINING = {spec['name']: 'pycaret.' + spec['module'] for spec in load_specs()}
+
+
+def rss():
+    # kB resident in this process
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS'):
+                return int(line.split()[1])
+    return 0
+
+
+def child(path):
+    before = rss()
+    start = time.perf_counter()
+    try:
+        if path.endswith('.py'):
+            spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], path)
+            spec.loader.exec_module(importlib.util.module_from_spec(spec))
+        else:
+            importlib.import_module(path)
+        error = None
+    except Exception as ex:
+        error = '{}: {}'.format(type(ex).__name__, ex)
+    print(json.dumps({'seconds': time.perf_counter() - start, 'rss_kb': rss() - before, 'error': error}))
+
+
+def measure(path, repeat):
+    # a new interpreter each time, like a worker starting
+    runs = []
+    for _ in range(repeat):
+        target = os.path.join(ROOT, path) if path.endswith('.py') else path
+        output = subprocess.run([sys.executable, __file__, '--child', target], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+        if runs[-1]['error']:
+            return runs[-1]
+    return {'seconds': float(np.median([run['seconds'] for run in runs])),
+            'rss_kb': float(np.median([run['rss_kb'] for run in runs])), 'error': None}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--models', type=str, nargs='*', default=list(HANDLERS))
+    parser.add_argument('--output', type=str, default=None, help='JSON file with the results')
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        sys.exit(0)
+
+    results = []
+    print('{:>24} {:>9} {:>10} {:>9}'.format('model', 'module', 'import ms', 'RSS MB'))
+    for name in args.models:
+        for module, path in (('serve', HANDLERS[name]), ('training', TRAINING[name])):
+            result = dict(measure(path, args.repeat), model=name, module=module)
+            results.append(result)
+            if result['error']:
+                print('{:>24} {:>9} {}'.format(name, module, result['error']))
+            else:
+                print('{:>24} {:>9} {:>10.0f} {:>9.1f}'.format(name, module, result['seconds'] * 1000,
+                                                               result['rss_kb'] / 1024))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
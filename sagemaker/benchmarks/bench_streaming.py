@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+DATASETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'datasets')
+
+MODELS = {
+    'ModClasClientes': dict(dataset='dataset_ModClasClientes.csv', target='label',
+                            kwargs=dict(ignore_features=['userid'])),
+    'ModConversion-trader': dict(dataset='dataset_ModConversion_traders.csv', target='is_converted',
+                                 kwargs=dict(categorical_features=['user_country'], balance=True)),
+}
+
+# a fresh interpreter per run, so the peak RSS belongs to that run only
+CHILD = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from darwinex_ml.streaming import train_streaming
+start = time.perf_counter()
+if {mode!r} == 'full':
+    frame = pd.read_csv({path!r})
+    pipeline, scores = train_streaming({path!r}, {target!r}, {estimator!r}, chunksize=len(frame), **{kwargs!r})
+else:
+    pipeline, scores = train_streaming({path!r}, {target!r}, {estimator!r}, chunksize={chunksize}, **{kwargs!r})
+elapsed = time.perf_counter() - start
+peak = int([line for line in open('/proc/self/status') if line.startswith('VmHWM')][0].split()[1])
+print(json.dumps({{'seconds': elapsed, 'peak_kb': peak, 'accuracy': float(scores['Accuracy'].iloc[0])}}))
+'''
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', type=str, default='ModConversion-trader', choices=list(MODELS))
+    parser.add_argument('--estimator', type=str, default='sgd')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--chunksize', type=int, default=20000)
+    args = parser.parse_args()
+
+    spec = MODELS[args.model]
+    source = pd.read_csv(os.path.join(DATASETS, spec['dataset']), dtype=str, keep_default_na=False)
+    directory = tempfile.mkdtemp(prefix='streaming-')
+    print('{:>6} {:>10} {:>10} {:>10} {:>14} {:>10}'.format('scale', 'rows', 'mode', 'seconds', 'peak RSS KB',
+                                                          'accuracy'))
+    for scale in args.scales:
+        path = os.path.join(directory, '{}x.csv'.format(scale))
+        pd.concat([source] * scale).to_csv(path, index=False)
+        # 'full' reads everything at once, as setup() needs today
+        for mode in ('full', 'streaming'):
+            code = CHILD.format(root=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), mode=mode,
+                                path=path, target=spec['target'], estimator=args.estimator,
+                                chunksize=args.chunksize, kwargs=spec['kwargs'])
+            run = json.loads(subprocess.check_output([sys.executable, '-c', code]))
+            print('{:>6} {:>10} {:>10} {:>10.1f} {:>14} {:>10.4f}'.format(scale, len(source) * scale, mode,
+                                                                          run['seconds'], run['peak_kb'],
+                                                                          run['accuracy']))
+        os.remove(path)
@@ -0,0 +1,245 @@
+import numpy as np
+
+from darwinex_ml.mapped import dump, load_published
+
+# pycaret steps that change nothing when predicting
+_NO_OP = {'Empty', 'Clean_Colum_Names'}
+# predict_model() rounds the scores to 4 decimals
+ROUND = 4
+
+
+class NotCompilable(ValueError):
+    pass
+
+
+class CompiledModel:
+    """Preprocessing of a finalized pycaret pipeline replayed on NumPy arrays.
+
+    Rows are 2-D arrays with the features in `columns` order; numeric
+    features are cast, imputed and scaled as one block and the categorical
+    ones are one-hot encoded with the levels seen in training. Predicting
+    needs neither pycaret nor pandas.
+    """
+
+    def __init__(self, estimator, columns, numeric, categorical, dtype, keep, mean=None, scale=None, labels=None,
+                 classification=True):
+        self.estimator = estimator
+        self.columns = list(columns)
+        # (position in columns, learned dtype, fill value)
+        self.numeric = numeric
+        # (position in columns, fill value, [(known levels, replacement)], levels in one-hot order)
+        self.categorical = categorical
+        self.dtype = np.dtype(dtype)
+        self.keep = np.asarray(keep, dtype=np.intp)
+        self.mean = mean
+        self.scale = scale
+        self.labels = labels
+        self.classification = classification
+        self._offsets = np.cumsum([len(numeric)] + [len(levels) for _, _, _, levels in categorical])
+        self._index = [{level: i for i, level in enumerate(levels)} for _, _, _, levels in categorical]
+
+    def _code(self, j, level):
+        # position of `level` in the one-hot block of categorical feature j, -1 when unknown
+        position, _, rules, _ = self.categorical[j]
+        for known, replacement in rules:
+            if level not in known:
+                if replacement is None:
+                    raise ValueError("Column '{}' contains level '{}' which was not present in train data."
+                                     .format(self.columns[position], level))
+                level = replacement
+        return self._index[j].get(level, -1)
+
+    def values(self, frame):
+        """Array of `frame` in column order, object only when there are categorical features."""
+        return frame[self.columns].to_numpy(dtype=object if self.categorical else np.float64)
+
+    def transform(self, X):
+        X = np.asarray(X)
+        n = len(X)
+        out = np.zeros((n, self._offsets[-1]), dtype=self.dtype)
+
+        for j, (position, kind, fill) in enumerate(self.numeric):
+            column = X[:, position].astype(np.float64)
+            if kind.kind == 'i' and not np.isfinite(column).all():
+                raise ValueError('Cannot convert non-finite values in {} to integer'.format(self.columns[position]))
+            # cast to the learned type first, the imputer output has the type of the whole numeric block
+            column = column.astype(kind).astype(self.dtype)
+            # DataTypes_Auto_infer turns inf into NaN and the imputer fills both
+            column[~np.isfinite(column)] = fill
+            out[:, j] = column
+        if self.mean is not None:
+            numeric = out[:, :len(self.numeric)]
+            numeric -= self.mean
+            numeric /= self.scale
+
+        for j, (position, fill, _, _) in enumerate(self.categorical):
+            raw = X[:, position]
+            levels = raw.astype(str).astype(object)
+            # the imputer only counts NaN as missing, None becomes 'None' like in pycaret
+            levels[raw != raw] = fill
+            uniques, inverse = np.unique(levels, return_inverse=True)
+            codes = np.array([self._code(j, level) for level in uniques], dtype=np.intp)[inverse.ravel()]
+            rows = np.flatnonzero(codes >= 0)
+            out[rows, self._offsets[j] + codes[rows]] = 1
+        return out[:, self.keep] if len(self.keep) < out.shape[1] else out
+
+    def predict(self, X):
+        """Labels of the rows of `X`, decoded like predict_model() does."""
+        return self._decode(np.nan_to_num(self.estimator.predict(self.transform(X))))
+
+    def predict_proba(self, X):
+        return self.estimator.predict_proba(self.transform(X))
+
+    def _decode(self, pred):
+        if not self.classification:
+            return pred
+        if self.labels is not None:
+            pred = np.array([self.labels.get(int(p), p) for p in pred], dtype=object)
+        try:
+            return pred.astype(int)
+        except (TypeError, ValueError):
+            return pred
+
+    def predict_frame(self, frame):
+        """Same output as predict_model(pipeline, frame): the input plus Label and Score."""
+        X = self.transform(self.values(frame))
+        pred = np.nan_to_num(self.estimator.predict(X))
+        result = frame.copy()
+        result['Label'] = self._decode(pred)
+        if self.classification and hasattr(self.estimator, 'predict_proba'):
+            score = self.estimator.predict_proba(X)
+            result['Score'] = np.round(score[np.arange(len(pred)), pred.astype(int)], ROUND)
+        return result
+
+
+def _steps(pipeline):
+    steps = [(name, step) for name, step in pipeline.steps if step not in (None, 'passthrough')]
+    if not steps or steps[0][0] != 'dtypes' or steps[-1][0] != 'trained_model':
+        raise NotCompilable('not a pipeline saved by save_model()')
+    return steps[0][1], steps[1:-1], steps[-1][1]
+
+
+def compile_pipeline(pipeline):
+    """CompiledModel computing the same predictions as `pipeline`, a model loaded with load_model().
+
+    Raises NotCompilable for steps other than the type inference, simple
+    imputation, unknown level handling, z-score scaling, one-hot encoding
+    and perfect collinearity removal used by the setup() of the models.
+    """
+    dtypes, steps, estimator = _steps(pipeline)
+    if type(dtypes).__name__ != 'DataTypes_Auto_infer':
+        raise NotCompilable('{} is not supported'.format(type(dtypes).__name__))
+    learned = dtypes.learned_dtypes
+    columns = [column for column in dtypes.final_training_columns if column not in dtypes.id_columns]
+    numeric_columns = [column for column in columns if learned[column].name in ('float32', 'int64')]
+    categorical_columns = [column for column in columns if learned[column].name == 'object']
+    other = set(columns) - set(numeric_columns) - set(categorical_columns)
+    if other:
+        raise NotCompilable('features of unsupported type: {}'.format(', '.join(sorted(other))))
+
+    # the imputer writes its output back over every numeric column: float32 only if all of them are
+    dtype = np.float32 if all(learned[column].name == 'float32' for column in numeric_columns) else np.float64
+    numeric_fill = dict.fromkeys(numeric_columns, np.nan)
+    categorical_fill = dict.fromkeys(categorical_columns, 'not_available')
+    rules = {column: [] for column in categorical_columns}
+    levels = {column: [] for column in categorical_columns}
+    mean = scale = None
+    dropped = []
+    for name, step in steps:
+        kind = type(step).__name__
+        if kind in _NO_OP or hasattr(step, 'fit_resample'):
+            continue
+        if kind == 'Simple_Imputer':
+            for column, value in zip(step.numeric_columns, step.numeric_imputer.statistics_):
+                numeric_fill[column] = value
+            if len(step.categorical_columns):
+                categorical_fill.update(zip(step.categorical_columns, step.categorical_imputer.statistics_))
+            if len(step.time_columns):
+                raise NotCompilable('time features are not supported')
+        elif kind == 'New_Catagorical_Levels_in_TestData':
+            for column in step.ph_train_level.columns:
+                known = step.ph_train_level.loc[0, column]
+                replacement = None if step.replacement_strategy == 'raise exception' else known[0]
+                rules[column].append((frozenset(known), replacement))
+        elif kind == 'Make_Time_Features':
+            if len(step.time_feature):
+                raise NotCompilable('time features are not supported')
+        elif kind == 'Scaling_and_Power_transformation':
+            if step.function_to_apply != 'zscore':
+                raise NotCompilable('{} scaling is not supported'.format(step.function_to_apply))
+            if list(step.numeric_features) != numeric_columns:
+                raise NotCompilable('scaled columns differ from the numeric features')
+            if len(numeric_columns):
+                mean = step.scale_and_power.mean_
+                scale = step.scale_and_power.scale_
+        elif kind == 'Dummify':
+            if hasattr(step, 'data_columns'):
+                for column, categories in zip(categorical_columns, step.ohe.categories_):
+                    levels[column] = [str(level) for level in categories]
+        elif kind == 'Remove_100':
+            dropped.extend(step.columns_to_drop)
+        else:
+            raise NotCompilable('step {} ({}) is not supported'.format(name, kind))
+
+    names = numeric_columns + ['{}_{}'.format(column, level) for column in categorical_columns
+                               for level in levels[column]]
+    dropped = set(dropped)
+    keep = [i for i, name in enumerate(names) if name not in dropped]
+    return CompiledModel(
+        estimator, columns,
+        numeric=[(columns.index(column), np.dtype(learned[column].name), numeric_fill[column])
+                 for column in numeric_columns],
+        categorical=[(columns.index(column), categorical_fill[column], rules[column], levels[column])
+                     for column in categorical_columns],
+        dtype=dtype, keep=keep, mean=mean, scale=scale,
+        labels={int(v): k for k, v in dtypes.replacement.items()} if hasattr(dtypes, 'replacement') else None,
+        classification=dtypes.ml_usecase == 'classification')
+
+
+def parity_sample(data, target, size=1000, random_state=0):
+    # the datasets are sorted by label, a random sample covers every class
+    return data.drop(columns=[target]).sample(n=min(size, len(data)), random_state=random_state)
+
+
+def parity_errors(model, expected, frame):
+    """Rows of `frame` where the compiled model and `expected` (the output of predict_model()) disagree."""
+    result = model.predict_frame(frame)
+    wrong = result['Label'].to_numpy() != expected['Label'].to_numpy()
+    if not model.classification:
+        wrong = ~np.isclose(result['Label'].to_numpy(float), expected['Label'].to_numpy(float))
+    if 'Score' in expected:
+        wrong |= ~np.isclose(result['Score'].to_numpy(), expected['Score'].to_numpy(), atol=10 ** -ROUND)
+    return int(wrong.sum())
+
+
+def export(pipeline, path, sample=None, predict_model=None):
+    """Compiles `pipeline` into `path`, checking first it predicts `sample` like predict_model() does."""
+    model = compile_pipeline(pipeline)
+    if sample is not None:
+        errors = parity_errors(model, predict_model(pipeline, sample), sample)
+        if errors:
+            raise NotCompilable('{} of {} sample rows predicted differently'.format(errors, len(sample)))
+    # mapped, so the arrays of the estimator are shared by the workers
+    dump(model, path)
+    return model
+
+
+def publish(pipeline, path, bucket, key, s3, sample=None, predict_model=None):
+    """Uploads the compiled form of `pipeline` to s3://bucket/key, or removes the one of a previous model.
+
+    Handlers fall back to the pycaret pipeline when there is no compiled
+    model, a stale one would serve predictions of the previous model.
+    """
+    try:
+        export(pipeline, path, sample, predict_model)
+    except NotCompilable as ex:
+        print('Not compiling the model: {}'.format(ex))
+        s3.delete_object(Bucket=bucket, Key=key)
+        return False
+    s3.upload_file(path, bucket, key)
+    return True
+
+
+def load_compiled(bucket, key, s3=None):
+    """The CompiledModel at s3://bucket/key, None if training did not publish one."""
+    return load_published(bucket, key, s3)
@@ -0,0 +1,163 @@
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from darwinex_ml.handlers import _pyarrow
+
+# Column types of every training dataset. Features stored as float32 are cast to float32 by
+# setup() anyway, the targets and money amounts used outside pycaret keep float64.
+# Integer columns with missing values are float32, exact for whole numbers below 2**24.
+_DAYS = 'float32'
+SCHEMAS = {
+    'ModClasClientes': {
+        'userid': 'uuid', 'has_darwin': 'bool', 'pfees': 'float32', 'darwinia': 'float32', 'dscore': 'float32',
+        'commissions': 'float32', 'investment': 'float32', 'old_darwin': 'bool', 'label': 'int8',
+    },
+    'ModConversion_investors': {
+        'user_currency': 'category', 'user_country': 'int16', 'start_mifid_days': _DAYS,
+        'has_finished_mifid': 'int8', 'finish_mifid_days': _DAYS, 'has_deposit': 'int8',
+        'first_deposit_days': _DAYS, 'first_deposit_amount': 'float32', 'first_deposit_platform': 'int8',
+        'mifid_actual_savings': 'int8', 'mifid_next_year_savings': 'int8', 'mifid_qualifications': 'int8',
+        'mifid_experience': 'int8', 'mifid_money_other_brokers': 'int8', 'mifid_invested_other_brokers': 'int8',
+        'user_flow_name': 'int8', 'first_trade_investor_account_demo_days': _DAYS,
+        'days_until_conversion_or_today': 'int16', 'is_converted': 'int8',
+    },
+    'ModConversion_traders': {
+        'user_currency': 'category', 'user_country': 'int16', 'start_mifid_days': _DAYS,
+        'has_finished_mifid': 'int8', 'finish_mifid_days': _DAYS, 'has_deposit': 'int8',
+        'first_deposit_days': _DAYS, 'first_deposit_amount': 'float32', 'first_deposit_platform': 'int8',
+        'mifid_actual_savings': 'int8', 'mifid_next_year_savings': 'int8', 'mifid_qualifications': 'int8',
+        'mifid_money_other_brokers': 'int8', 'mifid_invested_other_brokers': 'int8', 'mifid_experience': 'int8',
+        'has_linked_account': 'int8', 'linked_account_days': _DAYS, 'has_demo_account': 'int8',
+        'demo_account_days': _DAYS, 'has_demo_trade': 'int8', 'demo_trade_days': _DAYS,
+        'has_mock_account': 'int8', 'mock_account_days': _DAYS, 'user_flow_name': 'int8',
+        'days_until_conversion_or_today': 'int16', 'is_converted': 'int8',
+    },
+    'ModEstIngresos': {
+        'date': 'date', 'incomes': 'float64',
+    },
+    'ModRecInvDarwin': {
+        'orderid': 'int64', 'darwin': 'category',
+    },
+}
+
+
+def dataset_name(filename):
+    # 'dataset_ModClasClientes.csv' -> 'ModClasClientes'
+    return os.path.splitext(os.path.basename(filename))[0][len('dataset_'):]
+
+
+def csv_name(name):
+    return 'dataset_{}.csv'.format(name)
+
+
+def store_name(name):
+    return 'dataset_{}.arrow'.format(name)
+
+
+def _arrow_types(pa):
+    return {'bool': pa.bool_(), 'int8': pa.int8(), 'int16': pa.int16(), 'int32': pa.int32(),
+            'int64': pa.int64(), 'float32': pa.float32(), 'float64': pa.float64(), 'date': pa.date32(),
+            'category': pa.string(), 'uuid': pa.string()}
+
+
+def read_csv_table(path, schema):
+    """Reads a CSV straight into an Arrow table with the declared types."""
+    pa = _pyarrow()
+    import pyarrow.csv
+
+    types = _arrow_types(pa)
+    table = pyarrow.csv.read_csv(path, convert_options=pyarrow.csv.ConvertOptions(
+        column_types={column: types[kind] for column, kind in schema.items()},
+        true_values=['True', 'true'], false_values=['False', 'false']))
+    for column, kind in schema.items():
+        position = table.schema.get_field_index(column)
+        if kind == 'category':
+            table = table.set_column(position, column, table[column].dictionary_encode())
+        elif kind == 'uuid':
+            uuids = pa.array([uuid.UUID(value).bytes for value in table[column].to_pylist()], pa.binary(16))
+            table = table.set_column(position, column, uuids)
+    return table
+
+
+def convert(directory, name, out_dir=None, compression='zstd'):
+    """Writes dataset_<name>.csv of `directory` as a typed Arrow IPC file in `out_dir`."""
+    import pyarrow.feather
+
+    out_dir = out_dir or directory
+    table = read_csv_table(os.path.join(directory, csv_name(name)), SCHEMAS[name])
+    path = os.path.join(out_dir, store_name(name))
+    pyarrow.feather.write_feather(table, path + '.tmp', compression=compression)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def _widen(frame, schema):
+    # same dtypes as pd.read_csv gives, which is what setup() infers the feature types from
+    for column, kind in schema.items():
+        if column not in frame:
+            continue
+        if kind.startswith('int'):
+            frame[column] = frame[column].astype(np.int64)
+        elif kind == 'float32':
+            frame[column] = frame[column].astype(np.float64)
+        elif kind == 'category':
+            frame[column] = frame[column].astype(object)
+        elif kind == 'date':
+            frame[column] = pd.to_datetime(frame[column]).dt.strftime('%Y-%m-%d')
+    return frame
+
+
+def _uuid_strings(pa, column):
+    # canonical 8-4-4-4-12 text of 16-byte UUIDs, without a Python object per row
+    column = column.combine_chunks()
+    raw = np.frombuffer(column.buffers()[1], np.uint8)[column.offset * 16:(column.offset + len(column)) * 16]
+    digits = np.frombuffer(b'0123456789abcdef', 'S1')
+    hexes = np.empty((len(column), 32), 'S1')
+    hexes[:, 0::2] = digits[raw.reshape(-1, 16) >> 4]
+    hexes[:, 1::2] = digits[raw.reshape(-1, 16) & 15]
+    text = np.insert(hexes, [8, 12, 16, 20], b'-', axis=1).view('S36').ravel()
+    return pa.array(text.astype(object), pa.string(), mask=np.asarray(column.is_null()))
+
+
+def load_dataset(directory, name, columns=None, widen=False):
+    """Loads a training dataset, memory-mapping its Arrow file when there is one.
+
+    Without it, or when the CSV is newer, the CSV is parsed with the declared
+    types. `widen` returns the dtypes of pd.read_csv, so pycaret infers the
+    same feature types as before.
+    """
+    pa = _pyarrow()
+    import pyarrow.feather
+
+    path = os.path.join(directory, store_name(name))
+    source = os.path.join(directory, csv_name(name))
+    if os.path.exists(path) and not (os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(path)):
+        table = pyarrow.feather.read_table(path, columns=columns, memory_map=True)
+    else:
+        table = read_csv_table(source, SCHEMAS[name])
+        if columns is not None:
+            table = table.select(columns)
+    if widen:
+        for column, kind in SCHEMAS[name].items():
+            if kind == 'uuid' and column in table.column_names:
+                table = table.set_column(table.schema.get_field_index(column), column,
+                                         _uuid_strings(pa, table[column]))
+    frame = table.to_pandas(split_blocks=True, self_destruct=True, date_as_object=False)
+    return _widen(frame, SCHEMAS[name]) if widen else frame
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory', type=str)
+    parser.add_argument('--out-dir', type=str, default=None)
+    parser.add_argument('--compression', type=str, default='zstd', choices=['zstd', 'lz4', 'uncompressed'])
+    parser.add_argument('--datasets', type=str, nargs='+', default=list(SCHEMAS))
+    args = parser.parse_args()
+
+    for name in args.datasets:
+        print(convert(args.directory, name, args.out_dir, args.compression))
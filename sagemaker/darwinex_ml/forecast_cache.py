@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# forecasts kept by each worker, a few hundred bytes each; 0 disables the cache
+SIZE = int(os.environ.get('FORECAST_CACHE_SIZE', 1024))
+
+
+class ForecastCache:
+    """Predictions of the last `size` distinct requests, the least recently used evicted first.
+
+    Requests are keyed by RecursiveForecaster.fingerprint(), so a repeated
+    request and one that only adds older history are both hits. The cache
+    belongs to one model: when forecast() gets another one (a HotSwapModel
+    swapped in a new training run) every entry is dropped.
+    """
+
+    def __init__(self, size=SIZE):
+        self.size = size
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        self._entries = OrderedDict()
+        # a reference rather than id(), which a new model could reuse
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get(self, model, key):
+        with self._lock:
+            if model is not self._model:
+                if self._model is not None:
+                    self.counters['invalidations'] += 1
+                self._entries.clear()
+                self._model = model
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters['misses'] += 1
+            else:
+                self._entries.move_to_end(key)
+                self.counters['hits'] += 1
+            return entry
+
+    def _put(self, model, key, entry):
+        with self._lock:
+            # a swap while predicting: the entry belongs to a model that no longer serves
+            if model is not self._model:
+                return
+            self._entries[key] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def forecast(self, model, forecaster, input_data):
+        """forecaster.forecast(input_data) of `model` and whether its predictions came from the cache."""
+        if not self.size:
+            return forecaster.forecast(input_data), False
+        key = forecaster.fingerprint(input_data)
+        entry = self._get(model, key)
+        hit = entry is not None
+        if not hit:
+            dates, predictions = forecaster.predictions(input_data)
+            predictions = np.array(predictions, dtype=float)
+            predictions.flags.writeable = False
+            entry = (pd.DatetimeIndex(dates), predictions)
+            # two threads may compute the same request, the second one just replaces the entry
+            self._put(model, key, entry)
+        return forecaster.build_output(input_data, *entry), hit
+
+    def stats(self):
+        with self._lock:
+            requests = self.counters['hits'] + self.counters['misses']
+            return dict(self.counters, entries=len(self._entries), size=self.size,
+                        hit_rate=self.counters['hits'] / requests if requests else 0.0)
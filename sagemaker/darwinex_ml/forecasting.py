@@ -0,0 +1,204 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from darwinex_ml.lags import lag_matrix
+from darwinex_ml.mapped import dump
+
+SATURDAY = 5
+
+
+class LagRingBuffer:
+    """Fixed-size buffer with the last `window` values of a series.
+
+    Every value is written twice, at `pos` and `pos + window`, so the last
+    `window` values are always a contiguous slice and `lags()` is a view.
+    """
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self.size = 0
+        self._data = np.zeros(2 * window)
+        self._pos = 0
+        for value in values:
+            self.push(value)
+
+    def push(self, value):
+        self._data[self._pos] = value
+        self._data[self._pos + self.window] = value
+        self._pos = (self._pos + 1) % self.window
+        self.size = min(self.size + 1, self.window)
+
+    def is_full(self):
+        return self.size == self.window
+
+    def lags(self):
+        # most recent value first: lag_1, lag_2, ..., lag_window
+        return self._data[self._pos:self._pos + self.window][::-1]
+
+
+class RecursiveForecaster:
+    """Fills the null values of a date/value series one step at a time.
+
+    `predict` receives the lags of a step (lag_1 first) and returns the
+    predicted value, which is fed back into the buffer for the next step.
+    Dates falling on `skip_weekday` are not predicted.
+    """
+
+    def __init__(self, predict, window, date_column='date', value_column='incomes', skip_weekday=SATURDAY):
+        self.predict = predict
+        self.window = window
+        self.date_column = date_column
+        self.value_column = value_column
+        self.skip_weekday = skip_weekday
+
+    def forecast(self, input_data):
+        return self.build_output(input_data, *self.predictions(input_data))
+
+    def predictions(self, input_data):
+        """Dates and values predicted for the nulls of `input_data`, without the known rows."""
+        dates = pd.DatetimeIndex(pd.to_datetime(input_data[self.date_column]))
+        values = input_data[self.value_column].to_numpy(dtype=float)
+
+        buffer = LagRingBuffer(self.window)
+        predicted_dates = []
+        predictions = []
+        for i in np.argsort(dates.values, kind='stable'):
+            if not np.isnan(values[i]):
+                buffer.push(values[i])
+                self._known()
+            elif dates[i].weekday() != self.skip_weekday:
+                if not buffer.is_full():
+                    raise ValueError('At least {} known values are needed before {}'.format(self.window, dates[i]))
+                prediction = self._next(buffer)
+                buffer.push(prediction)
+                predicted_dates.append(dates[i])
+                predictions.append(prediction)
+        return predicted_dates, predictions
+
+    def fingerprint(self, input_data):
+        """Digest of everything predictions() depends on in `input_data`.
+
+        That is the last `window` known values before the first date to
+        predict, and the dates and values from that date on: requests that
+        only differ in older rows get the same digest.
+        """
+        dates = pd.to_datetime(input_data[self.date_column]).to_numpy(dtype='datetime64[ns]')
+        values = input_data[self.value_column].to_numpy(dtype=float)
+        order = np.argsort(dates, kind='stable')
+        dates, values = dates[order], values[order]
+
+        pending = np.isnan(values) & (pd.DatetimeIndex(dates).weekday != self.skip_weekday)
+        first = int(np.argmax(pending)) if pending.any() else len(values)
+        known = values[:first]
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(known[~np.isnan(known)][-self.window:]).tobytes())
+        digest.update(dates[first:].view('i8').tobytes())
+        digest.update(values[first:].tobytes())
+        return digest.hexdigest()
+
+    def _next(self, buffer):
+        return self.predict(buffer.lags())
+
+    def _known(self):
+        pass
+
+    def build_output(self, input_data, predicted_dates, predictions):
+        df = input_data.dropna().copy()
+        df[self.date_column] = pd.to_datetime(df[self.date_column])
+        df = df.set_index(df[self.date_column])
+
+        df['prediction'] = df[self.value_column]
+        df['calculated'] = 0
+
+        predicted = pd.DataFrame({'prediction': predictions, 'calculated': 1},
+                                 index=pd.DatetimeIndex(predicted_dates))
+        return pd.concat([df, predicted]).sort_index()
+
+
+class DirectForecaster(RecursiveForecaster):
+    """Fills the null values like RecursiveForecaster, predicting whole horizons at once.
+
+    `predict` receives the lags of a step and returns the values of that
+    step and the following ones (a DirectModel predicts `horizon` of them).
+    A single call covers a block of nulls up to the horizon; a longer one
+    continues from the lags with the predicted values, and a known value in
+    between starts a new block from it.
+    """
+
+    def predictions(self, input_data):
+        self._block = ()
+        self._step = 0
+        return super().predictions(input_data)
+
+    def _next(self, buffer):
+        if self._step == len(self._block):
+            self._block = self.predict(buffer.lags())
+            self._step = 0
+        self._step += 1
+        return self._block[self._step - 1]
+
+    def _known(self):
+        self._block = ()
+        self._step = 0
+
+
+def horizon_targets(values, window, horizon):
+    """Lags (lag_1 first) and next `horizon` values at every position of `values` where both are complete.
+
+    Rows of the series are steps, as in add_lag_features(): there are no
+    Saturday rows, the days RecursiveForecaster does not predict.
+    """
+    values = np.asarray(values, dtype=float)
+    targets = sliding_window_view(values[window:], horizon)
+    lags = lag_matrix(values, window)[:len(targets)]
+    complete = np.isfinite(lags).all(axis=1) & np.isfinite(targets).all(axis=1)
+    return lags[complete], targets[complete]
+
+
+class DirectModel:
+    """Next `horizon` values of a series from its last `window` lags, with one estimator output per step."""
+
+    def __init__(self, estimator, window, horizon):
+        self.estimator = estimator
+        self.window = window
+        self.horizon = horizon
+
+    def predict(self, lags):
+        return self.estimator.predict(np.asarray(lags, dtype=float)[np.newaxis])[0]
+
+
+def fit_direct(estimator, values, window, horizon):
+    """DirectModel of `values` with a copy of `estimator` per step of the horizon.
+
+    The lags are standardized first, like setup(normalize=True) does for
+    the recursive model.
+    """
+    # training only, serving unpickles the fitted pipeline
+    from sklearn.base import clone
+    from sklearn.multioutput import MultiOutputRegressor
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    lags, targets = horizon_targets(values, window, horizon)
+    if not len(lags):
+        raise ValueError('{} values are too few for {} lags and a horizon of {}'.format(len(values), window,
+                                                                                       horizon))
+    model = make_pipeline(StandardScaler(), MultiOutputRegressor(clone(estimator)))
+    return DirectModel(model.fit(lags, targets), window, horizon)
+
+
+def publish_direct(estimator, values, window, horizon, path, bucket, key, s3):
+    """Uploads a DirectModel of `values` to s3://bucket/key, or removes the one of a previous model if `horizon` is 0.
+
+    Handlers forecast with the direct model when there is one, a stale one
+    would serve predictions of the previous model.
+    """
+    if not horizon:
+        s3.delete_object(Bucket=bucket, Key=key)
+        return None
+    model = fit_direct(estimator, values, window, horizon)
+    s3.upload_file(dump(model, path), bucket, key)
+    return model
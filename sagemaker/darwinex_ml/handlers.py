@@ -0,0 +1,115 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+JSON = 'application/json'
+JSON_LINES = 'application/jsonlines'
+CSV = 'text/csv'
+ARROW = 'application/vnd.apache.arrow.stream'
+NPY = 'application/x-npy'
+BINARY = (ARROW, NPY)
+
+
+def media_type(content_type):
+    # drop parameters such as '; charset=utf-8'
+    return content_type.split(';')[0].strip().lower()
+
+
+def _text(input_data):
+    return input_data.decode('utf-8') if isinstance(input_data, (bytes, bytearray)) else input_data
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise ValueError("{} needs pyarrow installed in the container".format(ARROW))
+    return pyarrow
+
+
+def decode_records(input_data, content_type):
+    """DataFrame with one row per record, in request order.
+
+    application/json takes a single record (object) or a batch (array of
+    objects); application/jsonlines and text/csv (with header) are batches.
+    Arrow streams and structured .npy arrays are read straight from the
+    request buffer, without going through Python objects.
+    """
+    content_type = media_type(content_type)
+    if content_type == JSON:
+        text = _text(input_data)
+        if text.lstrip().startswith('['):
+            return pd.DataFrame.from_records(json.loads(text))
+        return pd.DataFrame([pd.read_json(io.StringIO(text), typ='series')])
+    elif content_type == JSON_LINES:
+        return pd.read_json(io.StringIO(_text(input_data)), lines=True, convert_dates=False)
+    elif content_type == CSV:
+        return pd.read_csv(io.StringIO(_text(input_data)))
+    elif content_type == ARROW:
+        pa = _pyarrow()
+        table = pa.ipc.open_stream(pa.py_buffer(input_data)).read_all()
+        return table.to_pandas(split_blocks=True)
+    elif content_type == NPY:
+        array = _npy_view(input_data)
+        if array.dtype.names is None:
+            raise ValueError("{} payloads must be structured arrays with one field per column".format(NPY))
+        return pd.DataFrame({name: array[name] for name in array.dtype.names}, copy=False)
+    else:
+        raise ValueError("{} not supported by script!".format(content_type))
+
+
+def _npy_view(input_data):
+    # np.load() would copy the payload, the header tells where the data starts
+    buffer = memoryview(input_data)
+    f = io.BytesIO(buffer)
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    if dtype.hasobject:
+        raise ValueError("{} payloads with Python objects are not supported".format(NPY))
+    count = int(np.prod(shape))
+    array = np.frombuffer(buffer, dtype=dtype, count=count, offset=f.tell())
+    return array.reshape(shape, order='F' if fortran_order else 'C')
+
+
+def _is_text(values):
+    return values.dtype == object or isinstance(values.dtype, pd.StringDtype)
+
+
+def _set_columns(frame, join):
+    # rule antecedents/consequents are sets, sent as sorted lists (or comma separated text)
+    columns = {}
+    for column in frame.columns[frame.dtypes == object]:
+        sample = frame[column].dropna()
+        if len(sample) and isinstance(sample.iloc[0], (set, frozenset)):
+            columns[column] = frame[column].map(lambda items: ','.join(sorted(items)) if join else sorted(items))
+    return frame.assign(**columns) if columns else frame
+
+
+def encode_frame(frame, accept):
+    accept = media_type(accept)
+    if accept == ARROW:
+        pa = _pyarrow()
+        table = pa.Table.from_pandas(_set_columns(frame, join=False))
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    elif accept == NPY:
+        frame = _set_columns(frame, join=True)
+        text = {column: frame[column].astype(str) for column in frame.columns if _is_text(frame[column])}
+        # .npy can't hold Python objects without pickle, text goes as fixed-width unicode
+        column_dtypes = {column: 'U{}'.format(max(values.str.len().max(), 1) if len(values) else 1)
+                         for column, values in text.items()}
+        records = frame.assign(**text).to_records(index=not isinstance(frame.index, pd.RangeIndex),
+                                                  column_dtypes=column_dtypes)
+        f = io.BytesIO()
+        np.save(f, records, allow_pickle=False)
+        return f.getvalue()
+    else:
+        raise ValueError("{} accept type is not supported by this script.".format(accept))
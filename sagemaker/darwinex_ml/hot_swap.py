@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from darwinex_ml.model_cache import is_missing, object_version
+
+# seconds between two checks of the artifact versions, 0 disables the polling
+POLL_SECONDS = float(os.environ.get('MODEL_POLL_SECONDS', 60))
+# longest wait between two checks while S3 keeps failing, each failure in a row doubles the wait
+MAX_BACKOFF_SECONDS = float(os.environ.get('MODEL_POLL_MAX_BACKOFF_SECONDS', 900))
+# S3 or the network failing, the same versions may load at a later check
+TRANSIENT_ERRORS = (BotoCoreError, ClientError, ConnectionError)
+
+
+def artifact_versions(bucket, keys, s3=None):
+    # ETag of each key, None for the ones that don't exist (e.g. no compiled model)
+    versions = []
+    for key in keys:
+        try:
+            versions.append(object_version(bucket, key, s3))
+        except ClientError as ex:
+            if not is_missing(ex):
+                raise
+            versions.append(None)
+    return tuple(versions)
+
+
+class HotSwapModel:
+    """The model built by `load` from s3://bucket/keys, replaced when any of the keys changes.
+
+    A background thread checks the ETags every `interval` seconds and, on a
+    change, calls `load` off the request path and swaps the result in with
+    a single assignment. Handlers read `current` once per request, so
+    requests in flight finish on the model they started with. If a load
+    fails the previous model keeps serving. Artifacts that downloaded but
+    did not load are not loaded again until one of them changes; S3 and
+    network errors are retried at the next checks, waiting twice as long
+    after each one up to `max_backoff` seconds.
+    """
+
+    def __init__(self, load, bucket, keys, interval=POLL_SECONDS, s3=None, max_backoff=MAX_BACKOFF_SECONDS):
+        self.load = load
+        self.bucket = bucket
+        self.keys = list(keys)
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.s3 = s3
+        self.swaps = 0
+        self.failures = 0
+        # checks in a row that failed on S3 or the network
+        self.retries = 0
+        self.failed_version = None
+        self.version = artifact_versions(bucket, self.keys, s3)
+        self.current = load()
+        self._stop = threading.Event()
+        self._thread = None
+        if interval:
+            self._thread = threading.Thread(target=self._run, name='model-hot-swap', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_delay()):
+            self.check()
+
+    def poll_delay(self):
+        """Seconds until the next check."""
+        return min(self.interval * 2 ** self.retries, max(self.interval, self.max_backoff))
+
+    def check(self):
+        """Loads and swaps in the model if its artifacts changed, returns True on a swap."""
+        version = None
+        try:
+            version = artifact_versions(self.bucket, self.keys, self.s3)
+            # a version that failed to load would fail again, each poll downloading and unpickling it
+            if version in (self.version, self.failed_version):
+                self.retries = 0
+                return False
+            start = time.perf_counter()
+            model = self.load()
+        except TRANSIENT_ERRORS as ex:
+            self.failures += 1
+            self.retries += 1
+            print('Keeping the current model of s3://{}/{}, checking again in {:.0f} s: {}'.format(
+                self.bucket, self.keys[0], self.poll_delay(), ex))
+            return False
+        except Exception as ex:
+            # the artifacts downloaded but don't load (a truncated pickle, a missing class...), the thread
+            # must keep polling
+            self.failures += 1
+            self.retries = 0
+            if version is not None:
+                self.failed_version = version
+            print('Keeping the current model of s3://{}/{}: {}'.format(self.bucket, self.keys[0], ex))
+            return False
+        self.current = model
+        self.version = version
+        self.swaps += 1
+        self.retries = 0
+        print('Swapped in s3://{}/{} {} (loaded in {:.1f} s)'.format(self.bucket, self.keys[0], version,
+                                                                     time.perf_counter() - start))
+        return True
+
+    def close(self):
+        # doesn't wait for a load in progress, the thread ends after it
+        self._stop.set()
+
+
+def current(model):
+    # the model to use for one request, handlers may receive it wrapped or not
+    return model.current if isinstance(model, HotSwapModel) else model
@@ -0,0 +1,211 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+RULE_COLUMNS = ['antecedents', 'consequents', 'antecedent support', 'consequent support', 'support', 'confidence',
+                'lift', 'leverage', 'conviction']
+
+
+class Transactions:
+    """Integer-encoded transactions in CSR layout.
+
+    The items of transaction t are `indices[offsets[t]:offsets[t + 1]]`,
+    as positions in `items`.
+    """
+
+    def __init__(self, items, offsets, indices):
+        self.items = items
+        self.offsets = offsets
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for start, end in zip(self.offsets[:-1], self.offsets[1:]):
+            yield self.indices[start:end]
+
+
+def read_transactions(path, transaction_id, item_id, chunksize=100000):
+    transaction_codes = {}
+    item_codes = {}
+    transactions = []
+    items = []
+    for chunk in pd.read_csv(path, usecols=[transaction_id, item_id], dtype=str, chunksize=chunksize):
+        transactions.append(np.fromiter((transaction_codes.setdefault(value, len(transaction_codes))
+                                         for value in chunk[transaction_id]), dtype=np.int64))
+        items.append(np.fromiter((item_codes.setdefault(value, len(item_codes))
+                                  for value in chunk[item_id]), dtype=np.int32))
+
+    transactions = np.concatenate(transactions) if transactions else np.empty(0, dtype=np.int64)
+    items = np.concatenate(items) if items else np.empty(0, dtype=np.int32)
+
+    # sort by transaction and item, then drop repeated items inside a transaction
+    order = np.lexsort((items, transactions))
+    transactions, items = transactions[order], items[order]
+    keep = np.ones(len(items), dtype=bool)
+    keep[1:] = (transactions[1:] != transactions[:-1]) | (items[1:] != items[:-1])
+    transactions, items = transactions[keep], items[keep]
+
+    offsets = np.searchsorted(transactions, np.arange(len(transaction_codes) + 1))
+    return Transactions(list(item_codes), offsets, items)
+
+
+def min_count(min_support, n_transactions):
+    # smallest count whose support passes the `support >= min_support` check
+    count = int(np.ceil(min_support * n_transactions))
+    while count > 0 and (count - 1) / n_transactions >= min_support:
+        count -= 1
+    while count / n_transactions < min_support:
+        count += 1
+    return max(count, 1)
+
+
+class _Node:
+    __slots__ = ('item', 'count', 'parent', 'children')
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+
+
+def _build_tree(patterns, min_count):
+    counts = {}
+    for items, count in patterns:
+        for item in items:
+            counts[item] = counts.get(item, 0) + count
+    frequent = {item: count for item, count in counts.items() if count >= min_count}
+
+    root = _Node(None, None)
+    header = {item: [] for item in frequent}
+    for items, count in patterns:
+        node = root
+        for item in sorted((item for item in items if item in frequent), key=lambda i: (-frequent[i], i)):
+            child = node.children.get(item)
+            if child is None:
+                child = node.children[item] = _Node(item, node)
+                header[item].append(child)
+            child.count += count
+            node = child
+    return header, frequent
+
+
+def _mine(patterns, min_count, suffix, max_len, result):
+    header, frequent = _build_tree(patterns, min_count)
+    for item in sorted(frequent, key=lambda i: (frequent[i], i)):
+        itemset = suffix | {item}
+        result[itemset] = frequent[item]
+        if max_len is not None and len(itemset) >= max_len:
+            continue
+
+        conditional = []
+        for node in header[item]:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                conditional.append((path, node.count))
+        if conditional:
+            _mine(conditional, min_count, itemset, max_len, result)
+
+
+def fpgrowth(transactions, min_support, max_len=None):
+    """Frequent itemsets as a {frozenset of item positions: transaction count} dict."""
+    result = {}
+    if len(transactions):
+        patterns = ((indices.tolist(), 1) for indices in transactions)
+        _mine(list(patterns), min_count(min_support, len(transactions)), frozenset(), max_len, result)
+    return result
+
+
+_METRICS = {
+    'support': lambda a, c, ac: ac,
+    'confidence': lambda a, c, ac: ac / a,
+    'lift': lambda a, c, ac: ac / a / c,
+    'leverage': lambda a, c, ac: ac - a * c,
+    'conviction': lambda a, c, ac: (1. - c) / (1. - ac / a) if ac < a else np.inf,
+}
+
+
+def _confident_consequents(itemset, count, itemsets, n_transactions, threshold):
+    # Confidence can only drop when items move from the antecedent to the
+    # consequent, so consequents grow level by level from the ones that pass.
+    support = count / n_transactions
+    level = [frozenset([item]) for item in itemset]
+    while level:
+        passed = [consequent for consequent in level
+                  if support / (itemsets[itemset - consequent] / n_transactions) >= threshold]
+        for consequent in passed:
+            yield consequent
+        if not passed or len(passed[0]) + 1 >= len(itemset):
+            break
+        passed_set = set(passed)
+        level = {a | b for a, b in itertools.combinations(passed, 2) if len(a | b) == len(a) + 1}
+        level = [consequent for consequent in level
+                 if all(consequent - {item} in passed_set for item in consequent)]
+
+
+def association_rules(itemsets, n_transactions, items, metric='confidence', threshold=0.5, round=4):
+    """Rules in the layout of pycaret.arules.create_model (mlxtend association_rules).
+
+    Candidate rules are checked against `metric` as they are generated, so
+    only the rules that pass the threshold are kept in memory.
+    """
+    if metric not in _METRICS:
+        raise ValueError('{} is not a valid metric, use one of {}'.format(metric, list(_METRICS)))
+    score = _METRICS[metric]
+
+    antecedents, consequents, counts = [], [], []
+    for itemset, count in itemsets.items():
+        if len(itemset) < 2:
+            continue
+        if metric == 'confidence':
+            candidates = _confident_consequents(itemset, count, itemsets, n_transactions, threshold)
+        else:
+            candidates = (itemset - frozenset(antecedent) for size in range(1, len(itemset))
+                          for antecedent in itertools.combinations(itemset, size))
+        for consequent in candidates:
+            antecedent = itemset - consequent
+            if score(itemsets[antecedent] / n_transactions, itemsets[consequent] / n_transactions,
+                     count / n_transactions) >= threshold:
+                antecedents.append(antecedent)
+                consequents.append(consequent)
+                counts.append(count)
+
+    support = np.array(counts, dtype=float) / n_transactions
+    antecedent_support = np.array([itemsets[itemset] for itemset in antecedents], dtype=float) / n_transactions
+    consequent_support = np.array([itemsets[itemset] for itemset in consequents], dtype=float) / n_transactions
+    confidence = support / antecedent_support
+    lift = confidence / consequent_support
+    leverage = support - antecedent_support * consequent_support
+    conviction = np.full(len(confidence), np.inf)
+    below_one = confidence < 1.
+    conviction[below_one] = (1. - consequent_support[below_one]) / (1. - confidence[below_one])
+
+    rules = pd.DataFrame({
+        'antecedents': [frozenset(items[i] for i in itemset) for itemset in antecedents],
+        'consequents': [frozenset(items[i] for i in itemset) for itemset in consequents],
+        'antecedent support': antecedent_support,
+        'consequent support': consequent_support,
+        'support': support,
+        'confidence': confidence,
+        'lift': lift,
+        'leverage': leverage,
+        'conviction': conviction,
+    }, columns=RULE_COLUMNS)
+
+    rules = rules.sort_values(by=[metric], ascending=False, kind='mergesort').reset_index(drop=True)
+    return rules.round(round)
+
+
+def mine_rules(path, transaction_id, item_id, min_support=0.05, metric='confidence', threshold=0.5, round=4,
+               max_len=None):
+    transactions = read_transactions(path, transaction_id, item_id)
+    itemsets = fpgrowth(transactions, min_support, max_len=max_len)
+    return association_rules(itemsets, len(transactions), transactions.items, metric=metric, threshold=threshold,
+                             round=round)
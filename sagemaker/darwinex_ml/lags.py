@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import as_strided
+
+
+def lag_columns(window):
+    return ['lag_' + str(i) for i in range(1, window + 1)]
+
+
+def lag_matrix(values, window):
+    """Read-only (len(values) - window, window) view with the lags of each value.
+
+    Row t holds lag_1..lag_window of values[t + window], so column 0 is the
+    previous value. No data is copied when `values` is already a float array.
+    """
+    values = np.ascontiguousarray(values, dtype=float)
+    rows = max(len(values) - window, 0)
+    stride = values.strides[0]
+    windows = as_strided(values, shape=(rows, window), strides=(stride, stride), writeable=False)
+    return windows[:, ::-1]
+
+
+def add_lag_features(df, column, window):
+    """Same result as adding `df[column].shift(i)` as lag_i for i in 1..window and dropping NaN rows."""
+    lags = pd.DataFrame(lag_matrix(df[column].to_numpy(), window), columns=lag_columns(window),
+                        index=df.index[window:], copy=False)
+    return pd.concat([df.iloc[window:], lags], axis=1).dropna()
@@ -0,0 +1,194 @@
+import bisect
+import functools
+import os
+import threading
+import time
+
+# upper bounds of the histogram buckets in seconds, from 1 us to about 3 minutes in steps of sqrt(2):
+# table lookups and cache hits take a few microseconds
+BOUNDS = [0.000001 * 2 ** (i / 2) for i in range(56)]
+# seconds between the log lines (and CloudWatch datapoints) with the latencies of the last period, 0 disables them
+REPORT_SECONDS = float(os.environ.get('LATENCY_REPORT_SECONDS', 60))
+# also send the percentiles of each period through the MetricEmitter given to the recorder
+CLOUDWATCH = os.environ.get('LATENCY_CLOUDWATCH', '0') == '1'
+
+
+class Histogram:
+    """Counts of latencies per bucket, with the number of calls, errors and payload bytes."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+
+    def record(self, seconds, size=None):
+        self.counts[bisect.bisect_left(BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if size:
+            self.bytes += size
+
+    def copy(self):
+        other = Histogram()
+        other.counts = list(self.counts)
+        other.count, other.errors, other.total, other.max, other.bytes = (self.count, self.errors, self.total,
+                                                                          self.max, self.bytes)
+        return other
+
+    def since(self, earlier):
+        """What was recorded after `earlier`, a copy of this histogram."""
+        window = Histogram()
+        window.counts = [a - b for a, b in zip(self.counts, earlier.counts)]
+        window.count = self.count - earlier.count
+        window.errors = self.errors - earlier.errors
+        window.total = self.total - earlier.total
+        window.bytes = self.bytes - earlier.bytes
+        # the maximum of the period is only known up to its bucket
+        top = max((i for i, count in enumerate(window.counts) if count), default=None)
+        window.max = min(self.max, BOUNDS[top]) if top is not None and top < len(BOUNDS) else self.max
+        return window
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-quantile, within a factor sqrt(2) of the true value
+        target = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if count and cumulative >= target:
+                return min(BOUNDS[i], self.max) if i < len(BOUNDS) else self.max
+        return 0.0
+
+    def summary(self):
+        return {'count': self.count, 'errors': self.errors, 'bytes': self.bytes,
+                'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+                'p50_ms': self.quantile(0.5) * 1000, 'p90_ms': self.quantile(0.9) * 1000,
+                'p99_ms': self.quantile(0.99) * 1000, 'max_ms': self.max * 1000}
+
+
+def _size(value):
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if hasattr(value, 'get_data'):
+        # worker.Response of output_fn
+        return len(value.get_data())
+    return None
+
+
+class _Timer:
+    __slots__ = ('recorder', 'stage', 'start')
+
+    def __init__(self, recorder, stage):
+        self.recorder = recorder
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, kind, value, traceback):
+        if kind is None:
+            self.recorder.record(self.stage, time.perf_counter() - self.start)
+        else:
+            self.recorder.record_error(self.stage)
+
+
+class LatencyRecorder:
+    """Latency histograms of the stages of a handler, aggregated in the process.
+
+    Every `interval` seconds the latencies of the last period are printed as
+    a 'Latency: model:stage ...//' line and, when LATENCY_CLOUDWATCH=1, put
+    in `emitter` (a MetricEmitter, which batches them). `snapshot()` has
+    the totals since the process started.
+    """
+
+    def __init__(self, model, emitter=None, interval=REPORT_SECONDS):
+        self.model = model
+        self.emitter = emitter if CLOUDWATCH else None
+        self.interval = interval
+        self.histograms = {}
+        self._reported = {}
+        self._last_report = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        return histogram
+
+    def record(self, stage, seconds, size=None):
+        with self._lock:
+            self._histogram(stage).record(seconds, size)
+            windows = self._due_windows()
+        if windows:
+            self.report(windows)
+
+    def record_error(self, stage):
+        with self._lock:
+            self._histogram(stage).errors += 1
+
+    def _due_windows(self):
+        # called with the lock held
+        now = time.monotonic()
+        if not self.interval or now - self._last_report < self.interval:
+            return None
+        self._last_report = now
+        windows = {}
+        for stage, histogram in self.histograms.items():
+            windows[stage] = histogram.since(self._reported.get(stage, Histogram()))
+            self._reported[stage] = histogram.copy()
+        return windows
+
+    def time(self, stage):
+        """Context manager recording the time spent in its block under `stage`."""
+        return _Timer(self, stage)
+
+    def timed(self, stage, payload=None):
+        """Decorator recording the calls of a handler function under `stage`.
+
+        `payload` 'request' counts the size of the first argument,
+        'response' the size of the result.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException:
+                    self.record_error(stage)
+                    raise
+                seconds = time.perf_counter() - start
+                size = None
+                if payload == 'request':
+                    size = _size(args[0])
+                elif payload == 'response':
+                    size = _size(result)
+                self.record(stage, seconds, size)
+                return result
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def report(self, windows):
+        for stage, window in windows.items():
+            if not window.count and not window.errors:
+                continue
+            stats = window.summary()
+            print('Latency: {}:{} count={} errors={} p50={:.2f}ms p90={:.2f}ms p99={:.2f}ms max={:.2f}ms '
+                  'bytes={}//'.format(self.model, stage, stats['count'], stats['errors'], stats['p50_ms'],
+                                      stats['p90_ms'], stats['p99_ms'], stats['max_ms'], stats['bytes']))
+            if self.emitter is not None:
+                for name in ('p50', 'p90', 'p99'):
+                    self.emitter.put(self.model, 'Latency-{}-{}'.format(stage, name), stats[name + '_ms'],
+                                     'Milliseconds')
+                self.emitter.put(self.model, 'Requests-{}'.format(stage), stats['count'], 'Count')
+                if stats['bytes']:
+                    self.emitter.put(self.model, 'Bytes-{}'.format(stage), stats['bytes'], 'Bytes')
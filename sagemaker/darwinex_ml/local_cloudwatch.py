@@ -0,0 +1,33 @@
+import threading
+
+from botocore.exceptions import ClientError
+
+from darwinex_ml.metrics import MAX_BATCH
+
+
+class LocalCloudWatch:
+    """In-memory stand-in for the CloudWatch put_metric_data call.
+
+    It enforces the per-call datapoint limit and keeps every call, so tests
+    can check what was sent and in how many requests.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def put_metric_data(self, Namespace, MetricData):
+        if len(MetricData) > MAX_BATCH:
+            raise ClientError({'Error': {'Code': 'InvalidParameterValue', 'Message': 'Too many datapoints'}},
+                              'PutMetricData')
+        if self.latency:
+            threading.Event().wait(self.latency)
+        with self._lock:
+            self.requests.append((Namespace, list(MetricData)))
+        return {}
+
+    @property
+    def datapoints(self):
+        with self._lock:
+            return [datum for _, data in self.requests for datum in data]
@@ -0,0 +1,94 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from botocore.exceptions import ClientError
+
+
+class LocalS3:
+    """Directory-backed stand-in for the boto3 S3 client calls used by the handlers.
+
+    Objects live in `root/<bucket>/<key>` and their ETag is the MD5 of the
+    content, like single-part uploads on S3.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.calls = {}
+        self._etags = {}
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, *key.split('/'))
+
+    def _count(self, operation):
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def _etag(self, path):
+        # hashed once per version of the file, polling a large artifact stays cheap
+        stat = os.stat(path)
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self._etags.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        digest = hashlib.md5()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        etag = '"{}"'.format(digest.hexdigest())
+        self._etags[path] = (version, etag)
+        return etag
+
+    def _error(self, code, operation):
+        return ClientError({'Error': {'Code': code, 'Message': code}}, operation)
+
+    def put_object(self, Bucket, Key, Body):
+        self._count('put_object')
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written aside and renamed, readers see the old or the new object like on S3, never a part
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(Body if isinstance(Body, bytes) else Body.read())
+        os.replace(tmp_path, path)
+        return {'ETag': self._etag(path)}
+
+    def upload_file(self, Filename, Bucket, Key):
+        self._count('upload_file')
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(fd)
+        shutil.copyfile(Filename, tmp_path)
+        os.replace(tmp_path, path)
+
+    def head_object(self, Bucket, Key):
+        self._count('head_object')
+        path = self._path(Bucket, Key)
+        if not os.path.exists(path):
+            raise self._error('404', 'HeadObject')
+        return {'ETag': self._etag(path), 'ContentLength': os.path.getsize(path)}
+
+    def get_object(self, Bucket, Key, IfMatch=None):
+        self._count('get_object')
+        path = self._path(Bucket, Key)
+        if not os.path.exists(path):
+            raise self._error('NoSuchKey', 'GetObject')
+        etag = self._etag(path)
+        if IfMatch is not None and IfMatch.strip('"') != etag.strip('"'):
+            raise self._error('PreconditionFailed', 'GetObject')
+        with open(path, 'rb') as f:
+            return {'ETag': etag, 'Body': io.BytesIO(f.read())}
+
+    def download_file(self, Bucket, Key, Filename):
+        self._count('download_file')
+        shutil.copyfile(self._path(Bucket, Key), Filename)
+
+    def delete_object(self, Bucket, Key):
+        # like S3, deleting a key that doesn't exist succeeds
+        self._count('delete_object')
+        path = self._path(Bucket, Key)
+        if os.path.exists(path):
+            os.remove(path)
+        return {}
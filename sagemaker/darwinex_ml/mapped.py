@@ -0,0 +1,208 @@
+import argparse
+import gc
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import types
+
+import joblib
+import numpy as np
+from botocore.exceptions import ClientError
+
+from darwinex_ml.model_cache import default_s3, fetch_model, is_missing, object_version
+
+EXTENSION = '.mmap'
+MAGIC = b'DXMMAP01'
+# stream length and number of buffers, then the offset and length of each buffer
+_HEADER = struct.Struct('<QQ')
+_ENTRY = struct.Struct('<QQ')
+# buffers start on a page, so each one maps to its own pages
+ALIGN = mmap.PAGESIZE
+# smaller arrays stay inside the pickle stream, mapping them would waste most of a page
+MIN_BYTES = 1 << 14
+# share of the array bytes that must stay mapped once loaded for a .mmap to be published next to its .pkl
+MIN_MAPPED = 0.5
+
+
+def _aligned(position):
+    return -(-position // ALIGN) * ALIGN
+
+
+def dump(obj, path):
+    """Writes `obj` to `path` with its large arrays as raw buffers after a small pickle stream.
+
+    The pickle (protocol 5) keeps the structure and the small values; the
+    contiguous arrays of at least MIN_BYTES go out of band, each one
+    page-aligned in the same file, so the artifact stays one S3 object.
+    """
+    buffers = []
+
+    def out_of_band(buffer):
+        if buffer.raw().nbytes < MIN_BYTES:
+            return True
+        buffers.append(buffer.raw())
+        return False
+
+    stream = pickle.dumps(obj, protocol=5, buffer_callback=out_of_band)
+    entries = []
+    position = 0
+    for buffer in buffers:
+        position = _aligned(position)
+        entries.append((position, buffer.nbytes))
+        position += buffer.nbytes
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_HEADER.pack(len(stream), len(entries)))
+            for entry in entries:
+                f.write(_ENTRY.pack(*entry))
+            f.write(stream)
+            start = _aligned(f.tell())
+            for (offset, _), buffer in zip(entries, buffers):
+                f.seek(start + offset)
+                f.write(buffer)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def _read(path):
+    # the pickle stream and the out-of-band buffers of a dump(), views of a private mapping of `path`
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    view = memoryview(mapping)
+    if view[:len(MAGIC)] != MAGIC:
+        raise ValueError('{} is not a mapped artifact'.format(path))
+    position = len(MAGIC)
+    size, count = _HEADER.unpack_from(view, position)
+    position += _HEADER.size
+    entries = [_ENTRY.unpack_from(view, position + i * _ENTRY.size) for i in range(count)]
+    position += count * _ENTRY.size
+    stream = view[position:position + size]
+    start = _aligned(position + size)
+    return stream, [view[start + offset:start + offset + length] for offset, length in entries]
+
+
+def load(path):
+    """The object written by dump(), its large arrays backed by a mapping of `path`.
+
+    The mapping is private (copy-on-write): pages are read from the page
+    cache on first use and shared by every process mapping the file, and
+    a write to an array copies only the page it touches.
+    """
+    stream, buffers = _read(path)
+    return pickle.loads(stream, buffers=buffers)
+
+
+def mapped_bytes(path):
+    """Bytes of the arrays of `path` still mapped once it is loaded, and of all of them.
+
+    Some classes copy the arrays they are unpickled with: the Tree of every
+    scikit-learn tree model copies its nodes and values into memory of its
+    own, so a forest loads no faster than its pickle and shares no pages.
+    """
+    stream, buffers = _read(path)
+    obj = pickle.loads(stream, buffers=buffers)
+    mapping = np.frombuffer(stream.obj, dtype=np.uint8)
+    start, end = mapping.ctypes.data, mapping.ctypes.data + mapping.nbytes
+
+    # arrays reachable from the object whose data is in the mapping; classes, modules and functions
+    # lead to the rest of the interpreter, not to the object
+    kept = {}
+    seen = set()
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen or isinstance(item, (type, types.ModuleType, types.FunctionType)):
+            continue
+        seen.add(id(item))
+        if isinstance(item, np.ndarray):
+            address = item.__array_interface__['data'][0]
+            if start <= address < end:
+                kept[address] = max(kept.get(address, 0), item.nbytes)
+        pending.extend(gc.get_referents(item))
+    return sum(kept.values()), sum(buffer.nbytes for buffer in buffers)
+
+
+def is_mapped(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_artifact(path):
+    # mapped artifacts and the pickles written by joblib, save_model() or to_pickle()
+    return load(path) if is_mapped(path) else joblib.load(path)
+
+
+def mapped_key(key):
+    return os.path.splitext(key)[0] + EXTENSION
+
+
+def load_published(bucket, key, s3=None):
+    """The artifact at s3://bucket/key, None if training did not publish it."""
+    try:
+        # fetch_model() would fall back to a cached copy of an artifact removed since
+        object_version(bucket, key, s3)
+    except ClientError as ex:
+        # only a missing artifact, a denied or throttled request must not silently serve without it
+        if not is_missing(ex):
+            raise
+        return None
+    return load_artifact(fetch_model(bucket, key, s3=s3))
+
+
+def convert(path, target=None):
+    """Writes the mapped form of the pickle at `path` next to it, returns its path."""
+    target = target or os.path.splitext(path)[0] + EXTENSION
+    return dump(joblib.load(path), target)
+
+
+def publish_converted(path, bucket, key, s3, target=None):
+    """Uploads the mapped form of the pickle at `path` to s3://bucket/key, or removes the one of a previous model.
+
+    It is only published when most of its arrays stay mapped, otherwise
+    the handlers load the .pkl, which is as fast. A stale .mmap would
+    serve predictions of the previous model.
+    """
+    target = convert(path, target)
+    kept, total = mapped_bytes(target)
+    if kept < MIN_MAPPED * total:
+        print('Not publishing {}: {:.1f} of its {:.1f} MB of arrays stay mapped'.format(
+            key, kept / (1 << 20), total / (1 << 20)))
+        s3.delete_object(Bucket=bucket, Key=key)
+        return None
+    s3.upload_file(target, bucket, key)
+    return target
+
+
+def convert_published(bucket, key, s3=None):
+    # the mapped copy of an artifact already in S3, uploaded next to it when it stays mapped
+    s3 = s3 or default_s3()
+    target = mapped_key(key)
+    path = os.path.join(tempfile.mkdtemp(), os.path.basename(target))
+    return target if publish_converted(fetch_model(bucket, key, s3=s3), bucket, target, s3, path) else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Converts .pkl model artifacts to the memory-mapped format')
+    parser.add_argument('paths', nargs='*', help='local .pkl files, written next to them as .mmap')
+    parser.add_argument('--bucket', type=str, default='tfm-2021-darwinex')
+    parser.add_argument('--keys', type=str, nargs='*', default=[],
+                        help='S3 keys, e.g. models/ModRecInvDarwin/final_model.pkl')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        print('{} -> {}'.format(path, convert(path)))
+    for key in args.keys:
+        print('s3://{}/{} -> {}'.format(args.bucket, key, convert_published(args.bucket, key)))
+    if not args.paths and not args.keys:
+        parser.print_usage(sys.stderr)
@@ -0,0 +1,110 @@
+import atexit
+import datetime
+import queue
+import threading
+import time
+
+NAMESPACE = 'DarwinexMachineLearningJobs'
+REGION = 'eu-west-1'
+# PutMetricData accepts up to 1000 datapoints per call
+MAX_BATCH = 1000
+
+_FLUSH = object()
+_STOP = object()
+
+
+class MetricEmitter:
+    """Buffers CloudWatch datapoints and sends them from a background thread.
+
+    `put` never blocks the caller. Datapoints are sent in PutMetricData calls
+    of up to `max_batch` items every `interval` seconds, when `flush` is
+    called, and when the process exits. The thread starts with the first
+    datapoint, so an emitter nothing is put in costs nothing.
+    """
+
+    def __init__(self, namespace=NAMESPACE, cloudwatch=None, interval=10.0, max_batch=MAX_BATCH):
+        self.namespace = namespace
+        self.interval = interval
+        self.max_batch = max_batch
+        self.calls = 0
+        self.errors = 0
+        self._cloudwatch = cloudwatch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='metric-emitter', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def put(self, model, metric, value, unit='None'):
+        if self._thread is None:
+            self._start()
+        self._queue.put({
+            'MetricName': metric,
+            'Dimensions': [
+                {
+                    'Name': 'Model',
+                    'Value': model
+                }
+            ],
+            'Timestamp': datetime.datetime.utcnow(),
+            'Unit': unit,
+            'Value': float(value)
+        })
+
+    def flush(self):
+        # waits until everything put so far has been sent
+        if self._running():
+            self._queue.put(_FLUSH)
+            self._queue.join()
+
+    def close(self):
+        if self._running():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _send(self, batch):
+        if not batch:
+            return
+        if self._cloudwatch is None:
+            from boto3 import client
+
+            self._cloudwatch = client('cloudwatch', region_name=REGION)
+        for start in range(0, len(batch), self.max_batch):
+            try:
+                self._cloudwatch.put_metric_data(MetricData=batch[start:start + self.max_batch],
+                                                 Namespace=self.namespace)
+                self.calls += 1
+            except Exception as ex:
+                self.errors += 1
+                print('Could not send metrics: {}'.format(ex))
+
+    def _run(self):
+        batch = []
+        pending = 0
+        deadline = time.monotonic() + self.interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                pending += 1
+            except queue.Empty:
+                item = None
+
+            if item is not None and item is not _FLUSH and item is not _STOP:
+                batch.append(item)
+            if item is None or item is _FLUSH or item is _STOP or len(batch) >= self.max_batch:
+                self._send(batch)
+                batch = []
+                deadline = time.monotonic() + self.interval
+                for _ in range(pending):
+                    self._queue.task_done()
+                pending = 0
+            if item is _STOP:
+                return
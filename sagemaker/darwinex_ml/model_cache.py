@@ -0,0 +1,113 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+CACHE_DIR = os.environ.get('MODEL_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'darwinex-model-cache'))
+REGION = 'eu-west-1'
+
+_S3 = None
+
+
+def default_s3():
+    # S3_ENDPOINT_URL points the cache to a local S3 stand-in (minio, moto server, ...)
+    global _S3
+    if _S3 is None:
+        # boto3 takes a while to import, the serving handlers only need it once a model is loaded
+        from boto3 import client
+
+        _S3 = client('s3', region_name=REGION, endpoint_url=os.environ.get('S3_ENDPOINT_URL'))
+    return _S3
+
+
+def set_default_s3(s3):
+    # every call without an explicit client uses `s3`, e.g. a LocalS3 when testing handlers without AWS
+    global _S3
+    _S3 = s3
+
+
+def entry_dir(bucket, key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, hashlib.sha256('{}/{}'.format(bucket, key).encode()).hexdigest())
+
+
+def cached_path(bucket, key, etag, cache_dir=CACHE_DIR):
+    # keep the key extension, load_model() expects '<name>.pkl'
+    return os.path.join(entry_dir(bucket, key, cache_dir), etag + os.path.splitext(key)[1])
+
+
+def object_version(bucket, key, s3=None):
+    return (s3 or default_s3()).head_object(Bucket=bucket, Key=key)['ETag'].strip('"')
+
+
+def is_missing(error):
+    # the ClientError of an object that doesn't exist, HEAD requests only get the status code
+    return error.response['Error']['Code'] in ('404', 'NoSuchKey')
+
+
+def fetch_model(bucket, key, cache_dir=CACHE_DIR, s3=None):
+    """Local path of s3://bucket/key, downloaded only when its ETag is not cached yet.
+
+    Downloads go to a temporary file in the cache entry and are renamed into
+    place, so concurrent workers never see a partial artifact. If S3 can't
+    be reached, the last cached version is used.
+    """
+    s3 = s3 or default_s3()
+    directory = entry_dir(bucket, key, cache_dir)
+    os.makedirs(directory, exist_ok=True)
+
+    try:
+        etag = object_version(bucket, key, s3)
+    except (BotoCoreError, ClientError):
+        fallback = _latest(directory)
+        if fallback is None:
+            raise
+        print('Using cached {} for s3://{}/{}'.format(fallback, bucket, key))
+        return fallback
+
+    path = cached_path(bucket, key, etag, cache_dir)
+    if os.path.exists(path):
+        return path
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        # IfMatch makes the download fail instead of mixing versions if the key changes meanwhile
+        body = s3.get_object(Bucket=bucket, Key=key, IfMatch=etag)['Body']
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(body, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    _remove_old_versions(directory)
+    return path
+
+
+def _versions(directory):
+    versions = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not name.endswith('.tmp'):
+            try:
+                versions.append((os.path.getmtime(path), path))
+            except OSError:
+                # removed by another worker
+                pass
+    return [path for _, path in sorted(versions, reverse=True)]
+
+
+def _latest(directory):
+    versions = _versions(directory)
+    return versions[0] if versions else None
+
+
+def _remove_old_versions(directory, keep=2):
+    # the previous version stays, a worker may still be about to open it
+    for path in _versions(directory)[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Read by the forked workers, only (model id, fold) pairs are sent to them
+_STATE = {}
+
+
+def _shared_dir():
+    # /dev/shm keeps the arrays in memory shared by every worker
+    return '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def _share(array, directory):
+    fd, path = tempfile.mkstemp(dir=directory, prefix='model-zoo-', suffix='.npy')
+    os.close(fd)
+    shared = np.lib.format.open_memmap(path, mode='w+', dtype=array.dtype, shape=array.shape)
+    shared[:] = array
+    shared.flush()
+    del shared
+    return path
+
+
+def _single_threaded(model):
+    # the pool already uses every core
+    params = model.get_params()
+    for name in ('n_jobs', 'thread_count', 'nthread'):
+        if name in params and params[name] not in (None, 1):
+            model.set_params(**{name: 1})
+    return model
+
+
+def _run_fold(model_id, fold):
+    from pycaret.internal.pipeline import estimator_pipeline
+    from sklearn.compose import TransformedTargetRegressor
+
+    X = np.load(_STATE['X'], mmap_mode='r')
+    y = np.load(_STATE['y'], mmap_mode='r')
+    train, test = _STATE['folds'][fold]
+    X_train = pd.DataFrame(X[train], columns=_STATE['columns'])
+    X_test = pd.DataFrame(X[test], columns=_STATE['columns'])
+    y_train, y_test = pd.Series(y[train]), pd.Series(y[test])
+
+    definition = _STATE['models'][model_id]
+    model = _single_threaded(definition.class_def(**definition.args))
+    if _STATE['transform_target'] is not None and not isinstance(model, TransformedTargetRegressor):
+        model = _STATE['transform_target'](model)
+
+    scores = {}
+    with estimator_pipeline(_STATE['pipeline'], model) as pipeline:
+        start = time.time()
+        try:
+            pipeline.fit(X_train, y_train)
+            fitted = True
+        except Exception:
+            fitted = False
+        fit_time = time.time() - start
+
+        for metric in _STATE['metrics'].values():
+            try:
+                score = metric.scorer(pipeline, X_test, y_test) * (1 if metric.greater_is_better else -1)
+            except Exception:
+                score = 0.0
+            # same as cross_validate(error_score=0) in create_model
+            scores[metric.display_name] = score if fitted else 0.0
+    return model_id, fold, scores, fit_time
+
+
+def compare_models_parallel(sort, include=None, exclude=None, turbo=True, n_jobs=None, round=4):
+    """compare_models() with every model x fold fit spread over a process pool.
+
+    Must be called after setup() of pycaret.classification or
+    pycaret.regression. The transformed training data is written once to
+    shared memory and opened read-only by each worker. Returns the id of the
+    best model and the leaderboard, which is also what pull() returns next.
+    """
+    from pycaret.internal import tabular
+
+    if include:
+        model_ids = list(include)
+    else:
+        model_ids = [k for k, v in tabular._all_models.items() if v.is_turbo or not turbo]
+        if exclude:
+            model_ids = [k for k in model_ids if k not in exclude]
+
+    sort_metric = tabular._get_metric(sort)
+    if sort_metric is None:
+        raise ValueError('Sort method {} not supported.'.format(sort))
+
+    X = tabular.X_train.reset_index(drop=True)
+    y = tabular.y_train.reset_index(drop=True)
+    folds = list(tabular._get_cv_splitter(None).split(X, y, groups=tabular._get_groups(None)))
+
+    transform_target = None
+    if getattr(tabular, 'transform_target_param', False):
+        def transform_target(model):
+            return tabular.PowerTransformedTargetRegressor(
+                regressor=model, power_transformer_method=tabular.transform_target_method_param)
+
+    directory = _shared_dir()
+    _STATE.update({
+        'X': _share(X.to_numpy(dtype=float), directory),
+        'y': _share(y.to_numpy(), directory),
+        'columns': list(X.columns),
+        'folds': folds,
+        'models': tabular._all_models_internal,
+        'metrics': tabular._all_metrics,
+        'pipeline': tabular._internal_pipeline,
+        'transform_target': transform_target,
+    })
+
+    results = {}
+    try:
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count(), mp_context=context) as pool:
+            jobs = [pool.submit(_run_fold, model_id, fold) for model_id in model_ids for fold in range(len(folds))]
+            for job in jobs:
+                model_id, fold, scores, fit_time = job.result()
+                results.setdefault(model_id, []).append(dict(scores, **{'TT (Sec)': fit_time}))
+    finally:
+        for key in ('X', 'y'):
+            os.remove(_STATE[key])
+        _STATE.clear()
+
+    rows = []
+    for model_id in model_ids:
+        folds_scores = pd.DataFrame(results.get(model_id, []))
+        metric_columns = folds_scores.columns.drop('TT (Sec)', errors='ignore')
+        # models that failed on every fold are left out, like compare_models(errors='ignore')
+        if folds_scores.empty or folds_scores[metric_columns].to_numpy().sum() == 0.0:
+            continue
+        row = folds_scores.mean()
+        row['Model'] = tabular._all_models_internal[model_id].name
+        row.name = model_id
+        rows.append(row)
+
+    columns = ['Model'] + [metric.display_name for metric in tabular._all_metrics.values()] + ['TT (Sec)']
+    leaderboard = pd.DataFrame(rows, columns=columns)
+    leaderboard[columns[1:]] = leaderboard[columns[1:]].astype(float).round(round)
+    leaderboard = leaderboard.sort_values(by=sort_metric.display_name, ascending=not sort_metric.greater_is_better)
+
+    tabular.display_container.append(leaderboard)
+    return leaderboard.index[0], leaderboard
@@ -0,0 +1,172 @@
+import gc
+import importlib.util
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# directory holding the model folders and darwinex_ml, /opt/ml/code in the container
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# inference handlers of each model, relative to ROOT
+HANDLERS = {
+    'ModClasClientes': 'ModClasClientes/serve_ModClasClientes.py',
+    'ModConversion-investor': 'ModConversion/investor/serve_ModConversion_investor.py',
+    'ModConversion-trader': 'ModConversion/trader/serve_ModConversion_trader.py',
+    'ModEstIngresos': 'ModEstIngresos/serve_ModEstIngresos.py',
+    'ModRecInvDarwin': 'ModRecInvDarwin/serve_ModRecInvDarwin.py',
+}
+# memory of the loaded models in each worker process
+MAX_BYTES = int(os.environ.get('MULTI_MODEL_MAX_BYTES', 2 << 30))
+
+_handlers_lock = threading.Lock()
+
+
+def _module_name(name, handlers):
+    return os.path.splitext(os.path.basename(handlers[name]))[0]
+
+
+def load_handler(name, handlers=HANDLERS, root=ROOT):
+    """Module of the handler script of model `name`, imported once per process."""
+    if name not in handlers:
+        raise ValueError('Unknown model {}, expected one of {}'.format(name, ', '.join(sorted(handlers))))
+    path = os.path.join(root, handlers[name])
+    module_name = _module_name(name, handlers)
+    with _handlers_lock:
+        if module_name not in sys.modules:
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[module_name] = module
+        return sys.modules[module_name]
+
+
+def imported_handlers(handlers=HANDLERS):
+    # handler modules already imported by a request, the others have nothing to report
+    return {name: sys.modules[_module_name(name, handlers)] for name in handlers
+            if _module_name(name, handlers) in sys.modules}
+
+
+def handler_loaders(handlers=HANDLERS, root=ROOT):
+    # each model is loaded by the model_fn of its own script
+    return {name: (lambda name=name: load_handler(name, handlers, root).model_fn(root)) for name in handlers}
+
+
+def split_content_type(content_type):
+    """Model name and content type of a request sent as 'application/json; model=ModEstIngresos'.
+
+    The model parameter is removed, the handler of the model gets the
+    content type it expects.
+    """
+    name = None
+    params = []
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'model':
+            name = value.strip().strip('"')
+        else:
+            params.append(param.strip())
+    return name, '; '.join([content_type.split(';')[0].strip()] + params)
+
+
+class _ByteCounter:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+
+def pickled_size(model):
+    """Bytes of `model` pickled, close to the memory taken by its arrays, which dominate it.
+
+    Nothing is kept: the pickle stream is only counted and the large
+    buffers go out of band, so sizing a model never copies it.
+    """
+    # a HotSwapModel holds a thread and a lock, only the model it serves is sized
+    model = getattr(model, 'current', model)
+    counter = _ByteCounter()
+    buffers = []
+    pickle.dump(model, counter, protocol=5, buffer_callback=lambda buffer: buffers.append(buffer.raw().nbytes))
+    return counter.size + sum(buffers)
+
+
+class ModelRouter:
+    """Loads models by name on first use and keeps the most recently used ones within `max_bytes`.
+
+    `loaders` maps each model name to a function returning the loaded model.
+    When a load goes over the budget the least recently used models are
+    evicted; the model just loaded always stays, even if it is bigger than
+    the budget on its own. Loads of different models run concurrently, the
+    same model is never loaded twice at once.
+    """
+
+    def __init__(self, loaders, max_bytes=MAX_BYTES, sizeof=pickled_size):
+        self.loaders = loaders
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.counters = {name: {'loads': 0, 'hits': 0, 'evictions': 0, 'bytes': 0, 'load_seconds': 0.0}
+                         for name in loaders}
+        self._models = OrderedDict()
+        self._loading = {name: threading.Lock() for name in loaders}
+        self._lock = threading.Lock()
+
+    def _hit(self, name):
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                self.counters[name]['hits'] += 1
+                return True, self._models[name]
+        return False, None
+
+    def get(self, name):
+        if name not in self.loaders:
+            raise ValueError('Unknown model {}, expected one of {}'.format(name, ', '.join(sorted(self.loaders))))
+        hit, model = self._hit(name)
+        if hit:
+            return model
+
+        with self._loading[name]:
+            # another thread may have loaded it meanwhile
+            hit, model = self._hit(name)
+            if hit:
+                return model
+            start = time.perf_counter()
+            model = self.loaders[name]()
+            size = self.sizeof(model)
+            with self._lock:
+                counters = self.counters[name]
+                counters['loads'] += 1
+                counters['bytes'] = size
+                counters['load_seconds'] += time.perf_counter() - start
+                self._models[name] = model
+                evicted = self._evict()
+        if evicted:
+            print('Evicted {} to load {}'.format(', '.join(evicted), name))
+            gc.collect()
+        return model
+
+    def _evict(self):
+        # the model just loaded is the last one and is never evicted
+        evicted = []
+        while self.loaded_bytes() > self.max_bytes and len(self._models) > 1:
+            name = next(iter(self._models))
+            model = self._models.pop(name)
+            if hasattr(model, 'close'):
+                # stops the polling of a HotSwapModel, requests holding it still finish
+                model.close()
+            self.counters[name]['evictions'] += 1
+            evicted.append(name)
+        return evicted
+
+    def loaded(self):
+        # least recently used first
+        return list(self._models)
+
+    def loaded_bytes(self):
+        return sum(self.counters[name]['bytes'] for name in self._models)
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(counters, loaded=name in self._models) for name, counters in self.counters.items()}
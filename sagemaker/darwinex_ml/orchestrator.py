@@ -0,0 +1,324 @@
+import datetime
+import importlib
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+
+from darwinex_ml.dataset_store import dataset_name, load_dataset
+from darwinex_ml.lags import add_lag_features
+from darwinex_ml.metrics import MetricEmitter
+from darwinex_ml.setup_cache import cached_setup
+
+BUCKET = 'tfm-2021-darwinex'
+# how each model is trained, shared by the AllModels job and the job of each model
+SPECS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models.json')
+
+
+def load_specs(path=SPECS, only=None):
+    with open(path) as f:
+        specs = json.load(f)
+    if only:
+        specs = [spec for spec in specs if spec['name'] in only]
+    return specs
+
+
+def send_metric(metrics, job, metric, value):
+    metrics.put(job, metric, value)
+    # one job trains every model, the name keeps the SageMaker metric definitions apart
+    print('Metric: {}:{}={}//'.format(job, metric, value))
+
+
+def upload(path, spec, mapped=None):
+    from darwinex_ml.mapped import publish_converted
+    from darwinex_ml.model_cache import default_s3
+
+    s3 = default_s3()
+    s3.upload_file(path, BUCKET, '{}/final_model.pkl'.format(spec['s3_prefix']))
+    s3.upload_file(path, BUCKET, '{}/history/{}_model'.format(spec['s3_prefix'], datetime.datetime.now()))
+    # `mapped` is another form of the model for the handlers, the .pkl with its arrays mapped by default
+    if mapped:
+        s3.upload_file(mapped, BUCKET, '{}/final_model.mmap'.format(spec['s3_prefix']))
+    else:
+        publish_converted(path, BUCKET, '{}/final_model.mmap'.format(spec['s3_prefix']), s3)
+
+
+def upload_compiled(pipeline, spec, sample=None, predict_model=None):
+    # the handlers serve the compiled model when there is one, the pipeline otherwise
+    from darwinex_ml.compiled import publish
+    from darwinex_ml.model_cache import default_s3
+
+    publish(pipeline, spec['name'] + '_compiled.mmap', BUCKET, '{}/compiled_model.mmap'.format(spec['s3_prefix']),
+            default_s3(), sample, predict_model)
+
+
+def upload_direct(model, series, spec):
+    from darwinex_ml.forecasting import publish_direct
+    from darwinex_ml.model_cache import default_s3
+
+    publish_direct(model, series, spec['lags']['window'], spec['lags'].get('horizon', 0),
+                   spec['name'] + '_direct.mmap', BUCKET, '{}/direct_model.mmap'.format(spec['s3_prefix']),
+                   default_s3())
+
+
+def upload_rules(rules, spec):
+    from darwinex_ml.mapped import dump
+    from darwinex_ml.model_cache import default_s3
+    from darwinex_ml.rules import RecommendationTable, RuleIndex, RuleTable
+
+    name = spec['name']
+    rules.to_pickle(name + '.pkl')
+    table = RuleTable.from_rules(rules)
+    upload(name + '.pkl', spec, dump(table, name + '.mmap'))
+    path = dump(RecommendationTable(RuleIndex(table)), name + '_recommendations.mmap')
+    default_s3().upload_file(path, BUCKET, '{}/recommendations.mmap'.format(spec['s3_prefix']))
+
+
+def state_key(spec):
+    return '{}/training_state.json'.format(spec['s3_prefix'])
+
+
+def full_search(spec, data):
+    """Training state of the last run and why this one searches every model, None to refit its estimator.
+
+    Only specs with "retrain": "incremental" and a "training_state" reuse
+    the estimator of the last run.
+    """
+    if spec.get('retrain', 'full') == 'full':
+        return None, 'full retrain requested'
+    if 'training_state' not in spec:
+        raise ValueError('{} keeps no training state to retrain incrementally'.format(spec['name']))
+    from darwinex_ml.model_cache import default_s3
+    from darwinex_ml.warm_start import appended_rows, full_search_reason, load_state
+
+    state = load_state(BUCKET, state_key(spec), default_s3())
+    reason = full_search_reason(state)
+    if reason is None:
+        date_column = spec['training_state']['date_column']
+        print('{} rows appended after {}'.format(len(appended_rows(data, state, date_column)), state['last_date']))
+    return state, reason
+
+
+def validation_error(pycaret, model, spec):
+    # error on the rows kept out by setup(), in the sort metric, lower is better
+    pycaret.predict_model(model, verbose=False)
+    return float(pycaret.pull()[spec['sort']].iloc[0])
+
+
+def save_training_state(state, model, dates, spec):
+    # what the next incremental retrain reads, validation_error stays the one of the last full search
+    from pycaret.internal.tabular import _get_model_id
+
+    from darwinex_ml.model_cache import default_s3
+    from darwinex_ml.warm_start import plain_params, save_state
+
+    state.update({'last_date': str(dates.max().date()), 'estimator': _get_model_id(model),
+                  'params': plain_params(model)})
+    save_state(state, BUCKET, state_key(spec), default_s3())
+
+
+def train_streaming_model(spec, data_dir):
+    """Pipeline and metrics of the classifier of `spec` trained on its CSV `spec['chunksize']` rows at a time.
+
+    The columns ignored or categorical in the setup of the spec are so in
+    the streaming pipeline too, and fix_imbalance weights the classes.
+    """
+    import joblib
+
+    from darwinex_ml.streaming import train_streaming
+
+    if spec['module'] != 'classification':
+        raise ValueError('{} is not a classification model, it cannot be trained in chunks'.format(spec['name']))
+    setup = spec['setup']
+    pipeline, last_metrics = train_streaming(os.path.join(data_dir, spec['dataset']), spec['target'],
+                                             spec.get('streaming_estimator', 'sgd'), spec['chunksize'],
+                                             categorical_features=setup.get('categorical_features', ()),
+                                             ignore_features=setup.get('ignore_features', ()),
+                                             balance=setup.get('fix_imbalance', False))
+    # predict_model() and load_model() take the pipeline as it is
+    joblib.dump(pipeline, spec['name'] + '.pkl')
+    return pipeline, last_metrics
+
+
+def send_metrics(spec, last_metrics, **extra):
+    metrics = MetricEmitter()
+    for metric in spec.get('metrics', []):
+        send_metric(metrics, spec['name'], metric, last_metrics[metric].iloc[0])
+    for metric, value in extra.items():
+        send_metric(metrics, spec['name'], metric, value)
+    metrics.close()
+
+
+def train_model(spec, data, data_dir, setup_cache=None):
+    """Trains the model of `spec` and publishes it under its s3_prefix.
+
+    `data` is its dataset as read_dataset() gives it, None for the specs
+    that read their file from `data_dir` themselves.
+    """
+    started = time.time()
+    pycaret = importlib.import_module('pycaret.' + spec['module'])
+    name = spec['name']
+
+    if spec['module'] == 'arules':
+        if spec.get('miner') == 'fpgrowth':
+            from darwinex_ml.itemsets import mine_rules
+
+            model = mine_rules(os.path.join(data_dir, spec['dataset']), **spec['setup'], **spec.get('create', {}))
+        else:
+            pycaret.setup(data=data, **spec['setup'])
+            model = pycaret.create_model(**spec.get('create', {}))
+        upload_rules(model, spec)
+        return
+
+    if spec.get('chunksize'):
+        pipeline, last_metrics = train_streaming_model(spec, data_dir)
+        upload(name + '.pkl', spec)
+        upload_compiled(pipeline, spec)
+        send_metrics(spec, last_metrics)
+        return
+
+    state, reason = full_search(spec, data)
+    if 'training_state' in spec:
+        import pandas as pd
+
+        dates = pd.to_datetime(data[spec['training_state']['date_column']])
+    if 'lags' in spec:
+        series = data[spec['lags']['column']].to_numpy()
+        data = add_lag_features(data, spec['lags']['column'], spec['lags']['window'])
+
+    setup_kwargs = dict(target=spec['target'], n_jobs=spec.get('cpus', -1), silent=True, html=False, verbose=False,
+                        **spec['setup'])
+    if setup_cache:
+        cached_setup(spec['module'], data, cache_dir=setup_cache, **setup_kwargs)
+    else:
+        pycaret.setup(data=data, **setup_kwargs)
+
+    if reason is None:
+        from darwinex_ml.warm_start import degraded
+
+        # refit the last chosen estimator with its tuned hyperparameters on the extended data
+        print('Incremental retrain of {}'.format(state['estimator']))
+        model = pycaret.create_model(state['estimator'], verbose=False, **state['params'])
+        last_metrics = pycaret.pull()
+        error = validation_error(pycaret, model, spec)
+        if degraded(state, error):
+            reason = 'validation {} {} over {}'.format(spec['sort'], error, state['validation_error'])
+
+    if reason is not None:
+        if 'training_state' in spec:
+            print('Full model search: {}'.format(reason))
+        if spec.get('parallel_compare'):
+            from darwinex_ml.model_zoo import compare_models_parallel
+
+            best_id, _ = compare_models_parallel(sort=spec['sort'], n_jobs=spec.get('cpus'),
+                                                 **spec.get('compare', {}))
+            model = pycaret.create_model(best_id, cross_validation=False, verbose=False)
+        else:
+            model = pycaret.compare_models(sort=spec['sort'], verbose=False, **spec.get('compare', {}))
+        model = pycaret.tune_model(model, verbose=False, **spec.get('tune', {}))
+        if spec.get('calibrate'):
+            model = pycaret.calibrate_model(model, verbose=False)
+        last_metrics = pycaret.pull()
+        if 'training_state' in spec:
+            # the baseline of the incremental runs until the next full search, so a slow drift adds up
+            state = {'last_full_search': datetime.datetime.now().isoformat(),
+                     'validation_error': validation_error(pycaret, model, spec)}
+    final_model = pycaret.finalize_model(model)
+    if 'training_state' in spec:
+        save_training_state(state, model, dates, spec)
+
+    from darwinex_ml.compiled import parity_sample
+
+    pycaret.save_model(final_model, model_name=name, verbose=False)
+    upload(name + '.pkl', spec)
+    upload_compiled(pycaret.load_model(name, verbose=False), spec,
+                    parity_sample(pycaret.get_config('data_before_preprocess'), spec['target']),
+                    pycaret.predict_model)
+    if 'lags' in spec:
+        # 'horizon' in the lags of the spec also publishes a model forecasting that many days per call
+        upload_direct(model, series, spec)
+
+    extra = {}
+    if 'training_state' in spec:
+        extra['RetrainSeconds-{}'.format('full' if reason else 'incremental')] = time.time() - started
+    send_metrics(spec, last_metrics, **extra)
+
+
+def reads_file(spec):
+    # the streaming trainer and the FP-growth miner read the CSV themselves, in chunks or as sparse baskets
+    return bool(spec.get('chunksize')) or spec.get('miner') == 'fpgrowth'
+
+
+def read_dataset(spec, data_dir):
+    """Dataset of `spec` with the dtypes of pd.read_csv, None when train_model() reads the file itself."""
+    if reads_file(spec):
+        return None
+    directory, filename = os.path.split(os.path.join(data_dir, spec['dataset']))
+    return load_dataset(directory, dataset_name(filename), widen=True)
+
+
+def train_single(spec, data_dir, setup_cache=None):
+    """Trains the model of `spec` in this process, as the job of that model alone does.
+
+    The channel of that job holds the dataset itself, not the folders of
+    every model, and the model has every core of the instance rather than
+    its share of the AllModels job.
+    """
+    spec = {key: value for key, value in spec.items() if key != 'cpus'}
+    spec['dataset'] = os.path.basename(spec['dataset'])
+    train_model(spec, read_dataset(spec, data_dir), data_dir, setup_cache)
+
+
+def _train_in_child(spec, data, data_dir, setup_cache):
+    started = time.time()
+    train_model(spec, data, data_dir, setup_cache)
+    print('Trained {} in {:.1f} s'.format(spec['name'], time.time() - started))
+
+
+def run_all(specs, data_dir, cpu_budget=None, setup_cache=None):
+    """Trains every spec in its own process, never using more than `cpu_budget` CPUs at once.
+
+    Each dataset is read once by the parent and handed to every model
+    trained on it. Returns the wall time of each model and of the whole run.
+    """
+    cpu_budget = cpu_budget or os.cpu_count()
+    datasets = {}
+    for spec in specs:
+        if spec['dataset'] not in datasets and not reads_file(spec):
+            datasets[spec['dataset']] = read_dataset(spec, data_dir)
+
+    # Arrow has started threads in this process by now, even without use_threads; a fork would copy
+    # their locks held. The children fork from a clean server instead and get their frame pickled.
+    context = multiprocessing.get_context('forkserver')
+    # biggest models first, smaller ones fill the remaining CPUs
+    pending = sorted(specs, key=lambda spec: -spec.get('cpus', 1))
+    running = {}
+    durations = {}
+    failed = []
+    free = cpu_budget
+    start = time.time()
+    while pending or running:
+        for spec in list(pending):
+            cpus = min(spec.get('cpus', 1), cpu_budget)
+            if cpus <= free:
+                data = None if reads_file(spec) else datasets[spec['dataset']]
+                process = context.Process(target=_train_in_child, name=spec['name'],
+                                          args=(spec, data, data_dir, setup_cache))
+                process.start()
+                running[process.sentinel] = (process, spec, cpus, time.time())
+                pending.remove(spec)
+                free -= cpus
+
+        for sentinel in multiprocessing.connection.wait(list(running)):
+            process, spec, cpus, started = running.pop(sentinel)
+            process.join()
+            free += cpus
+            durations[spec['name']] = time.time() - started
+            if process.exitcode != 0:
+                failed.append(spec['name'])
+
+    durations['total'] = time.time() - start
+    if failed:
+        raise RuntimeError('Training failed for {}'.format(', '.join(failed)))
+    return durations
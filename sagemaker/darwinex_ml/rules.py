@@ -0,0 +1,299 @@
+import hashlib
+import itertools
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+SORT_METRICS = ('lift', 'confidence', 'support')
+# longest basket of the RecommendationTable, most requests carry one to three darwins
+MAX_BASKET = 3
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def rules_digest(rules):
+    # tells whether a RecommendationTable was built from the RuleTable `rules`, whose codes it holds
+    digest = hashlib.blake2b('\n'.join(map(str, rules.darwins)).encode(), digest_size=16)
+    for offsets, codes in rules.itemsets.values():
+        digest.update(offsets.tobytes())
+        digest.update(codes.tobytes())
+    for metric in SORT_METRICS:
+        if metric in rules.metrics:
+            digest.update(rules.metrics[metric].tobytes())
+    return digest.hexdigest()
+
+
+def _csr(itemsets, codes):
+    # offsets (one more than rules) and the codes of each itemset, sorted, between two offsets
+    offsets = np.zeros(len(itemsets) + 1, dtype=np.int32)
+    np.cumsum([len(items) for items in itemsets], out=offsets[1:])
+    # a few hundred darwins fit in two bytes
+    dtype = np.uint16 if len(codes) <= np.iinfo(np.uint16).max else np.int32
+    return offsets, np.array([code for items in itemsets for code in sorted(codes[darwin] for darwin in items)],
+                             dtype=dtype)
+
+
+def _compact(values):
+    # float32 when the values are rounded to a few decimals that survive it, as mine_rules() leaves them
+    for decimals in range(9):
+        if np.array_equal(np.round(values, decimals), values, equal_nan=True):
+            if np.array_equal(np.round(values.astype(np.float32).astype(float), decimals), values, equal_nan=True):
+                return values.astype(np.float32), decimals
+            break
+    return values, None
+
+
+def _json_float(value):
+    # what DataFrame.to_json() writes with its double_precision=10: ten decimals rounded like its
+    # encoder does, 10 significant digits beyond 1e16 or below 1e-15, NaN and inf as null
+    if not math.isfinite(value):
+        return 'null'
+    magnitude = abs(value)
+    if magnitude > 1e16 or 0 < magnitude < 1e-15:
+        return '{:.10g}'.format(value)
+    whole = int(magnitude)
+    scaled = (magnitude - whole) * 1e10
+    frac = int(scaled)
+    if scaled - frac > 0.5 or (scaled - frac == 0.5 and (frac == 0 or frac & 1)):
+        frac += 1
+    if frac >= 10 ** 10:
+        whole, frac = whole + 1, 0
+    text = '{}.{}'.format(whole, '{:010d}'.format(frac).rstrip('0') or '0')
+    return '-' + text if value < 0 else text
+
+
+class RuleTable:
+    """The rule DataFrame of create_model() or mine_rules() as arrays, what ModRecInvDarwin publishes.
+
+    Darwins are codes of the sorted `darwins`, antecedents and consequents
+    CSR offsets and codes, and each metric a float32 column when its
+    rounded values survive it (float64 otherwise). Only arrays are pickled,
+    so loading a mapped.dump() of it builds no frozenset or Python float
+    per rule; to_frame() gives back the rows of the DataFrame and to_json()
+    its JSON.
+    """
+
+    def __init__(self, darwins, itemsets, metrics, decimals, index, columns, dtypes):
+        self.darwins = darwins
+        self.itemsets = itemsets
+        self.metrics = metrics
+        self.decimals = decimals
+        self.index = index
+        self.columns = columns
+        self.dtypes = dtypes
+
+    @classmethod
+    def from_rules(cls, rules):
+        numeric = [column for column in rules.columns if column not in ('antecedents', 'consequents')]
+        unknown = [column for column in numeric if not pd.api.types.is_numeric_dtype(rules[column])]
+        if unknown:
+            raise ValueError('Rule columns {} are not numeric'.format(', '.join(unknown)))
+
+        darwins = np.array(sorted(set().union(*rules['antecedents'], *rules['consequents'])), dtype=object)
+        codes = {darwin: code for code, darwin in enumerate(darwins)}
+        itemsets = {column: _csr(rules[column].tolist(), codes) for column in ('antecedents', 'consequents')}
+        metrics, decimals = {}, {}
+        for column in numeric:
+            metrics[column], decimals[column] = _compact(rules[column].to_numpy(dtype=float))
+        # a RangeIndex, the one of mine_rules(), pickles as its bounds
+        index = rules.index if isinstance(rules.index, pd.RangeIndex) else rules.index.to_numpy()
+        return cls(darwins, itemsets, metrics, decimals, index, list(rules.columns),
+                   {column: str(rules[column].dtype) for column in numeric})
+
+    def __len__(self):
+        return len(self.index)
+
+    def restore(self, metric, values):
+        """`values` of `metric` as the DataFrame had them."""
+        values = np.asarray(values, dtype=float)
+        if self.decimals[metric] is not None:
+            values = np.round(values, self.decimals[metric])
+        return values.astype(self.dtypes[metric], copy=False)
+
+    def to_frame(self, positions=None):
+        """Rows at `positions` (all by default) as the DataFrame they were built from, the response of the handlers."""
+        positions = np.arange(len(self)) if positions is None else np.asarray(positions, dtype=np.int64)
+        data = {}
+        for column in self.columns:
+            if column in self.itemsets:
+                offsets, codes = self.itemsets[column]
+                # an object column even without rows, like the DataFrame
+                data[column] = np.fromiter((frozenset(self.darwins[codes[offsets[position]:offsets[position + 1]]])
+                                            for position in positions), dtype=object, count=len(positions))
+            else:
+                data[column] = self.restore(column, self.metrics[column][positions])
+        return pd.DataFrame(data, index=self.index[positions], columns=self.columns)
+
+    def to_json(self, positions=None):
+        """to_frame(positions).to_json(), written from the arrays; the darwins of each itemset are sorted."""
+        positions = np.arange(len(self)) if positions is None else np.asarray(positions, dtype=np.int64)
+        if getattr(self, '_quoted', None) is None:
+            self._quoted = [json.dumps(str(darwin)) for darwin in self.darwins]
+        keys = [json.dumps(str(key)) + ':' for key in self.index[positions].tolist()]
+        columns = []
+        for column in self.columns:
+            if column in self.itemsets:
+                offsets, codes = self.itemsets[column]
+                values = ['[' + ','.join([self._quoted[code] for code in codes[start:end].tolist()]) + ']'
+                          for start, end in zip(offsets[positions].tolist(), offsets[positions + 1].tolist())]
+            else:
+                values = map(_json_float, self.restore(column, self.metrics[column][positions]).tolist())
+            columns.append('{}:{{{}}}'.format(json.dumps(column), ','.join(map(str.__add__, keys, values))))
+        return '{' + ','.join(columns) + '}'
+
+
+class RuleRows:
+    """Rows at `positions` of a RuleTable, serialized by the handlers without building their DataFrame."""
+
+    def __init__(self, table, positions):
+        self.table = table
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def to_frame(self):
+        return self.table.to_frame(self.positions)
+
+    def to_json(self):
+        return self.table.to_json(self.positions)
+
+
+class RuleIndex:
+    """Inverted index from each darwin to the rules whose antecedents contain it.
+
+    `query` returns the same rows as
+    `rules[rules.antecedents.map(set(darwins).issubset)]`, but only touches
+    the rules listed for the requested darwins. `recommend` ranks the
+    consequents of those rows, from `table` when it has the basket.
+    """
+
+    def __init__(self, rules, table=None):
+        # the DataFrame of the .pkl models is encoded on load
+        self.rules = rules if isinstance(rules, RuleTable) else RuleTable.from_rules(rules)
+        self.darwins = self.rules.darwins
+
+        # positions of the rules of each darwin, in rule order: the antecedent codes sorted stably
+        offsets, codes = self.rules.itemsets['antecedents']
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        positions = np.repeat(np.arange(len(self.rules)), np.diff(offsets))[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else _EMPTY
+        self._postings = {self.darwins[codes[start]]: posting
+                          for start, posting in zip(starts, np.split(positions, starts[1:]))}
+        self._metrics = {metric: self.rules.metrics[metric] for metric in SORT_METRICS if metric in self.rules.metrics}
+
+        offsets, self._consequent_codes = self.rules.itemsets['consequents']
+        self._consequent_counts = np.diff(offsets)
+        self._consequent_offsets = offsets[:-1]
+
+        self.table = None
+        if table is not None:
+            if table.digest == rules_digest(self.rules):
+                self.table = table
+            else:
+                # published before or after these rules, the next swap loads both
+                print('Ignoring a RecommendationTable of other rules')
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, darwins):
+        darwins = set(darwins)
+        if not darwins:
+            return np.arange(len(self.rules))
+
+        postings = sorted((self._postings.get(darwin, _EMPTY) for darwin in darwins), key=len)
+        positions = postings[0]
+        for posting in postings[1:]:
+            if not len(positions):
+                break
+            positions = np.intersect1d(positions, posting, assume_unique=True)
+        return positions
+
+    def select(self, darwins, top_k=None, sort_by='lift'):
+        """The rows of query() as RuleRows."""
+        positions = self.match(darwins)
+        if top_k is not None:
+            scores = self._scores(sort_by)[positions]
+            if top_k < len(positions):
+                # of the rows tied with the k-th best score, the first ones in rule order, like a stable sort
+                kth = -np.partition(-scores, top_k - 1)[top_k - 1] if top_k > 0 else np.inf
+                best = scores > kth
+                best[np.flatnonzero(scores == kth)[:top_k - best.sum()]] = True
+                positions, scores = positions[best], scores[best]
+            positions = positions[np.lexsort((positions, -scores))]
+        return RuleRows(self.rules, positions)
+
+    def query(self, darwins, top_k=None, sort_by='lift'):
+        return self.select(darwins, top_k, sort_by).to_frame()
+
+    def _scores(self, sort_by):
+        if sort_by not in self._metrics:
+            raise ValueError('{} is not a valid sort metric, use one of {}'.format(sort_by, SORT_METRICS))
+        return self._metrics[sort_by]
+
+    def rank(self, darwins, sort_by='lift'):
+        """Codes of the consequent darwins of the rules match() finds and their best `sort_by` score, best first.
+
+        A darwin in several consequents appears once; ties are in darwin order.
+        """
+        positions = self.match(darwins)
+        counts = self._consequent_counts[positions]
+        ends = np.cumsum(counts)
+        codes = self._consequent_codes[np.arange(ends[-1] if len(ends) else 0) +
+                                       np.repeat(self._consequent_offsets[positions] - ends + counts, counts)]
+        scores = np.repeat(self._scores(sort_by)[positions], counts)
+
+        # the best score of each darwin is the first one once sorted by darwin and score
+        order = np.lexsort((-scores, codes))
+        codes, scores = codes[order], scores[order]
+        first = np.ones(len(codes), dtype=bool)
+        first[1:] = codes[1:] != codes[:-1]
+        codes, scores = codes[first], scores[first]
+        order = np.lexsort((codes, -scores))
+        return codes[order], scores[order]
+
+    def recommend(self, darwins, top_k=None, sort_by='lift'):
+        """Darwins to recommend for the basket `darwins` with their scores, and whether `table` had the basket."""
+        ranked = self.table.get(darwins, sort_by) if self.table is not None else None
+        hit = ranked is not None
+        codes, scores = ranked if hit else self.rank(darwins, sort_by)
+        return pd.DataFrame({'darwin': self.darwins[codes[:top_k]],
+                             sort_by: self.rules.restore(sort_by, scores[:top_k])}), hit
+
+
+class RecommendationTable:
+    """RuleIndex.rank() of every basket of up to `max_basket` darwins, built once by training.
+
+    The baskets are the subsets of the rule antecedents, the only ones any
+    rule matches, so a basket within `max_basket` missing from the table
+    has nothing to recommend: get() only returns None for longer baskets
+    and metrics the rules don't have, which RuleIndex then filters.
+    """
+
+    def __init__(self, index, max_basket=MAX_BASKET):
+        self.max_basket = max_basket
+        self.digest = rules_digest(index.rules)
+        baskets = {()}
+        offsets, codes = index.rules.itemsets['antecedents']
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            # sorted, like the codes
+            items = index.darwins[codes[start:end]].tolist()
+            for size in range(1, min(len(items), max_basket) + 1):
+                baskets.update(itertools.combinations(items, size))
+        self.rankings = {metric: {basket: index.rank(basket, metric) for basket in baskets}
+                         for metric in SORT_METRICS if metric in index.rules.metrics}
+        self._nothing = (np.empty(0, dtype=np.int32), np.empty(0))
+
+    def __len__(self):
+        return len(next(iter(self.rankings.values()), ()))
+
+    def get(self, darwins, sort_by='lift'):
+        rankings = self.rankings.get(sort_by)
+        basket = tuple(sorted(set(darwins)))
+        if rankings is None or len(basket) > self.max_basket:
+            return None
+        return rankings.get(basket, self._nothing)
@@ -0,0 +1,109 @@
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.environ.get('SETUP_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'darwinex-setup-cache'))
+# train/test matrices, stored as .npy and memory-mapped back (copy-on-write) when they have a single dtype
+FRAMES = ('X', 'y', 'X_train', 'X_test', 'y_train', 'y_test')
+# rebuilt by load_config()
+_SKIP = {'_all_models', '_all_models_internal', '_all_metrics', 'create_model_container',
+         'master_model_container', 'display_container'}
+
+
+def frame_digest(data):
+    """Digest of the values, index, columns and dtypes of `data`, whatever file it was read from."""
+    digest = hashlib.sha256(json.dumps([[str(column), str(dtype)] for column, dtype in data.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def cache_key(data, setup_kwargs):
+    import pycaret
+
+    key = {'data': frame_digest(data), 'setup': setup_kwargs, 'pycaret': pycaret.__version__}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _save_frame(name, value, directory):
+    if isinstance(value, pd.DataFrame) and value.dtypes.nunique() == 1 and value.dtypes.iloc[0] != object:
+        np.save(os.path.join(directory, name + '.npy'), value.to_numpy())
+        return {'kind': 'frame', 'columns': value.columns, 'index': value.index}
+    if isinstance(value, pd.Series) and value.dtype != object:
+        np.save(os.path.join(directory, name + '.npy'), value.to_numpy())
+        return {'kind': 'series', 'name': value.name, 'index': value.index}
+    return {'kind': 'pickle', 'value': value}
+
+
+def _load_frame(name, meta, directory):
+    if meta['kind'] == 'pickle':
+        return meta['value']
+    values = np.load(os.path.join(directory, name + '.npy'), mmap_mode='c')
+    if meta['kind'] == 'frame':
+        return pd.DataFrame(values, columns=meta['columns'], index=meta['index'], copy=False)
+    return pd.Series(values, name=meta['name'], index=meta['index'], copy=False)
+
+
+def save_setup(directory, module='classification'):
+    """Writes the state left by setup() of pycaret.<module> to `directory`."""
+    from pycaret.internal import tabular
+
+    state = vars(tabular)
+    os.makedirs(directory, exist_ok=True)
+    frames = {name: _save_frame(name, state[name], directory) for name in FRAMES if name in state}
+    config = {k: state[k] for k in state['pycaret_globals'] if k not in _SKIP and k not in frames}
+    joblib.dump({'module': module, 'frames': frames, 'config': config}, os.path.join(directory, 'config.pkl'))
+
+
+def load_setup(directory):
+    """Restores a setup() saved by save_setup(), the matrices are memory-mapped instead of read."""
+    from pycaret.internal import tabular
+
+    saved = joblib.load(os.path.join(directory, 'config.pkl'))
+    state = vars(tabular)
+    for name, meta in saved['frames'].items():
+        state[name] = _load_frame(name, meta, directory)
+
+    fd, config_path = tempfile.mkstemp(suffix='.pkl')
+    os.close(fd)
+    joblib.dump(saved['config'], config_path)
+    try:
+        # load_config() rebuilds the model and metric containers for the restored data
+        importlib.import_module('pycaret.' + saved['module']).load_config(config_path)
+    finally:
+        os.remove(config_path)
+
+
+def cached_setup(module, data, cache_dir=CACHE_DIR, **setup_kwargs):
+    """setup() of pycaret.<module> on `data`, skipped when the same data and kwargs were seen before.
+
+    The key is a digest of `data` itself, so it follows the dataset whether
+    it was read from the CSV or the Arrow store, and any features added to
+    it. Returns True when the setup came from the cache.
+    """
+    directory = os.path.join(cache_dir, cache_key(data, setup_kwargs))
+    if os.path.exists(os.path.join(directory, 'config.pkl')):
+        try:
+            load_setup(directory)
+            return True
+        except Exception as ex:
+            print('Ignoring setup cache {}: {}'.format(directory, ex))
+            shutil.rmtree(directory, ignore_errors=True)
+
+    importlib.import_module('pycaret.' + module).setup(data, **setup_kwargs)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, suffix='.tmp')
+    try:
+        save_setup(tmp_dir, module)
+        os.rename(tmp_dir, directory)
+    except OSError:
+        # another run stored the same setup first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return False
@@ -0,0 +1,300 @@
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.pipeline import Pipeline
+
+MISSING = 'not_available'
+# integer columns with up to this many values are categorical, as setup() infers them
+MAX_LEVELS = 20
+PARTIAL_FIT = ('sgd', 'nb')
+
+
+def _sgd(random_state, class_weight):
+    import sklearn
+    from sklearn.linear_model import SGDClassifier
+
+    # the logistic loss was renamed in scikit-learn 1.1
+    version = tuple(int(part) for part in sklearn.__version__.split('.')[:2])
+    return SGDClassifier(loss='log_loss' if version >= (1, 1) else 'log', class_weight=class_weight,
+                         random_state=random_state)
+
+
+def _nb(random_state, class_weight):
+    from sklearn.naive_bayes import GaussianNB
+
+    return GaussianNB()
+
+
+def _lr(random_state, class_weight):
+    from sklearn.linear_model import LogisticRegression
+
+    return LogisticRegression(max_iter=1000, random_state=random_state)
+
+
+def _rf(random_state, class_weight):
+    from sklearn.ensemble import RandomForestClassifier
+
+    return RandomForestClassifier(n_jobs=-1, random_state=random_state)
+
+
+def _et(random_state, class_weight):
+    from sklearn.ensemble import ExtraTreesClassifier
+
+    return ExtraTreesClassifier(n_jobs=-1, random_state=random_state)
+
+
+def _lightgbm(random_state, class_weight):
+    from lightgbm import LGBMClassifier
+
+    return LGBMClassifier(random_state=random_state)
+
+
+# 'sgd' and 'nb' learn chunk by chunk, the rest are fitted on a bounded stratified sample
+ESTIMATORS = {'sgd': _sgd, 'nb': _nb, 'lr': _lr, 'rf': _rf, 'et': _et, 'lightgbm': _lightgbm}
+
+
+class StreamingPreprocessor(BaseEstimator, TransformerMixin):
+    """Mean imputation, z-score scaling and one-hot encoding learnt one chunk at a time.
+
+    Columns are typed like setup() does: text, booleans, `categorical_features`
+    and integer columns with few values are categorical, the rest numeric.
+    It is the 'dtypes' step of the streaming pipelines, which is the step
+    predict_model() looks for.
+    """
+
+    def __init__(self, target, categorical_features=(), ignore_features=(), max_levels=MAX_LEVELS,
+                 max_categories=100):
+        self.target = target
+        self.categorical_features = categorical_features
+        self.ignore_features = ignore_features
+        self.max_levels = max_levels
+        self.max_categories = max_categories
+
+    def _features(self, X):
+        return X.drop(columns=[self.target] + list(self.ignore_features), errors='ignore')
+
+    def _is_numeric(self, column, values):
+        return (column not in self.categorical_features and pd.api.types.is_numeric_dtype(values)
+                and not pd.api.types.is_bool_dtype(values))
+
+    def _as_text(self, values):
+        missing = values.isna().to_numpy()
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            whole = values.dropna()
+            if (whole == whole.round()).all():
+                values = values.fillna(0).astype(np.int64)
+        text = values.astype(str).to_numpy(dtype=object)
+        text[missing] = MISSING
+        return text
+
+    def partial_fit(self, X, y=None):
+        X = self._features(X)
+        if not hasattr(self, '_stats'):
+            self.columns_ = list(X.columns)
+            self._stats = {column: {'count': 0, 'mean': 0.0, 'm2': 0.0, 'levels': {}, 'numeric': True,
+                                    'whole': True} for column in self.columns_}
+
+        for column in self.columns_:
+            values = X[column]
+            stats = self._stats[column]
+            if stats['numeric'] and not self._is_numeric(column, values):
+                stats['numeric'] = False
+            if stats['numeric']:
+                present = values.dropna().to_numpy(dtype=float)
+                if len(present):
+                    # Chan et al. merge of the running mean and sum of squares
+                    count = stats['count'] + len(present)
+                    delta = present.mean() - stats['mean']
+                    stats['m2'] += ((present - present.mean()) ** 2).sum() + delta ** 2 * stats['count'] * len(
+                        present) / count
+                    stats['mean'] += delta * len(present) / count
+                    stats['count'] = count
+                    stats['whole'] = stats['whole'] and bool((present == np.round(present)).all())
+            # numeric columns only keep counting levels while they may still be categorical
+            if not stats['numeric'] or (stats['whole'] and len(stats['levels']) <= self.max_levels):
+                for level, count in pd.Series(self._as_text(values)).value_counts().items():
+                    stats['levels'][level] = stats['levels'].get(level, 0) + count
+                if stats['numeric'] and len(stats['levels']) > self.max_levels:
+                    stats['levels'] = dict(list(stats['levels'].items())[:self.max_levels + 1])
+        return self
+
+    def finish(self):
+        self.numeric_ = []
+        self.means_ = []
+        self.scales_ = []
+        self.categories_ = {}
+        for column in self.columns_:
+            stats = self._stats[column]
+            if stats['numeric'] and not (stats['whole'] and len(stats['levels']) <= self.max_levels):
+                self.numeric_.append(column)
+                self.means_.append(stats['mean'])
+                self.scales_.append(np.sqrt(stats['m2'] / stats['count']) if stats['count'] else 1.0)
+            else:
+                levels = sorted(stats['levels'].items(), key=lambda item: (-item[1], item[0]))
+                self.categories_[column] = sorted(level for level, _ in levels[:self.max_categories])
+        self.means_ = np.array(self.means_)
+        self.scales_ = np.where(np.array(self.scales_) > 0, self.scales_, 1.0)
+        self.feature_names_ = list(self.numeric_) + ['{}_{}'.format(column, level)
+                                                     for column, levels in self.categories_.items()
+                                                     for level in levels]
+        del self._stats
+        return self
+
+    def fit(self, X, y=None):
+        if hasattr(self, '_stats'):
+            del self._stats
+        return self.partial_fit(X).finish()
+
+    def transform(self, X):
+        result = np.zeros((len(X), len(self.feature_names_)))
+        if self.numeric_:
+            numeric = (X[self.numeric_].to_numpy(dtype=float) - self.means_) / self.scales_
+            result[:, :len(self.numeric_)] = np.nan_to_num(numeric)
+        offset = len(self.numeric_)
+        rows = np.arange(len(X))
+        for column, levels in self.categories_.items():
+            codes = pd.Index(levels).get_indexer(self._as_text(X[column]))
+            # levels not seen in training, or beyond max_categories, are all zeros
+            known = codes >= 0
+            result[rows[known], offset + codes[known]] = 1.0
+            offset += len(levels)
+        return result
+
+
+class Reservoir:
+    """Uniform sample of at most `capacity` rows of a stream (algorithm R, one chunk at a time)."""
+
+    def __init__(self, capacity, n_features, rng):
+        self.capacity = capacity
+        self.rng = rng
+        self.seen = 0
+        self.X = np.empty((capacity, n_features), dtype=np.float32)
+        self.y = np.empty(capacity, dtype=object)
+
+    def add(self, X, y):
+        fill = max(min(self.capacity - self.seen, len(X)), 0)
+        self.X[self.seen:self.seen + fill] = X[:fill]
+        self.y[self.seen:self.seen + fill] = y[:fill]
+        if len(X) > fill:
+            positions = self.seen + np.arange(fill, len(X))
+            slots = self.rng.integers(0, positions + 1)
+            keep = slots < self.capacity
+            self.X[slots[keep]] = X[fill:][keep]
+            self.y[slots[keep]] = y[fill:][keep]
+        self.seen += len(X)
+
+    def sample(self):
+        size = min(self.seen, self.capacity)
+        return self.X[:size], self.y[:size]
+
+
+class StratifiedReservoir:
+    """One reservoir per class, so rare classes keep as many rows as the others can."""
+
+    def __init__(self, capacity, classes, n_features, rng):
+        per_class = max(capacity // len(classes), 1)
+        self.reservoirs = {label: Reservoir(per_class, n_features, rng) for label in classes}
+
+    def add(self, X, y):
+        for label, reservoir in self.reservoirs.items():
+            mask = y == label
+            if mask.any():
+                reservoir.add(X[mask], y[mask])
+
+    def sample(self):
+        samples = [reservoir.sample() for reservoir in self.reservoirs.values()]
+        return np.concatenate([X for X, _ in samples]), np.concatenate([y for _, y in samples])
+
+
+def classification_metrics(y, pred, proba, classes):
+    """Same metric names as pull() after a pycaret classification run."""
+    from sklearn import metrics
+
+    binary = len(classes) == 2
+    average = 'binary' if binary else 'weighted'
+    try:
+        auc = metrics.roc_auc_score(y, proba[:, 1]) if binary else metrics.roc_auc_score(
+            y, proba, multi_class='ovr', average='weighted', labels=classes)
+    except ValueError:
+        auc = 0.0
+    return {
+        'Accuracy': metrics.accuracy_score(y, pred),
+        'AUC': auc,
+        'Recall': metrics.recall_score(y, pred, average=average, zero_division=0),
+        'Prec.': metrics.precision_score(y, pred, average=average, zero_division=0),
+        'F1': metrics.f1_score(y, pred, average=average, zero_division=0),
+        'Kappa': metrics.cohen_kappa_score(y, pred),
+        'MCC': metrics.matthews_corrcoef(y, pred),
+    }
+
+
+def _validation_rows(start, size, fraction):
+    # fixed split by row number, so every epoch holds out the same rows
+    positions = np.arange(start, start + size, dtype=np.uint64)
+    return (positions * np.uint64(2654435761) % np.uint64(1 << 32)) < np.uint64(fraction * (1 << 32))
+
+
+def train_streaming(path, target, estimator='sgd', chunksize=100000, sample_size=100000, validation_size=20000,
+                    validation_fraction=0.1, epochs=1, balance=False, random_state=123, **preprocessor_kwargs):
+    """Trains a classifier on a CSV read `chunksize` rows at a time.
+
+    The first pass fits the preprocessing statistics and counts the classes.
+    Estimators in PARTIAL_FIT then learn from every chunk through a shuffle
+    buffer of `sample_size` rows, the others are fitted on a stratified
+    reservoir of at most `sample_size` rows, so memory doesn't grow with the
+    file. Returns a pipeline predict_model() can use and the
+    metrics on a held-out sample as a one-row frame.
+    """
+    preprocessor = StreamingPreprocessor(target, **preprocessor_kwargs)
+    counts = {}
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        preprocessor.partial_fit(chunk)
+        for label, count in chunk[target].value_counts().items():
+            counts[label] = counts.get(label, 0) + count
+    preprocessor.finish()
+
+    classes = np.array(sorted(counts))
+    total = sum(counts.values())
+    class_weight = {label: total / (len(classes) * count) for label, count in counts.items()} if balance else None
+    model = ESTIMATORS[estimator](random_state, class_weight)
+    n_features = len(preprocessor.feature_names_)
+    rng = np.random.default_rng(random_state)
+    validation = Reservoir(validation_size, n_features, rng)
+    sample = StratifiedReservoir(sample_size, classes, n_features, rng)
+
+    for epoch in range(epochs if estimator in PARTIAL_FIT else 1):
+        start = 0
+        # rows wait in a bounded buffer and leave it in random order, files sorted by class would
+        # otherwise make the online estimators forget the earlier classes
+        buffer_X, buffer_y = np.empty((0, n_features), dtype=np.float32), np.empty(0, dtype=classes.dtype)
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            X = preprocessor.transform(chunk)
+            y = chunk[target].to_numpy()
+            held_out = _validation_rows(start, len(chunk), validation_fraction)
+            start += len(chunk)
+            if epoch == 0:
+                validation.add(X[held_out], y[held_out])
+            if estimator in PARTIAL_FIT:
+                buffer_X = np.concatenate([buffer_X, X[~held_out].astype(np.float32)])
+                buffer_y = np.concatenate([buffer_y, y[~held_out]])
+                if len(buffer_y) > sample_size:
+                    order = rng.permutation(len(buffer_y))
+                    ready, kept = order[:len(buffer_y) - sample_size], order[len(buffer_y) - sample_size:]
+                    model.partial_fit(buffer_X[ready], buffer_y[ready], classes=classes)
+                    buffer_X, buffer_y = buffer_X[kept], buffer_y[kept]
+            else:
+                sample.add(X[~held_out], y[~held_out])
+        if estimator in PARTIAL_FIT:
+            order = rng.permutation(len(buffer_y))
+            for begin in range(0, len(order), chunksize):
+                model.partial_fit(buffer_X[order[begin:begin + chunksize]], buffer_y[order[begin:begin + chunksize]],
+                                  classes=classes)
+
+    if estimator not in PARTIAL_FIT:
+        X, y = sample.sample()
+        model.fit(X, y.astype(classes.dtype))
+
+    X, y = validation.sample()
+    y = y.astype(classes.dtype)
+    scores = classification_metrics(y, model.predict(X), model.predict_proba(X), classes)
+    return Pipeline([('dtypes', preprocessor), ('trained_model', model)]), pd.DataFrame([scores]).round(4)
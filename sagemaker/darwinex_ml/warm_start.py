@@ -0,0 +1,57 @@
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+from botocore.exceptions import ClientError
+
+from darwinex_ml.model_cache import default_s3
+
+# a full model search runs at least this often
+FULL_SEARCH_DAYS = 30
+# relative growth of the validation error that triggers a full model search
+TOLERANCE = 0.1
+
+
+def load_state(bucket, key, s3=None):
+    """Training state saved by the last run, None if there is none yet."""
+    try:
+        body = (s3 or default_s3()).get_object(Bucket=bucket, Key=key)['Body'].read()
+    except ClientError:
+        return None
+    return json.loads(body)
+
+
+def save_state(state, bucket, key, s3=None):
+    (s3 or default_s3()).put_object(Bucket=bucket, Key=key, Body=json.dumps(state, indent=2).encode())
+
+
+def plain_params(model):
+    # hyperparameters that survive the JSON round trip, the rest keep their defaults on refit
+    params = {}
+    for name, value in model.get_params(deep=False).items():
+        if isinstance(value, np.generic):
+            value = value.item()
+        if value is None or isinstance(value, (bool, int, float, str)):
+            params[name] = value
+    return params
+
+
+def appended_rows(df, state, date_column='date'):
+    return df[pd.to_datetime(df[date_column]) > pd.Timestamp(state['last_date'])]
+
+
+def full_search_reason(state, now=None, max_age_days=FULL_SEARCH_DAYS):
+    """Why the next run must search every model again, None if the last estimator can be reused."""
+    if state is None:
+        return 'no previous training state'
+    now = now or datetime.datetime.now()
+    age = now - datetime.datetime.fromisoformat(state['last_full_search'])
+    if age > datetime.timedelta(days=max_age_days):
+        return 'last full search {} days ago'.format(age.days)
+    return None
+
+
+def degraded(state, error, tolerance=TOLERANCE):
+    # against the error of the last full search, not of the last run; the errors are lower-is-better
+    return error > state['validation_error'] * (1 + tolerance)
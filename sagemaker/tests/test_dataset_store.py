@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATASETS
+from darwinex_ml.dataset_store import SCHEMAS, convert, csv_name, load_dataset, store_name
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('store'))
+    for name in SCHEMAS:
+        shutil.copy(os.path.join(DATASETS, csv_name(name)), directory)
+        convert(directory, name)
+    return directory
+
+
+def text_as_object(df):
+    # newer pandas give text as StringDtype, the versions pycaret runs on as object
+    return df.astype({column: object for column in df.columns if isinstance(df[column].dtype, pd.StringDtype)})
+
+
+def read_csv(name):
+    # what the training scripts read before the store, with the float32 features rounded as setup() does
+    df = pd.read_csv(os.path.join(DATASETS, csv_name(name)))
+    for column, kind in SCHEMAS[name].items():
+        if kind == 'float32':
+            df[column] = df[column].astype(np.float32).astype(np.float64)
+    return text_as_object(df)
+
+
+@pytest.mark.parametrize('name', list(SCHEMAS))
+def test_widened_store_matches_read_csv(store, name):
+    pd.testing.assert_frame_equal(text_as_object(load_dataset(store, name, widen=True)), read_csv(name))
+
+
+@pytest.mark.parametrize('name', list(SCHEMAS))
+def test_store_keeps_the_declared_types(store, name):
+    df = load_dataset(store, name)
+    for column, kind in SCHEMAS[name].items():
+        if kind in ('category', 'bool') or kind.startswith(('int', 'float')):
+            assert str(df[column].dtype) == kind, column
+
+
+def test_columns_are_read_alone(store):
+    df = load_dataset(store, 'ModConversion_traders', columns=['user_country', 'is_converted'])
+    assert list(df.columns) == ['user_country', 'is_converted']
+
+
+def test_newer_csv_is_read_instead_of_the_store(store, tmp_path):
+    shutil.copy(os.path.join(store, store_name('ModEstIngresos')), str(tmp_path))
+    df = pd.read_csv(os.path.join(DATASETS, csv_name('ModEstIngresos'))).head(10)
+    df.to_csv(str(tmp_path / csv_name('ModEstIngresos')), index=False)
+    # the CSV was written after the Arrow file, make sure the clock tells them apart
+    later = os.path.getmtime(str(tmp_path / store_name('ModEstIngresos'))) + 10
+    os.utime(str(tmp_path / csv_name('ModEstIngresos')), (later, later))
+    assert len(load_dataset(str(tmp_path), 'ModEstIngresos')) == 10
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATASETS
+from darwinex_ml.forecast_cache import ForecastCache
+from darwinex_ml.forecasting import RecursiveForecaster
+
+WINDOW = 27
+
+
+def stub_predict(lags):
+    return float(np.dot(lags, np.linspace(1, 0, len(lags)))) / WINDOW
+
+
+@pytest.fixture(scope='module')
+def history():
+    return pd.read_csv(os.path.join(DATASETS, 'dataset_ModEstIngresos.csv'), parse_dates=['date'])
+
+
+def request_of(history, rows=60, periods=30):
+    dates = pd.date_range(history.date.iloc[-1] + pd.Timedelta(days=1), periods=periods)
+    return pd.concat([history.tail(rows), pd.DataFrame({'date': dates, 'incomes': np.nan})], ignore_index=True)
+
+
+def test_fingerprint_ignores_older_history(history):
+    forecaster = RecursiveForecaster(stub_predict, WINDOW)
+    request = request_of(history)
+    assert forecaster.fingerprint(request_of(history, rows=200)) == forecaster.fingerprint(request)
+    # rows in any order are sorted by date
+    assert forecaster.fingerprint(request.sample(frac=1, random_state=0)) == forecaster.fingerprint(request)
+
+    changed = request.copy()
+    changed.loc[len(history.tail(60)) - 1, 'incomes'] += 1
+    assert forecaster.fingerprint(changed) != forecaster.fingerprint(request)
+    assert forecaster.fingerprint(request_of(history, periods=31)) != forecaster.fingerprint(request)
+
+
+def test_hits_give_the_forecast(history):
+    cache = ForecastCache(size=4)
+    forecaster = RecursiveForecaster(stub_predict, WINDOW)
+    model = object()
+    request = request_of(history)
+
+    first, hit = cache.forecast(model, forecaster, request)
+    assert not hit
+    second, hit = cache.forecast(model, forecaster, request_of(history, rows=200))
+    assert hit
+    pd.testing.assert_frame_equal(first, forecaster.forecast(request))
+    pd.testing.assert_frame_equal(second, forecaster.forecast(request_of(history, rows=200)))
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_is_evicted(history):
+    cache = ForecastCache(size=2)
+    forecaster = RecursiveForecaster(stub_predict, WINDOW)
+    model = object()
+    for periods in (1, 2, 1, 3):
+        cache.forecast(model, forecaster, request_of(history, periods=periods))
+    assert cache.forecast(model, forecaster, request_of(history, periods=1))[1]
+    assert not cache.forecast(model, forecaster, request_of(history, periods=2))[1]
+    assert cache.stats()['evictions'] == 2
+
+
+def test_a_new_model_drops_the_entries(history):
+    cache = ForecastCache(size=4)
+    forecaster = RecursiveForecaster(stub_predict, WINDOW)
+    request = request_of(history)
+    cache.forecast(object(), forecaster, request)
+    assert not cache.forecast(object(), forecaster, request)[1]
+    assert cache.stats()['invalidations'] == 1 and cache.stats()['entries'] == 1
+
+
+def test_size_zero_disables_the_cache(history):
+    cache = ForecastCache(size=0)
+    forecaster = RecursiveForecaster(stub_predict, WINDOW)
+    model = object()
+    for _ in range(2):
+        assert not cache.forecast(model, forecaster, request_of(history))[1]
+    assert cache.stats()['entries'] == 0 and cache.stats()['misses'] == 0
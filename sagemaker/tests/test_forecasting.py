@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATASETS
+from darwinex_ml.forecasting import DirectForecaster, RecursiveForecaster, fit_direct, horizon_targets
+from darwinex_ml.lags import lag_columns
+
+WINDOW = 27
+
+
+def stub_predict(lags):
+    # any function of the lags in their order (lag_1 first) tells a shifted or reversed window apart
+    return float(np.dot(lags, np.linspace(1, 0, len(lags)))) / WINDOW
+
+
+def legacy_forecast(input_data):
+    # predict_fn before the ring buffer, as bench_forecaster.py keeps it
+    df = input_data.dropna()
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.set_index(df.date)
+
+    df['prediction'] = df['incomes']
+    df['calculated'] = 0
+
+    columns = lag_columns(WINDOW)
+    columns.reverse()
+
+    for row in input_data[input_data.incomes.isnull()].date:
+        if row.weekday() != 5:
+            df_temp = df[df.index < row].tail(n=WINDOW).transpose().iloc[[2]]
+            df_temp.columns = columns
+            prediction = stub_predict(df_temp[columns[::-1]].to_numpy(dtype=float)[0])
+            new_row = pd.DataFrame({'prediction': prediction, 'calculated': 1}, index=[row])
+            if not df[df.index.isin([row])].empty:
+                df.update(new_row)
+            else:
+                df = pd.concat([df, new_row])
+            df.sort_index(inplace=True)
+    return df
+
+
+@pytest.fixture(scope='module')
+def history():
+    return pd.read_csv(os.path.join(DATASETS, 'dataset_ModEstIngresos.csv'), parse_dates=['date'])
+
+
+@pytest.mark.parametrize('horizon', [1, 30, 90])
+def test_recursive_forecast_matches_legacy_loop(history, horizon):
+    dates = pd.date_range(history.date.iloc[-1] + pd.Timedelta(days=1), periods=horizon)
+    request = pd.concat([history.tail(60), pd.DataFrame({'date': dates, 'incomes': np.nan})], ignore_index=True)
+
+    expected = legacy_forecast(request)
+    result = RecursiveForecaster(stub_predict, WINDOW).forecast(request)
+
+    assert list(result.index) == list(expected.index)
+    np.testing.assert_allclose(result['prediction'].to_numpy(), expected['prediction'].to_numpy())
+    np.testing.assert_array_equal(result['calculated'].to_numpy(), expected['calculated'].to_numpy())
+
+
+def test_recursive_forecast_needs_a_full_window(history):
+    request = pd.concat([history.head(WINDOW - 1), pd.DataFrame({'date': [history.date.iloc[WINDOW]],
+                                                                 'incomes': [np.nan]})], ignore_index=True)
+    with pytest.raises(ValueError):
+        RecursiveForecaster(stub_predict, WINDOW).forecast(request)
+
+
+def recursive_block(horizon):
+    # the next `horizon` values RecursiveForecaster would predict from these lags
+    def predict(lags):
+        lags = list(lags)
+        block = []
+        for _ in range(horizon):
+            block.append(stub_predict(np.array(lags)))
+            lags = [block[-1]] + lags[:-1]
+        return block
+    return predict
+
+
+@pytest.mark.parametrize('window,horizon', [(3, 1), (5, 4)])
+def test_horizon_targets_match_shift_loop(window, horizon):
+    values = pd.Series(np.arange(40, dtype=float))
+    values[[7, 20]] = np.nan
+    frame = pd.DataFrame({'lag_{}'.format(i): values.shift(i) for i in range(1, window + 1)})
+    for step in range(horizon):
+        frame['target_{}'.format(step)] = values.shift(-step)
+    frame = frame.dropna()
+
+    lags, targets = horizon_targets(values, window, horizon)
+    np.testing.assert_array_equal(lags, frame.iloc[:, :window].to_numpy())
+    np.testing.assert_array_equal(targets, frame.iloc[:, window:].to_numpy())
+
+
+@pytest.mark.parametrize('horizon', [1, 7, 30])
+def test_direct_forecast_of_recursive_blocks_matches_recursive(history, horizon):
+    dates = pd.date_range(history.date.iloc[-1] + pd.Timedelta(days=1), periods=45)
+    request = pd.concat([history.tail(60), pd.DataFrame({'date': dates, 'incomes': np.nan})], ignore_index=True)
+
+    expected = RecursiveForecaster(stub_predict, WINDOW).forecast(request)
+    result = DirectForecaster(recursive_block(horizon), WINDOW).forecast(request)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_direct_blocks_restart_after_known_values(history):
+    calls = []
+
+    def predict(lags):
+        calls.append(lags[0])
+        return [lags[0] + 1, lags[0] + 2, lags[0] + 3]
+
+    # every day but Saturdays, which are not predicted
+    dates = pd.bdate_range(history.date.iloc[-1] + pd.Timedelta(days=1), periods=5, freq='C',
+                           weekmask='Sun Mon Tue Wed Thu Fri')
+    tail = pd.DataFrame({'date': dates, 'incomes': [np.nan, np.nan, 100.0, np.nan, np.nan]})
+    request = pd.concat([history.tail(WINDOW), tail], ignore_index=True)
+
+    result = DirectForecaster(predict, WINDOW).forecast(request)
+    last = history.incomes.iloc[-1]
+    assert calls == [last, 100.0]
+    np.testing.assert_allclose(result.loc[result.calculated == 1, 'prediction'], [last + 1, last + 2, 101, 102])
+
+
+def test_direct_model_predicts_a_horizon():
+    from sklearn.linear_model import LinearRegression
+
+    values = np.sin(np.arange(300) / 10)
+    model = fit_direct(LinearRegression(), values, window=20, horizon=5)
+    prediction = model.predict(values[-20:][::-1])
+    assert prediction.shape == (5,)
+    np.testing.assert_allclose(prediction, np.sin(np.arange(300, 305) / 10), atol=1e-3)
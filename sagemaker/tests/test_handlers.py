@@ -0,0 +1,66 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATASETS
+from darwinex_ml.handlers import ARROW, CSV, JSON, JSON_LINES, NPY, decode_records, encode_frame
+
+
+@pytest.fixture(scope='module')
+def users():
+    return pd.read_csv(os.path.join(DATASETS, 'dataset_ModClasClientes.csv'), nrows=50).drop(columns='label')
+
+
+def batch(users, content_type):
+    if content_type == JSON:
+        return users.to_json(orient='records')
+    elif content_type == JSON_LINES:
+        return users.to_json(orient='records', lines=True)
+    return users.to_csv(index=False)
+
+
+@pytest.mark.parametrize('content_type', [JSON, JSON_LINES, CSV])
+def test_batch_gives_one_row_per_record_in_order(users, content_type):
+    result = decode_records(batch(users, content_type).encode('utf-8'), content_type + '; charset=utf-8')
+    pd.testing.assert_frame_equal(result, users)
+
+
+def test_single_record_gives_one_row(users):
+    record = users.iloc[[7]].reset_index(drop=True)
+    text = record.iloc[0].to_json()
+    pd.testing.assert_frame_equal(decode_records(text, JSON).astype(record.dtypes), record)
+
+
+def test_unknown_content_type_raises():
+    with pytest.raises(ValueError):
+        decode_records('<users/>', 'application/xml')
+
+
+@pytest.mark.parametrize('media', [ARROW, NPY])
+def test_binary_formats_round_trip(users, media):
+    result = decode_records(encode_frame(users, media), media)
+    pd.testing.assert_frame_equal(result, users, check_dtype=False)
+    assert list(result.dtypes[result.columns != 'userid']) == list(users.dtypes[users.columns != 'userid'])
+
+
+def test_npy_is_decoded_without_copying(users):
+    payload = encode_frame(users.drop(columns='userid'), NPY)
+    result = decode_records(payload, NPY)
+    assert np.shares_memory(result['pfees'].to_numpy(), np.frombuffer(payload, np.uint8))
+
+
+def test_rule_sets_are_lists_or_joined_text():
+    rules = pd.DataFrame({'antecedents': [frozenset(['B', 'A']), frozenset(['C'])], 'lift': [1.5, 2.0]})
+    arrow = decode_records(encode_frame(rules, ARROW), ARROW)
+    assert arrow['antecedents'].map(list).tolist() == [['A', 'B'], ['C']]
+    assert decode_records(encode_frame(rules, NPY), NPY)['antecedents'].tolist() == ['A,B', 'C']
+
+
+def test_npy_needs_a_structured_array():
+    f = io.BytesIO()
+    np.save(f, np.zeros((3, 2)))
+    with pytest.raises(ValueError):
+        decode_records(f.getvalue(), NPY)
@@ -0,0 +1,91 @@
+import io
+import pickle
+
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+from darwinex_ml.hot_swap import HotSwapModel
+from darwinex_ml.local_s3 import LocalS3
+from darwinex_ml.model_cache import fetch_model
+
+BUCKET = 'tfm-2021-darwinex'
+KEY = 'models/Test/final_model.pkl'
+
+
+@pytest.fixture
+def s3(tmp_path):
+    return LocalS3(str(tmp_path / 's3'))
+
+
+@pytest.fixture
+def holder(s3, tmp_path):
+    def load():
+        with open(fetch_model(BUCKET, KEY, cache_dir=str(tmp_path / 'cache'), s3=s3), 'rb') as f:
+            return pickle.load(f)
+
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=pickle.dumps('v1'))
+    holder = HotSwapModel(load, BUCKET, [KEY], interval=0, s3=s3)
+    yield holder
+    holder.close()
+
+
+def test_swaps_on_a_new_version(s3, holder):
+    assert not holder.check()
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=pickle.dumps('v2'))
+    assert holder.check()
+    assert holder.current == 'v2' and holder.swaps == 1
+
+
+def test_failed_version_is_not_reloaded(s3, holder):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=pickle.dumps('v2')[:-2])
+    for _ in range(3):
+        assert not holder.check()
+    assert holder.current == 'v1'
+    assert holder.failures == 1
+    assert s3.calls['get_object'] == 2
+
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=pickle.dumps('v3'))
+    assert holder.check()
+    assert holder.current == 'v3'
+
+
+class FailingBody(io.BytesIO):
+    # the connection drops after the first block
+    def read(self, size=-1):
+        if self.tell():
+            raise ConnectionResetError('connection reset')
+        return super().read(1 << 10)
+
+
+@pytest.mark.parametrize('error', ['head', 'download'])
+def test_s3_errors_are_retried(s3, holder, monkeypatch, error):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=pickle.dumps('v2' * 1000))
+    with monkeypatch.context() as patch:
+        if error == 'head':
+            def head_object(Bucket, Key):
+                raise EndpointConnectionError(endpoint_url='https://s3.eu-west-1.amazonaws.com')
+            patch.setattr(s3, 'head_object', head_object)
+        else:
+            original = s3.get_object
+
+            def get_object(**kwargs):
+                response = original(**kwargs)
+                return dict(response, Body=FailingBody(response['Body'].read()))
+            patch.setattr(s3, 'get_object', get_object)
+        assert not holder.check()
+        assert not holder.check()
+    assert holder.failed_version is None and holder.retries == 2
+
+    assert holder.check()
+    assert holder.current == 'v2' * 1000 and holder.retries == 0
+
+
+def test_retries_back_off(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=pickle.dumps('v1'))
+    holder = HotSwapModel(lambda: 'v1', BUCKET, [KEY], interval=60, s3=s3, max_backoff=300)
+    holder.close()
+    delays = []
+    for retries in range(5):
+        holder.retries = retries
+        delays.append(holder.poll_delay())
+    assert delays == [60, 120, 240, 300, 300]
@@ -0,0 +1,44 @@
+import inspect
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import DATASETS
+from darwinex_ml.itemsets import RULE_COLUMNS, mine_rules
+
+frequent_patterns = pytest.importorskip('mlxtend.frequent_patterns')
+
+DATASET = os.path.join(DATASETS, 'dataset_ModRecInvDarwin.csv')
+
+
+def by_rule(rules):
+    # both miners may list the rules in another order
+    keys = rules.antecedents.map(sorted).map(tuple) + rules.consequents.map(sorted).map(tuple)
+    return rules.iloc[keys.map(str).argsort(kind='stable')].reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def onehot():
+    orders = pd.read_csv(DATASET, dtype=str)
+    return pd.crosstab(orders['orderid'], orders['darwin']).astype(bool)
+
+
+@pytest.mark.parametrize('min_support', [0.1, 0.05])
+def test_fpgrowth_matches_apriori(onehot, min_support):
+    # pycaret.arules.create_model() is mlxtend apriori + association_rules, rounded to 4 decimals
+    itemsets = frequent_patterns.apriori(onehot, min_support=min_support, use_colnames=True)
+    kwargs = {'metric': 'confidence', 'min_threshold': 0.5}
+    if 'num_itemsets' in inspect.signature(frequent_patterns.association_rules).parameters:
+        kwargs['num_itemsets'] = len(onehot)
+    expected = frequent_patterns.association_rules(itemsets, **kwargs)[RULE_COLUMNS].round(4)
+
+    rules = mine_rules(DATASET, 'orderid', 'darwin', min_support=min_support)
+    assert len(rules) == len(expected)
+    pd.testing.assert_frame_equal(by_rule(rules), by_rule(expected), check_exact=False, atol=1e-4)
+
+
+def test_max_len_limits_itemsets():
+    rules = mine_rules(DATASET, 'orderid', 'darwin', min_support=0.05, max_len=2)
+    assert len(rules)
+    assert (rules.antecedents.map(len) + rules.consequents.map(len)).max() == 2
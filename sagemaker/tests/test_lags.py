@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATASETS
+from darwinex_ml.lags import add_lag_features, lag_matrix
+
+WINDOW = 27
+
+
+def shift_features(df, column, window):
+    # the loop the training script ran before lag_matrix()
+    df = df.copy()
+    for i in range(1, window + 1):
+        df['lag_' + str(i)] = df[column].shift(i)
+    return df.dropna()
+
+
+@pytest.fixture(scope='module')
+def incomes():
+    return pd.read_csv(os.path.join(DATASETS, 'dataset_ModEstIngresos.csv'))
+
+
+@pytest.mark.parametrize('window', [1, WINDOW])
+def test_lag_features_match_shift(incomes, window):
+    pd.testing.assert_frame_equal(add_lag_features(incomes, 'incomes', window),
+                                  shift_features(incomes, 'incomes', window), check_exact=True)
+
+
+def test_lag_features_drop_rows_with_missing_values(incomes):
+    df = incomes.head(100).copy()
+    df.loc[[10, 60], 'incomes'] = np.nan
+    pd.testing.assert_frame_equal(add_lag_features(df, 'incomes', WINDOW), shift_features(df, 'incomes', WINDOW),
+                                  check_exact=True)
+
+
+def test_lag_matrix_is_a_read_only_view():
+    values = np.arange(10, dtype=float)
+    lags = lag_matrix(values, 3)
+    assert np.shares_memory(lags, values)
+    assert not lags.flags.writeable
+    np.testing.assert_array_equal(lags[0], [2, 1, 0])
+    assert lag_matrix(values[:2], 3).shape == (0, 3)
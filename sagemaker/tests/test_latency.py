@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+import pytest
+
+from darwinex_ml.latency import BOUNDS, Histogram, LatencyRecorder
+
+
+@pytest.fixture(scope='module')
+def latencies():
+    # from a few microseconds (cache hits) to about a second
+    return np.random.default_rng(0).lognormal(mean=math.log(0.002), sigma=2.0, size=20000)
+
+
+def histogram_of(values):
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    return histogram
+
+
+@pytest.mark.parametrize('q', [0.5, 0.9, 0.99, 0.999])
+def test_quantile_within_a_bucket_of_the_true_value(latencies, q):
+    histogram = histogram_of(latencies)
+    true = np.sort(latencies)[math.ceil(q * len(latencies)) - 1]
+    assert true <= histogram.quantile(q) <= true * math.sqrt(2) * (1 + 1e-9)
+
+
+def test_quantile_is_capped_by_the_maximum():
+    histogram = histogram_of([0.0011] * 10)
+    assert histogram.quantile(0.5) == histogram.quantile(1.0) == 0.0011
+    assert histogram_of([BOUNDS[-1] * 10]).quantile(0.99) == BOUNDS[-1] * 10
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_window_since_a_copy(latencies):
+    histogram = histogram_of(latencies[:1000])
+    earlier = histogram.copy()
+    for value in latencies[1000:1500]:
+        histogram.record(value, size=10)
+    window = histogram.since(earlier)
+    assert window.count == 500 and window.bytes == 5000
+    assert window.quantile(0.5) == histogram_of(latencies[1000:1500]).quantile(0.5)
+    assert window.max <= histogram.max
+
+
+def test_recorder_counts_calls_and_errors():
+    recorder = LatencyRecorder('Test', interval=0)
+
+    @recorder.timed('input_fn', payload='request')
+    def input_fn(data, fail=False):
+        if fail:
+            raise ValueError(data)
+        return data
+
+    input_fn(b'12345')
+    with pytest.raises(ValueError):
+        input_fn(b'1', fail=True)
+    with recorder.time('predict_step'):
+        pass
+    stats = recorder.snapshot()
+    assert stats['input_fn']['count'] == 1 and stats['input_fn']['errors'] == 1 and stats['input_fn']['bytes'] == 5
+    assert stats['predict_step']['count'] == 1
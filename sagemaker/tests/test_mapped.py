@@ -0,0 +1,64 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from botocore.exceptions import ClientError
+from sklearn.ensemble import ExtraTreesRegressor
+
+from darwinex_ml.local_s3 import LocalS3
+from darwinex_ml.mapped import dump, load, load_published, mapped_bytes, publish_converted
+
+BUCKET = 'tfm-2021-darwinex'
+KEY = 'models/Test/final_model.mmap'
+
+
+@pytest.fixture
+def s3(tmp_path):
+    return LocalS3(str(tmp_path / 's3'))
+
+
+def forest():
+    rng = np.random.default_rng(0)
+    features = rng.random((5000, 4))
+    return ExtraTreesRegressor(n_estimators=5, random_state=0).fit(features, features[:, 0])
+
+
+def test_load_gives_back_the_arrays(tmp_path):
+    obj = {'coef': np.arange(1 << 16, dtype=float), 'frame': pd.DataFrame({'a': np.arange(1 << 12)}), 'small': [1]}
+    loaded = load(dump(obj, str(tmp_path / 'model.mmap')))
+    np.testing.assert_array_equal(loaded['coef'], obj['coef'])
+    pd.testing.assert_frame_equal(loaded['frame'], obj['frame'])
+    assert loaded['small'] == [1]
+
+
+def test_mapped_bytes_of_arrays_and_trees(tmp_path):
+    kept, total = mapped_bytes(dump({'coef': np.ones((256, 256))}, str(tmp_path / 'arrays.mmap')))
+    assert kept == total > 0
+    # scikit-learn trees copy their nodes when unpickled
+    kept, total = mapped_bytes(dump(forest(), str(tmp_path / 'forest.mmap')))
+    assert kept == 0 and total > 0
+
+
+def test_publish_converted_skips_trees(s3, tmp_path):
+    path = str(tmp_path / 'forest.pkl')
+    joblib.dump(forest(), path)
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'previous model')
+    assert publish_converted(path, BUCKET, KEY, s3) is None
+    # the handlers load the .pkl rather than a stale .mmap
+    assert load_published(BUCKET, KEY, s3) is None
+
+    joblib.dump({'coef': np.ones((256, 256))}, path)
+    assert publish_converted(path, BUCKET, KEY, s3)
+    np.testing.assert_array_equal(load_published(BUCKET, KEY, s3)['coef'], np.ones((256, 256)))
+
+
+class DeniedS3(LocalS3):
+    def head_object(self, Bucket, Key):
+        raise ClientError({'Error': {'Code': '403', 'Message': 'Forbidden'}}, 'HeadObject')
+
+
+def test_load_published_missing_and_denied(s3):
+    assert load_published(BUCKET, KEY, s3) is None
+    # a denied request must not silently serve without the artifact
+    with pytest.raises(ClientError):
+        load_published(BUCKET, KEY, DeniedS3(s3.root))
@@ -0,0 +1,68 @@
+import subprocess
+import sys
+import threading
+
+from conftest import ROOT
+from darwinex_ml.local_cloudwatch import LocalCloudWatch
+from darwinex_ml.metrics import MAX_BATCH, MetricEmitter
+
+# what is still queued when the interpreter exits is sent by close()
+AT_EXIT = '''
+import atexit, sys
+sys.path.insert(0, {root!r})
+from darwinex_ml.local_cloudwatch import LocalCloudWatch
+from darwinex_ml.metrics import MetricEmitter
+
+cloudwatch = LocalCloudWatch()
+# atexit runs the last registered first, this one after the emitter's close()
+atexit.register(lambda: print(len(cloudwatch.requests), len(cloudwatch.datapoints)))
+emitter = MetricEmitter(cloudwatch=cloudwatch, interval=3600)
+for i in range(1500):
+    emitter.put('Test', 'Metric', i)
+'''
+
+
+def emitter_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'metric-emitter']
+
+
+def test_calls_carry_at_most_max_batch_datapoints():
+    cloudwatch = LocalCloudWatch()
+    emitter = MetricEmitter(cloudwatch=cloudwatch, interval=3600)
+    for i in range(2500):
+        emitter.put('Test', 'Metric', i)
+    emitter.flush()
+    assert [len(data) for _, data in cloudwatch.requests] == [MAX_BATCH, MAX_BATCH, 500]
+    assert emitter.calls == 3 and emitter.errors == 0
+    emitter.close()
+
+
+def test_flush_sends_everything_queued():
+    cloudwatch = LocalCloudWatch()
+    emitter = MetricEmitter(cloudwatch=cloudwatch, interval=3600)
+    for i in range(10):
+        emitter.put('Test', 'Metric', i)
+    emitter.flush()
+    assert [datum['Value'] for datum in cloudwatch.datapoints] == [float(i) for i in range(10)]
+    emitter.put('Test', 'Metric', 10)
+    emitter.flush()
+    assert len(cloudwatch.datapoints) == 11
+    emitter.close()
+
+
+def test_close_runs_at_exit():
+    result = subprocess.run([sys.executable, '-c', AT_EXIT.format(root=ROOT)], capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.split() == ['2', '1500']
+
+
+def test_thread_starts_with_the_first_datapoint():
+    before = len(emitter_threads())
+    emitter = MetricEmitter(cloudwatch=LocalCloudWatch(), interval=3600)
+    emitter.flush()
+    emitter.close()
+    assert len(emitter_threads()) == before
+    emitter.put('Test', 'Metric', 1)
+    assert len(emitter_threads()) == before + 1
+    emitter.close()
+    assert len(emitter_threads()) == before
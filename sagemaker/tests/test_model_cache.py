@@ -0,0 +1,104 @@
+import io
+import os
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from darwinex_ml.local_s3 import LocalS3
+from darwinex_ml.model_cache import entry_dir, fetch_model
+
+BUCKET = 'tfm-2021-darwinex'
+KEY = 'models/Test/final_model.pkl'
+
+
+class FailingBody(io.BytesIO):
+    # the connection drops after the first block
+    def read(self, size=-1):
+        if self.tell():
+            raise ConnectionResetError('connection reset')
+        return super().read(1 << 10)
+
+
+class UnreachableS3(LocalS3):
+    def head_object(self, Bucket, Key):
+        raise EndpointConnectionError(endpoint_url='https://s3.eu-west-1.amazonaws.com')
+
+
+@pytest.fixture
+def s3(tmp_path):
+    return LocalS3(str(tmp_path / 's3'))
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / 'cache')
+
+
+def files(cache_dir):
+    return sorted(os.listdir(entry_dir(BUCKET, KEY, cache_dir)))
+
+
+def test_miss_downloads_and_hit_reuses(s3, cache_dir):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'v1')
+    path = fetch_model(BUCKET, KEY, cache_dir=cache_dir, s3=s3)
+    assert open(path, 'rb').read() == b'v1'
+    assert path.endswith('.pkl')
+    assert s3.calls['get_object'] == 1
+
+    assert fetch_model(BUCKET, KEY, cache_dir=cache_dir, s3=s3) == path
+    assert s3.calls['get_object'] == 1
+    assert s3.calls['head_object'] == 2
+
+
+def test_new_version_is_downloaded_and_old_ones_removed(s3, cache_dir):
+    paths = []
+    for version in (b'v1', b'v2', b'v3'):
+        s3.put_object(Bucket=BUCKET, Key=KEY, Body=version)
+        paths.append(fetch_model(BUCKET, KEY, cache_dir=cache_dir, s3=s3))
+        assert open(paths[-1], 'rb').read() == version
+    assert len(set(paths)) == 3
+    # the previous version stays for the workers still opening it
+    assert files(cache_dir) == sorted(os.path.basename(path) for path in paths[1:])
+
+
+def test_unreachable_s3_uses_the_cached_copy(s3, cache_dir):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'v1')
+    path = fetch_model(BUCKET, KEY, cache_dir=cache_dir, s3=s3)
+    assert fetch_model(BUCKET, KEY, cache_dir=cache_dir, s3=UnreachableS3(s3.root)) == path
+
+
+def test_unreachable_s3_without_cache_raises(s3, cache_dir):
+    with pytest.raises(EndpointConnectionError):
+        fetch_model(BUCKET, KEY, cache_dir=cache_dir, s3=UnreachableS3(s3.root))
+
+
+def test_failed_download_leaves_nothing(s3, cache_dir, monkeypatch):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=os.urandom(1 << 16))
+    get_object = s3.get_object
+
+    def broken_get_object(**kwargs):
+        response = get_object(**kwargs)
+        response['Body'] = FailingBody(response['Body'].read())
+        return response
+
+    monkeypatch.setattr(s3, 'get_object', broken_get_object)
+    with pytest.raises(ConnectionResetError):
+        fetch_model(BUCKET, KEY, cache_dir=cache_dir, s3=s3)
+    assert files(cache_dir) == []
+
+
+def test_key_changed_while_downloading(s3, cache_dir, monkeypatch):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'v1')
+    get_object = s3.get_object
+
+    def racing_get_object(**kwargs):
+        # a new version lands between the HEAD and the GET
+        s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'v2')
+        return get_object(**kwargs)
+
+    monkeypatch.setattr(s3, 'get_object', racing_get_object)
+    with pytest.raises(ClientError) as error:
+        fetch_model(BUCKET, KEY, cache_dir=cache_dir, s3=s3)
+    assert error.value.response['Error']['Code'] == 'PreconditionFailed'
+    assert files(cache_dir) == []
+
@@ -0,0 +1,77 @@
+import pickle
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from darwinex_ml.multi_model import ModelRouter, pickled_size, split_content_type
+
+SIZES = {'a': 40, 'b': 40, 'c': 40, 'big': 500}
+
+
+class Model:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def router(max_bytes=100, delay=0.0):
+    def loader(name):
+        time.sleep(delay)
+        return Model(name)
+    return ModelRouter({name: (lambda name=name: loader(name)) for name in SIZES}, max_bytes=max_bytes,
+                       sizeof=lambda model: SIZES[model.name])
+
+
+def test_least_recently_used_is_evicted():
+    models = router()
+    a = models.get('a')
+    b = models.get('b')
+    models.get('a')
+    models.get('c')
+    assert models.loaded() == ['a', 'c']
+    assert b.closed and not a.closed
+    stats = models.stats()
+    assert stats['a']['loads'] == 1 and stats['a']['hits'] == 1
+    assert stats['b']['evictions'] == 1 and not stats['b']['loaded']
+
+
+def test_model_over_the_budget_still_loads():
+    models = router()
+    models.get('a')
+    models.get('big')
+    assert models.loaded() == ['big']
+    assert models.loaded_bytes() == SIZES['big']
+
+
+def test_concurrent_requests_load_once():
+    models = router(delay=0.05)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(models.get('a'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert models.stats()['a']['loads'] == 1
+    assert all(model is results[0] for model in results)
+
+
+def test_unknown_model_raises():
+    with pytest.raises(ValueError):
+        router().get('ModUnknown')
+
+
+def test_split_content_type():
+    assert split_content_type('application/json; model=ModEstIngresos; charset=utf-8') == (
+        'ModEstIngresos', 'application/json; charset=utf-8')
+    assert split_content_type('text/csv') == (None, 'text/csv')
+
+
+def test_pickled_size_counts_the_arrays():
+    model = {'coef': np.zeros(1 << 16)}
+    assert pickled_size(model) >= model['coef'].nbytes
+    assert abs(pickled_size(model) - len(pickle.dumps(model, protocol=5))) < 1 << 10
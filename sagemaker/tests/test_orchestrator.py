@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from conftest import DATASETS
+from darwinex_ml.orchestrator import full_search, load_specs, read_dataset, reads_file
+
+
+@pytest.mark.parametrize('spec', load_specs(), ids=lambda spec: spec['name'])
+def test_single_model_jobs_read_their_dataset(spec):
+    # the channel of a single-model job holds the dataset without the folders of every model
+    spec = dict(spec, dataset=os.path.basename(spec['dataset']))
+    data = read_dataset(spec, DATASETS)
+    if 'target' in spec:
+        assert spec['target'] in data
+    for column in spec['setup'].get('ignore_features', []) + spec['setup'].get('categorical_features', []):
+        assert column in data
+
+
+def test_streaming_and_fpgrowth_read_the_file_themselves():
+    spec = load_specs(only=['ModClasClientes'])[0]
+    assert not reads_file(spec)
+    assert reads_file(dict(spec, chunksize=1000))
+    assert read_dataset(dict(spec, chunksize=1000), DATASETS) is None
+    assert reads_file(dict(load_specs(only=['ModRecInvDarwin'])[0], miner='fpgrowth'))
+
+
+def test_incremental_retrain_needs_a_training_state():
+    spec = load_specs(only=['ModClasClientes'])[0]
+    assert full_search(spec, None) == (None, 'full retrain requested')
+    with pytest.raises(ValueError):
+        full_search(dict(spec, retrain='incremental'), None)
@@ -0,0 +1,121 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATASETS
+from darwinex_ml.itemsets import mine_rules
+from darwinex_ml.mapped import dump, load
+from darwinex_ml.rules import RecommendationTable, RuleIndex, RuleTable, _json_float
+
+DATASET = os.path.join(DATASETS, 'dataset_ModRecInvDarwin.csv')
+
+
+def synthetic_rules(darwins, n_rules, rng):
+    # the shape of create_model() output, with metrics that are not rounded
+    sizes = rng.integers(1, 4, size=n_rules)
+    return pd.DataFrame({
+        'antecedents': [frozenset(rng.choice(darwins, size=size, replace=False)) for size in sizes],
+        'consequents': [frozenset(rng.choice(darwins, size=1)) for _ in range(n_rules)],
+        'support': rng.random(n_rules),
+        'confidence': rng.random(n_rules),
+        'lift': rng.random(n_rules) * 5,
+    })
+
+
+@pytest.fixture(scope='module')
+def mined():
+    return mine_rules(DATASET, 'orderid', 'darwin', min_support=0.05)
+
+
+@pytest.fixture(scope='module')
+def synthetic():
+    rng = np.random.default_rng(0)
+    darwins = pd.read_csv(DATASET, usecols=['darwin']).darwin.unique()
+    return synthetic_rules(darwins, 2000, rng)
+
+
+def baskets(rules, count, seed=0):
+    # one to three darwins of the antecedents, a darwin no rule has and the empty basket
+    rng = np.random.default_rng(seed)
+    darwins = sorted(set().union(*rules['antecedents']))
+    drawn = [list(rng.choice(darwins, size=size, replace=False)) for size in rng.integers(1, 4, count)]
+    return drawn + [['NOT-A-DARWIN'], [darwins[0], 'NOT-A-DARWIN'], []]
+
+
+@pytest.mark.parametrize('rules_name', ['mined', 'synthetic'])
+def test_rule_index_matches_scan(request, rules_name):
+    rules = request.getfixturevalue(rules_name)
+    index = RuleIndex(rules)
+    for darwins in baskets(rules, 50):
+        pd.testing.assert_frame_equal(index.query(darwins), rules[rules.antecedents.map(set(darwins).issubset)])
+
+
+def test_rule_index_top_k(mined):
+    index = RuleIndex(mined)
+    for darwins in baskets(mined, 20):
+        matched = mined[mined.antecedents.map(set(darwins).issubset)]
+        expected = matched.sort_values('lift', ascending=False, kind='mergesort').head(5)
+        pd.testing.assert_frame_equal(index.query(darwins, top_k=5), expected)
+
+
+def test_rule_index_top_k_takes_ties_in_rule_order(synthetic):
+    # few distinct lifts, so the k-th one is shared by rules in and out of the top
+    rules = synthetic.assign(lift=synthetic.lift.round())
+    index = RuleIndex(rules)
+    for darwins in baskets(rules, 20):
+        matched = rules[rules.antecedents.map(set(darwins).issubset)]
+        expected = matched.sort_values('lift', ascending=False, kind='mergesort').head(5)
+        pd.testing.assert_frame_equal(index.query(darwins, top_k=5), expected)
+
+
+def test_recommendation_table_matches_filter(mined, tmp_path):
+    plain = RuleIndex(mined)
+    table = load(dump(RecommendationTable(plain), str(tmp_path / 'recommendations.mmap')))
+    index = RuleIndex(mined, table)
+    for darwins in baskets(mined, 50):
+        result, hit = index.recommend(darwins, top_k=10)
+        assert hit == (len(set(darwins)) <= table.max_basket)
+        pd.testing.assert_frame_equal(result, plain.recommend(darwins, top_k=10)[0])
+
+
+def test_recommendation_table_of_other_rules_is_ignored(mined, synthetic):
+    index = RuleIndex(mined, RecommendationTable(RuleIndex(synthetic)))
+    assert index.table is None
+
+
+@pytest.mark.parametrize('rules_name', ['mined', 'synthetic'])
+def test_rule_table_gives_back_the_frame(request, rules_name, tmp_path):
+    rules = request.getfixturevalue(rules_name)
+    table = RuleTable.from_rules(rules)
+    pd.testing.assert_frame_equal(table.to_frame(), rules, check_exact=True)
+    # also once mapped, the way the handlers load it
+    pd.testing.assert_frame_equal(load(dump(table, str(tmp_path / 'rules.mmap'))).to_frame(), rules,
+                                  check_exact=True)
+
+
+def test_rule_table_keeps_other_indexes(synthetic):
+    rules = synthetic.iloc[::3]
+    pd.testing.assert_frame_equal(RuleTable.from_rules(rules).to_frame(), rules, check_exact=True)
+
+
+@pytest.mark.parametrize('rules_name', ['mined', 'synthetic'])
+def test_rule_table_json_matches_pandas(request, rules_name):
+    rules = request.getfixturevalue(rules_name)
+    index = RuleIndex(rules)
+
+    def parsed(text):
+        # pandas writes each frozenset in its iteration order, the table sorts them; numbers are compared as written
+        return {column: {key: sorted(value) if isinstance(value, list) else value for key, value in rows.items()}
+                for column, rows in json.loads(text, parse_float=str).items()}
+
+    for darwins in baskets(rules, 20):
+        assert parsed(index.select(darwins).to_json()) == parsed(index.query(darwins).to_json())
+
+
+def test_json_floats_are_written_like_pandas():
+    values = [0.0, -0.0, 1 / 3, -2 / 3, 1.5e-10, 2.5e-10, 0.99999999999, 1e16, 2.5e17, 3e-16, -1e-12, np.nan, np.inf]
+    expected = json.loads(pd.Series(values).to_json(), parse_float=str)
+    assert [_json_float(value) for value in values] == [expected[str(i)] or 'null' for i in range(len(values))]
@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATASETS
+from darwinex_ml.dataset_store import convert, load_dataset
+from darwinex_ml.setup_cache import _load_frame, _save_frame, frame_digest
+
+
+def mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+@pytest.fixture(scope='module')
+def incomes():
+    return pd.read_csv(os.path.join(DATASETS, 'dataset_ModEstIngresos.csv'))
+
+
+@pytest.mark.parametrize('name', ['ModClasClientes', 'ModEstIngresos'])
+def test_digest_follows_the_data_not_the_file(name, tmp_path):
+    shutil.copy(os.path.join(DATASETS, 'dataset_{}.csv'.format(name)), str(tmp_path))
+    from_csv = frame_digest(load_dataset(str(tmp_path), name, widen=True))
+    convert(str(tmp_path), name)
+    assert frame_digest(load_dataset(str(tmp_path), name, widen=True)) == from_csv
+
+
+@pytest.mark.parametrize('change', ['value', 'dtype', 'column', 'index'])
+def test_digest_changes_with_the_data(incomes, change):
+    other = incomes.copy()
+    if change == 'value':
+        other.loc[10, 'incomes'] += 1
+    elif change == 'dtype':
+        other['incomes'] = other['incomes'].astype(np.float32).astype(np.float64).astype(object)
+    elif change == 'column':
+        other = other.rename(columns={'incomes': 'income'})
+    else:
+        other.index += 1
+    assert frame_digest(other) != frame_digest(incomes)
+
+
+def test_frames_come_back_mapped_copy_on_write(tmp_path):
+    frame = pd.DataFrame(np.arange(12, dtype=float).reshape(4, 3), columns=['a', 'b', 'c'], index=[3, 5, 7, 9])
+    meta = _save_frame('X', frame, str(tmp_path))
+    loaded = _load_frame('X', meta, str(tmp_path))
+    pd.testing.assert_frame_equal(loaded, frame)
+    assert mapped(loaded.to_numpy())
+
+    # writing to the restored frame never reaches the cache
+    loaded.iloc[0, 0] = -1.0
+    pd.testing.assert_frame_equal(_load_frame('X', meta, str(tmp_path)), frame)
+
+
+def test_series_and_mixed_frames(tmp_path):
+    series = pd.Series([1, 0, 1], name='label', index=[2, 4, 6])
+    loaded = _load_frame('y', _save_frame('y', series, str(tmp_path)), str(tmp_path))
+    assert mapped(loaded.to_numpy())
+    # the values stay a np.memmap, which assert_series_equal tells apart from an array
+    np.testing.assert_array_equal(loaded.to_numpy(), series.to_numpy())
+    assert loaded.name == series.name and loaded.index.equals(series.index)
+
+    mixed = pd.DataFrame({'a': [1.0, 2.0], 'b': ['x', 'y']})
+    meta = _save_frame('X', mixed, str(tmp_path))
+    assert meta['kind'] == 'pickle'
+    assert _load_frame('X', meta, str(tmp_path)) is mixed
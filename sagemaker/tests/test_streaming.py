@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATASETS
+from darwinex_ml.streaming import Reservoir, StratifiedReservoir, StreamingPreprocessor, train_streaming
+
+DATASET = os.path.join(DATASETS, 'dataset_ModConversion_traders.csv')
+TARGET = 'is_converted'
+
+
+@pytest.fixture(scope='module')
+def traders():
+    return pd.read_csv(DATASET)
+
+
+def test_chunked_statistics_match_one_pass(traders):
+    whole = StreamingPreprocessor(TARGET, categorical_features=['user_country']).fit(traders)
+    chunked = StreamingPreprocessor(TARGET, categorical_features=['user_country'])
+    for start in range(0, len(traders), 700):
+        chunked.partial_fit(traders.iloc[start:start + 700])
+    chunked.finish()
+
+    assert chunked.feature_names_ == whole.feature_names_
+    np.testing.assert_allclose(chunked.means_, whole.means_)
+    np.testing.assert_allclose(chunked.scales_, whole.scales_)
+    np.testing.assert_allclose(chunked.transform(traders), whole.transform(traders))
+
+
+def test_preprocessor_scales_numeric_and_encodes_categorical(traders):
+    preprocessor = StreamingPreprocessor(TARGET, categorical_features=['user_country']).fit(traders)
+    X = preprocessor.transform(traders)
+    numeric = X[:, :len(preprocessor.numeric_)]
+    np.testing.assert_allclose(numeric.mean(axis=0), 0, atol=1e-6)
+    assert 'user_currency' not in preprocessor.numeric_ and 'user_country' not in preprocessor.numeric_
+    # one level per categorical column, none for levels not seen in training or beyond max_categories
+    country = [i for i, name in enumerate(preprocessor.feature_names_) if name.startswith('user_country_')]
+    assert len(country) == preprocessor.max_categories
+    assert set(X[:, country].sum(axis=1)) == {0, 1}
+    unseen = preprocessor.transform(traders.head(1).assign(user_country=-1))
+    assert unseen[0, country].sum() == 0
+
+
+def test_reservoir_is_bounded():
+    rng = np.random.default_rng(0)
+    reservoir = Reservoir(100, 1, rng)
+    for start in range(0, 10000, 300):
+        values = np.arange(start, min(start + 300, 10000))
+        reservoir.add(values[:, np.newaxis].astype(float), values)
+    X, y = reservoir.sample()
+    assert len(y) == 100 and reservoir.seen == 10000
+    assert len(set(y)) == 100
+    # a uniform sample of 0..9999 is not all from the first chunks
+    assert y.max() > 5000
+
+
+def test_stratified_reservoir_keeps_rare_classes():
+    rng = np.random.default_rng(0)
+    reservoir = StratifiedReservoir(200, np.array([0, 1]), 1, rng)
+    y = np.zeros(10000, dtype=int)
+    y[::100] = 1
+    reservoir.add(np.zeros((len(y), 1)), y)
+    _, sample = reservoir.sample()
+    assert (sample == 1).sum() == 100 and (sample == 0).sum() == 100
+
+
+@pytest.mark.parametrize('estimator', ['sgd', 'lr'])
+def test_train_streaming(traders, estimator):
+    pipeline, metrics = train_streaming(DATASET, TARGET, estimator, chunksize=1000, sample_size=2000,
+                                        validation_size=1000, categorical_features=['user_country'], balance=True)
+    assert list(metrics.columns) == ['Accuracy', 'AUC', 'Recall', 'Prec.', 'F1', 'Kappa', 'MCC']
+    assert metrics['Accuracy'].iloc[0] > traders[TARGET].value_counts(normalize=True).min()
+    assert set(pipeline.predict(traders.drop(columns=TARGET).head(100))) <= set(traders[TARGET])
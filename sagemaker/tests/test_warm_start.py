@@ -0,0 +1,50 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+
+from darwinex_ml.local_s3 import LocalS3
+from darwinex_ml.warm_start import (
+    FULL_SEARCH_DAYS, appended_rows, degraded, full_search_reason, load_state, plain_params, save_state)
+
+BUCKET = 'tfm-2021-darwinex'
+KEY = 'models/Test/training_state.json'
+NOW = datetime.datetime(2026, 10, 18)
+
+
+def state(days_ago=1, error=1.0):
+    return {'last_full_search': (NOW - datetime.timedelta(days=days_ago)).isoformat(), 'last_date': '2026-10-01',
+            'estimator': 'ridge', 'params': {'alpha': 0.5}, 'validation_error': error}
+
+
+def test_state_round_trip(tmp_path):
+    s3 = LocalS3(str(tmp_path))
+    assert load_state(BUCKET, KEY, s3) is None
+    save_state(state(), BUCKET, KEY, s3)
+    assert load_state(BUCKET, KEY, s3) == state()
+
+
+@pytest.mark.parametrize('previous, expected', [(None, True), (state(FULL_SEARCH_DAYS + 1), True), (state(), False)])
+def test_full_search_reason(previous, expected):
+    assert (full_search_reason(previous, now=NOW) is not None) == expected
+
+
+def test_slow_drift_is_caught_against_the_full_search_baseline():
+    # every incremental run is 4% worse than the one before, under the 10% tolerance step by step
+    baseline = state(error=1.0)
+    errors = [1.04 ** run for run in range(1, 4)]
+    assert not any(degraded(state(error=previous), error) for previous, error in zip([1.0] + errors, errors))
+    assert [degraded(baseline, error) for error in errors] == [False, False, True]
+
+
+def test_appended_rows():
+    df = pd.DataFrame({'date': pd.date_range('2026-09-29', periods=5).strftime('%Y-%m-%d'), 'incomes': np.arange(5)})
+    assert appended_rows(df, state()).incomes.tolist() == [3, 4]
+
+
+def test_plain_params_survive_json():
+    params = plain_params(Ridge(alpha=np.float64(0.5)))
+    assert params['alpha'] == 0.5 and type(params['alpha']) is float
+    assert Ridge(**params).get_params() == Ridge(alpha=0.5).get_params()